@@ -8,25 +8,57 @@ import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 from matplotlib.patches import FancyBboxPatch, ConnectionPatch
 import numpy as np
+import argparse
+import os
+import sys
+import time
 
-def create_order_book_visualization():
-    """Create a visual representation of the limit order book"""
+# Shared analytics live next to the report/dashboard scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from attribution import COMPONENT_LABELS, COMPONENTS, attribute_frame
+from market_maker import DEFAULT_PARAMS, simulate_market_maker, simulation_log
+from microstructure import Histogram2D
+from render import FigureJob, print_summary, render_figures
+from rolling_risk import rolling_var_es
+
+# Illustrative book used when no replayed snapshot is given
+SAMPLE_BOOK = {
+    'timestamp': None,
+    'bids': [(99.95, 100), (99.94, 250), (99.93, 150), (99.92, 300), (99.91, 200), (99.90, 180)],
+    'asks': [(100.05, 120), (100.06, 200), (100.07, 180), (100.08, 250), (100.09, 150), (100.10, 220)],
+    'quotes': (99.96, 100.04),
+}
+
+def create_order_book_visualization(snapshot=None, tick_size=0.01):
+    """Create a visual representation of the limit order book
+
+    ``snapshot`` is a depth snapshot of a replayed session, e.g.
+    ``BookIndex(events).snapshot_at(t, trader=...)`` from scripts/book_index.py;
+    an illustrative book is drawn without one.
+    """
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 10))
+    book = snapshot or SAMPLE_BOOK
     
     # Order Book Visualization
+    bid_prices = [price for price, _ in book['bids']]
+    bid_quantities = [qty for _, qty in book['bids']]
+    ask_prices = [price for price, _ in book['asks']]
+    ask_quantities = [qty for _, qty in book['asks']]
+    if snapshot is None:
+        ax1.set_ylim(95, 105)
+        scale = 50
+    else:
+        prices = bid_prices + ask_prices or [0.0]
+        ax1.set_ylim(min(prices) - 4 * tick_size, max(prices) + 4 * tick_size)
+        # Widest level spans 4.5 units on either side of the centre line
+        scale = max(bid_quantities + ask_quantities + [1]) / 4.5
     ax1.set_xlim(0, 10)
-    ax1.set_ylim(95, 105)
-    
-    # Sample order book data
-    bid_prices = [99.95, 99.94, 99.93, 99.92, 99.91, 99.90]
-    bid_quantities = [100, 250, 150, 300, 200, 180]
-    ask_prices = [100.05, 100.06, 100.07, 100.08, 100.09, 100.10]
-    ask_quantities = [120, 200, 180, 250, 150, 220]
+    y_lo, y_hi = ax1.get_ylim()
     
     # Plot bid side (left side, green)
     for i, (price, qty) in enumerate(zip(bid_prices, bid_quantities)):
-        width = qty / 50  # Scale for visualization
-        rect = patches.Rectangle((5-width, price-0.005), width, 0.01, 
+        width = qty / scale  # Scale for visualization
+        rect = patches.Rectangle((5-width, price-tick_size/2), width, tick_size, 
                                facecolor='lightgreen', edgecolor='darkgreen', alpha=0.8)
         ax1.add_patch(rect)
         ax1.text(4.8, price, f'${price:.2f}', ha='right', va='center', fontweight='bold')
@@ -34,37 +66,39 @@ def create_order_book_visualization():
     
     # Plot ask side (right side, red)
     for i, (price, qty) in enumerate(zip(ask_prices, ask_quantities)):
-        width = qty / 50  # Scale for visualization
-        rect = patches.Rectangle((5, price-0.005), width, 0.01, 
+        width = qty / scale  # Scale for visualization
+        rect = patches.Rectangle((5, price-tick_size/2), width, tick_size, 
                                facecolor='lightcoral', edgecolor='darkred', alpha=0.8)
         ax1.add_patch(rect)
         ax1.text(5.2, price, f'${price:.2f}', ha='left', va='center', fontweight='bold')
         ax1.text(5+width/2, price, f'{qty}', ha='center', va='center', fontsize=8)
     
     # Mid price line
-    mid_price = (bid_prices[0] + ask_prices[0]) / 2
-    ax1.axhline(y=mid_price, color='blue', linestyle='--', linewidth=2, alpha=0.7)
-    ax1.text(5, mid_price+0.03, f'Mid: ${mid_price:.2f}', ha='center', va='bottom',
-             bbox=dict(boxstyle="round,pad=0.3", facecolor='lightblue', alpha=0.8),
-             fontweight='bold')
+    if bid_prices and ask_prices:
+        mid_price = (bid_prices[0] + ask_prices[0]) / 2
+        ax1.axhline(y=mid_price, color='blue', linestyle='--', linewidth=2, alpha=0.7)
+        ax1.text(5, mid_price+(y_hi-y_lo)*0.003, f'Mid: ${mid_price:.2f}', ha='center', va='bottom',
+                 bbox=dict(boxstyle="round,pad=0.3", facecolor='lightblue', alpha=0.8),
+                 fontweight='bold')
     
     # Market maker quotes
-    mm_bid = 99.96
-    mm_ask = 100.04
-    ax1.axhline(y=mm_bid, color='orange', linewidth=3, alpha=0.8)
-    ax1.axhline(y=mm_ask, color='orange', linewidth=3, alpha=0.8)
-    ax1.text(1, mm_bid, 'MM Bid: $99.96', ha='left', va='center',
-             bbox=dict(boxstyle="round,pad=0.3", facecolor='orange', alpha=0.6),
-             fontweight='bold')
-    ax1.text(1, mm_ask, 'MM Ask: $100.04', ha='left', va='center',
-             bbox=dict(boxstyle="round,pad=0.3", facecolor='orange', alpha=0.6),
-             fontweight='bold')
-    
-    ax1.set_title('Limit Order Book with Market Maker Quotes', fontsize=14, fontweight='bold')
+    mm_bid, mm_ask = book['quotes'] or (None, None)
+    for label, quote in (('MM Bid', mm_bid), ('MM Ask', mm_ask)):
+        if quote is None:
+            continue
+        ax1.axhline(y=quote, color='orange', linewidth=3, alpha=0.8)
+        ax1.text(1, quote, f'{label}: ${quote:.2f}', ha='left', va='center',
+                 bbox=dict(boxstyle="round,pad=0.3", facecolor='orange', alpha=0.6),
+                 fontweight='bold')
+    
+    title = 'Limit Order Book with Market Maker Quotes'
+    if book['timestamp'] is not None:
+        title += f"\n{str(book['timestamp'])[:23].replace('T', ' ')}"
+    ax1.set_title(title, fontsize=14, fontweight='bold')
     ax1.set_xlabel('Order Quantity →')
     ax1.set_ylabel('Price ($)')
-    ax1.text(2.5, 104, 'ASK SIDE', ha='center', va='center', fontsize=12, fontweight='bold', color='darkred')
-    ax1.text(2.5, 96, 'BID SIDE', ha='center', va='center', fontsize=12, fontweight='bold', color='darkgreen')
+    ax1.text(2.5, y_hi - (y_hi-y_lo)*0.1, 'ASK SIDE', ha='center', va='center', fontsize=12, fontweight='bold', color='darkred')
+    ax1.text(2.5, y_lo + (y_hi-y_lo)*0.1, 'BID SIDE', ha='center', va='center', fontsize=12, fontweight='bold', color='darkgreen')
     ax1.grid(True, alpha=0.3)
     
     # Strategy Flow Diagram
@@ -122,14 +156,48 @@ def create_order_book_visualization():
     plt.tight_layout()
     return fig
 
-def create_pnl_attribution_chart():
-    """Create P&L attribution analysis"""
+def sample_session(seed=7, interval='10s', fee_per_share=0.001, risk_window=100):
+    """Attribution and rolling risk of a short simulated market-making session"""
+    run = simulate_market_maker(np.random.default_rng(seed), spread=0.04, quote_size=50)
+    attribution = attribute_frame(simulation_log(run), interval, fee_per_share)
+    var, es = rolling_var_es(np.diff(run['pnl'], prepend=0.0), risk_window)
+    risk = {'timestamp': run['timestamp'].astype('datetime64[ns]'), 'var': var, 'es': es}
+    return attribution, risk
+
+def sample_spread_hist(seed=7, samples=1000, bins=30):
+    """Histogram2D of a synthetic (market volatility, spread) sample"""
+    rng = np.random.default_rng(seed)
+    market_vol = rng.exponential(0.05, samples)
+    spreads = 0.05 + market_vol * 2 + rng.normal(0, 0.01, samples)
+    spread_hist = Histogram2D.uniform((market_vol.min(), market_vol.max()),
+                                      (spreads.min(), spreads.max()), bins=bins)
+    spread_hist.update(market_vol, spreads)
+    return spread_hist
+
+def create_pnl_attribution_chart(attribution=None, spread_hist=None,
+                                 inventory_limit=DEFAULT_PARAMS['inventory_limit'], risk=None):
+    """Create P&L attribution analysis
+
+    ``attribution`` is a ``PnLAttribution`` (scripts/attribution.py) of a
+    fill/mid-price log and ``risk`` a mapping of ``timestamp``/``var``/``es``
+    arrays, e.g. from ``rolling_var_es`` (scripts/rolling_risk.py); a
+    simulated session is used for whichever is missing.
+    ``spread_hist`` is an optional ``Histogram2D`` of (market volatility,
+    spread) accumulated elsewhere, e.g. chunk by chunk over a full tick log
+    or merged from worker processes; ``sample_spread_hist()`` otherwise.
+    """
     fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(14, 10))
+    if attribution is None or risk is None:
+        sample, sample_risk = sample_session()
+        attribution = sample if attribution is None else attribution
+        risk = sample_risk if risk is None else risk
+    totals = attribution.totals()
+    intervals = attribution.intervals()
     
     # 1. P&L Components
-    components = ['Spread Capture', 'Inventory Risk', 'Market Impact', 'Fees', 'Slippage']
-    values = [1250, -320, -180, -150, -75]
-    colors = ['green', 'red', 'orange', 'purple', 'brown']
+    components = [COMPONENT_LABELS[c] for c in COMPONENTS] + ['Net']
+    values = [totals[c] for c in COMPONENTS] + [totals['net']]
+    colors = ['green', 'red', 'purple', 'brown', 'black']
     
     bars = ax1.bar(components, values, color=colors, alpha=0.7)
     ax1.set_title('P&L Attribution by Component ($)', fontweight='bold')
@@ -140,15 +208,16 @@ def create_pnl_attribution_chart():
     # Add value labels on bars
     for bar, value in zip(bars, values):
         height = bar.get_height()
-        ax1.text(bar.get_x() + bar.get_width()/2., height + (10 if height > 0 else -30),
-                f'${value}', ha='center', va='bottom' if height > 0 else 'top', fontweight='bold')
+        ax1.text(bar.get_x() + bar.get_width()/2., height,
+                f'${value:,.0f}', ha='center', va='bottom' if height > 0 else 'top', fontweight='bold')
     
     plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45, ha='right')
     
-    # 2. Risk Metrics Over Time
-    time_hours = np.arange(0, 6.5, 0.1)
-    var_95 = 100 + 50 * np.sin(time_hours * 0.5) + np.random.normal(0, 10, len(time_hours))
-    expected_shortfall = var_95 * 1.3
+    # 2. Risk Metrics Over Time (rolling VaR / ES of P&L changes, as positive losses)
+    risk_ts = np.asarray(risk['timestamp'], dtype='datetime64[ns]')
+    time_hours = (risk_ts - risk_ts[0]) / np.timedelta64(1, 'h') if len(risk_ts) else risk_ts
+    var_95 = np.asarray(risk['var'])
+    expected_shortfall = np.asarray(risk['es'])
     
     ax2.plot(time_hours, var_95, label='VaR (95%)', linewidth=2, color='red')
     ax2.plot(time_hours, expected_shortfall, label='Expected Shortfall', linewidth=2, color='darkred')
@@ -159,15 +228,16 @@ def create_pnl_attribution_chart():
     ax2.legend()
     ax2.grid(True, alpha=0.3)
     
-    # 3. Inventory Turnover
-    inventory_levels = np.random.normal(0, 200, 100)
-    inventory_time = np.linspace(0, 6.5, 100)
+    # 3. Inventory Turnover (end-of-interval position and its range within each interval)
+    inventory_time = (intervals.index - intervals.index[0]).total_seconds() / 3600 if len(intervals) else []
     
-    ax3.plot(inventory_time, inventory_levels, color='blue', linewidth=1.5)
-    ax3.fill_between(inventory_time, inventory_levels, alpha=0.3, color='blue')
+    ax3.plot(inventory_time, intervals['inventory'], color='blue', linewidth=1.5)
+    ax3.fill_between(inventory_time, intervals['inventory_min'].astype(float),
+                     intervals['inventory_max'].astype(float), alpha=0.3, color='blue')
     ax3.axhline(y=0, color='black', linestyle='--', alpha=0.7)
-    ax3.axhline(y=500, color='red', linestyle='--', alpha=0.7, label='Risk Limit')
-    ax3.axhline(y=-500, color='red', linestyle='--', alpha=0.7)
+    if inventory_limit is not None:
+        ax3.axhline(y=inventory_limit, color='red', linestyle='--', alpha=0.7, label='Risk Limit')
+        ax3.axhline(y=-inventory_limit, color='red', linestyle='--', alpha=0.7)
     ax3.set_title('Inventory Management', fontweight='bold')
     ax3.set_xlabel('Trading Hours')
     ax3.set_ylabel('Position Size')
@@ -175,18 +245,17 @@ def create_pnl_attribution_chart():
     ax3.grid(True, alpha=0.3)
     
     # 4. Spread Analysis
-    market_vol = np.random.exponential(0.05, 1000)
-    spreads = 0.05 + market_vol * 2 + np.random.normal(0, 0.01, 1000)
+    if spread_hist is None:
+        spread_hist = sample_spread_hist()
     
-    ax4.hist2d(market_vol, spreads, bins=30, cmap='Blues', alpha=0.8)
+    spread_hist.plot(ax4, cmap='Blues', alpha=0.8)
     ax4.set_title('Spread vs Market Volatility', fontweight='bold')
     ax4.set_xlabel('Market Volatility')
     ax4.set_ylabel('Bid-Ask Spread (bps)')
     
-    # Add trend line
-    z = np.polyfit(market_vol, spreads, 1)
-    p = np.poly1d(z)
-    vol_range = np.linspace(market_vol.min(), market_vol.max(), 100)
+    # Add trend line (from the histogram's running moments, no second pass)
+    p = np.poly1d(spread_hist.trend())
+    vol_range = np.linspace(spread_hist.x_min, spread_hist.x_max, 100)
     ax4.plot(vol_range, p(vol_range), "r--", linewidth=2, alpha=0.8, label='Trend')
     ax4.legend()
     
@@ -301,27 +370,25 @@ def create_architecture_diagram():
     
     return fig
 
-def main():
+def main(jobs=None, force=False):
     """Generate all strategy diagrams"""
     print("Generating quantRush strategy diagrams...")
-    
-    # Create order book visualization
-    print("Creating order book visualization...")
-    ob_fig = create_order_book_visualization()
-    ob_fig.savefig('assets/market_making_diagram.png', dpi=300, bbox_inches='tight',
-                   facecolor='white', edgecolor='none')
-    
-    # Create P&L attribution chart
-    print("Creating P&L attribution analysis...")
-    pnl_fig = create_pnl_attribution_chart()
-    pnl_fig.savefig('assets/pnl_attribution.png', dpi=300, bbox_inches='tight',
-                    facecolor='white', edgecolor='none')
-    
-    # Create architecture diagram
-    print("Creating system architecture diagram...")
-    arch_fig = create_architecture_diagram()
-    arch_fig.savefig('assets/architecture_diagram.png', dpi=300, bbox_inches='tight',
-                     facecolor='white', edgecolor='none')
+    start = time.perf_counter()
+    
+    # The simulated session and spread sample are computed here so the
+    # attribution chart is keyed by its data and skipped when it is unchanged
+    attribution, risk = sample_session()
+    spread_hist = sample_spread_hist()
+    
+    # Render the diagrams in parallel
+    print("Rendering order book, P&L attribution and architecture diagrams...")
+    results = render_figures([
+        FigureJob('assets/market_making_diagram.png', create_order_book_visualization),
+        FigureJob('assets/pnl_attribution.png', create_pnl_attribution_chart,
+                  kwargs={'attribution': attribution, 'risk': risk, 'spread_hist': spread_hist}),
+        FigureJob('assets/architecture_diagram.png', create_architecture_diagram),
+    ], jobs, force)
+    print_summary(results, time.perf_counter() - start)
     
     print("✅ All strategy diagrams generated successfully!")
     print("📁 Files created:")
@@ -330,4 +397,8 @@ def main():
     print("   - assets/architecture_diagram.png")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate the quantRush strategy diagrams")
+    parser.add_argument('--jobs', type=int, default=None, help='Render processes (default: all cores)')
+    parser.add_argument('--force', action='store_true', help='Redraw figures even if unchanged')
+    args = parser.parse_args()
+    main(args.jobs, args.force)
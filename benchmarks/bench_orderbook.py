@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the Python order book (scripts/orderbook.py).
+
+Replays synthetic order flow (adds, cancels and marketable orders) through a
+fresh book several times and reports the median single-core rate. The
+conversion of the event array to Python lists is timed separately, since a
+replay from disk pays it once per file rather than inside the book.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from orderbook import CANCEL, EVENT_DTYPE, OrderBook, synthetic_events
+
+TARGET_EVENTS_PER_SEC = 1_000_000
+
+
+def bench(events, repeats):
+    start = time.perf_counter()
+    columns = [events[name].tolist() for name in EVENT_DTYPE.names]
+    convert = time.perf_counter() - start
+
+    timings = []
+    fills = 0
+    for _ in range(repeats):
+        book = OrderBook()
+        start = time.perf_counter()
+        book.process(zip(*columns))
+        timings.append(time.perf_counter() - start)
+        fills = len(book.fills)
+    return convert, timings, fills
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Python order book replay engine")
+    parser.add_argument('--events', type=int, default=2_000_000, help='Number of synthetic events')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed replays (median is reported)')
+    parser.add_argument('--cancel-rate', type=float, default=0.3, help='Fraction of events that cancel')
+    parser.add_argument('--cross-rate', type=float, default=0.1, help='Fraction of adds priced through the touch')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    events = synthetic_events(args.events, np.random.default_rng(args.seed),
+                              cancel_rate=args.cancel_rate, cross_rate=args.cross_rate)
+    convert, timings, fills = bench(events, args.repeats)
+    median = statistics.median(timings)
+    rate = len(events) / median
+
+    cancels = int((events['kind'] == CANCEL).sum())
+    print(f"📊 {len(events):,} events ({len(events) - cancels:,} adds, {cancels:,} cancels), "
+          f"{fills:,} fills")
+    print(f"   array -> lists: {convert:.3f}s ({len(events) / convert / 1e6:.1f}M/s)")
+    print(f"   replay: median {median:.3f}s over {args.repeats} runs "
+          f"(min {min(timings):.3f}s, max {max(timings):.3f}s)")
+    print(f"   throughput: {rate / 1e6:.2f}M events/sec, {median / len(events) * 1e9:.0f} ns/event")
+    if rate >= TARGET_EVENTS_PER_SEC:
+        print(f"✅ Meets the {TARGET_EVENTS_PER_SEC / 1e6:.0f}M events/sec target")
+    else:
+        print(f"❌ Below the {TARGET_EVENTS_PER_SEC / 1e6:.0f}M events/sec target")
+        sys.exit(1)
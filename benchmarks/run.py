@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the analytics hot paths and the order books.
+
+Synthetic simulation logs of each requested size (``--sizes``, 1e4 up to
+1e8 rows) are generated once into ``--data-dir`` and reused. Every
+(benchmark, size) pair then runs in a fresh Python process, so timings
+include cold imports and caches the way a user sees them and the peak RSS
+reported by the child is that benchmark's alone:
+
+    csv_load_cold     load_log of a CSV with no columnar cache (generate_report)
+    csv_load_warm     load_log once the cache exists
+    dashboard_refresh update_graphs through the Dash endpoint, per refresh
+    cli_help          startup of `quantrush --help`
+    cli_report_help   startup of `quantrush report --help`
+    cli_metrics       `quantrush report --input LOG --no-plots`, end to end
+    sample_data       assets/performancechart.generate_sample_data
+    rolling_metrics   rolling Sharpe + rolling max drawdown over the P&L
+    rolling_risk      rolling VaR / ES (scripts/rolling_risk.py)
+    orderbook_python  Python replay engine, synthetic order flow
+    orderbook_native  C++ OrderBook::submit throughput and per-order latency
+                      (``make bench`` builds it)
+
+Each run is appended to ``--history`` as JSON with its throughput and peak
+RSS. With a ``--baseline`` file present, results are compared against it
+and any benchmark more than ``--tolerance`` slower, or using that much more
+memory, is flagged and makes the exit status non-zero. ``--save-baseline``
+stores the current run as the new baseline. The cli_* benchmarks also
+count the modules imported and fail if matplotlib, seaborn, Dash, Flask or
+Plotly is among them.
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+sys.path.insert(0, os.path.join(ROOT, 'assets'))
+
+DEFAULT_SIZES = '1e4,1e5,1e6'
+DEFAULT_DATA_DIR = os.path.join(ROOT, 'benchmarks', '.data')
+DEFAULT_HISTORY = os.path.join(ROOT, 'benchmarks', 'history.json')
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+NATIVE_BENCH = os.path.join(ROOT, 'bench_orderbook')
+QUANTRUSH = os.path.join(ROOT, 'scripts', 'quantrush.py')
+# Top-level packages a startup benchmark must not import
+HEAVY_MODULES = ('matplotlib', 'seaborn', 'dash', 'flask', 'plotly')
+GENERATE_CHUNK = 1_000_000
+
+
+# -- synthetic data ------------------------------------------------------------
+
+def log_path(data_dir, rows):
+    return os.path.join(data_dir, f'simulation_log_{rows}.csv')
+
+
+def make_log(path, rows, seed=0):
+    """Write a simulation log of ``rows`` fills (100ms apart) with attribution columns."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2024-01-02T09:30', 'ns')
+    tmp = path + '.tmp'
+    pnl, inventory, mid = 0.0, 0, 100.0
+    with open(tmp, 'w') as f:
+        for offset in range(0, rows, GENERATE_CHUNK):
+            n = min(GENERATE_CHUNK, rows - offset)
+            side = np.where(rng.random(n) < 0.5, 1, -1)
+            qty = rng.integers(1, 10, n) * 10
+            mids = mid + np.cumsum(rng.normal(0, 0.01, n))
+            inv = inventory + np.cumsum(side * qty)
+            pnls = pnl + np.cumsum(rng.normal(0, 1, n))
+            frame = pd.DataFrame({
+                'timestamp': start + (offset + np.arange(n)) * np.timedelta64(100, 'ms'),
+                'pnl': pnls.round(4),
+                'inventory': inv,
+                'price': (mids - side * 0.01).round(2),
+                'qty': qty,
+                'side': np.where(side > 0, 'B', 'S'),
+                'mid': mids.round(3),
+            })
+            frame.to_csv(f, header=offset == 0, index=False, date_format='%Y-%m-%d %H:%M:%S.%f')
+            pnl, inventory, mid = pnls[-1], inv[-1], mids[-1]
+    os.replace(tmp, path)
+
+
+def ensure_log(data_dir, rows):
+    path = log_path(data_dir, rows)
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        print(f"   generating {rows:,}-row log...")
+        make_log(path, rows)
+    return path
+
+
+# -- benchmarks (run inside a child process) -----------------------------------
+
+def _timed(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def bench_csv_load_cold(rows, path, repeats):
+    from log_cache import cache_dir, load_log
+
+    def run():
+        shutil.rmtree(cache_dir(path), ignore_errors=True)
+        float(load_log(path, columns=['pnl'])['pnl'].sum())
+
+    seconds = min(_timed(run, repeats))
+    return {'seconds': seconds, 'throughput': rows / seconds}
+
+
+def bench_csv_load_warm(rows, path, repeats):
+    from log_cache import ensure_cache, load_log
+
+    ensure_cache(path)
+    seconds = min(_timed(lambda: float(load_log(path)['pnl'].sum()), repeats))
+    return {'seconds': seconds, 'throughput': rows / seconds}
+
+
+def bench_dashboard_refresh(rows, path, repeats):
+    import dashboard
+
+    dashboard.DATA_FILE = path
+    dashboard.ingester.tailer = dashboard.open_tailer(path)
+    dashboard.seed_from_cache(dashboard.ingester, path)
+    dashboard.ingester.refresh()
+    client = dashboard.create_app().server.test_client()
+    outputs = [('pnl-graph', 'figure'), ('inventory-graph', 'figure'), ('risk-graph', 'figure'),
+               ('view-state', 'data')]
+    payload = {
+        'output': '..' + '...'.join(f'{i}.{p}' for i, p in outputs) + '..',
+        'outputs': [{'id': i, 'property': p} for i, p in outputs],
+        'inputs': [{'id': 'interval-component', 'property': 'n_intervals', 'value': 1},
+                   {'id': 'pnl-graph', 'property': 'relayoutData', 'value': None},
+                   {'id': 'inventory-graph', 'property': 'relayoutData', 'value': None},
+                   {'id': 'symbol-select', 'property': 'value', 'value': []}],
+        'changedPropIds': ['interval-component.n_intervals'],
+        # version -1 forces a full redraw on every request
+        'state': [{'id': 'view-state', 'property': 'data', 'value': {'version': -1, 'range': None}}],
+    }
+
+    def run():
+        response = client.post('/_dash-update-component', json=payload)
+        if response.status_code != 200:
+            raise RuntimeError(f"dashboard refresh failed: HTTP {response.status_code}")
+
+    run()   # first request pays one-off Flask/Dash setup
+    timings = _timed(run, max(repeats, 5))
+    median = statistics.median(timings)
+    return {'seconds': median, 'throughput': 1 / median, 'p50_ms': median * 1e3,
+            'max_ms': max(timings) * 1e3}
+
+
+def _cli_startup(args, repeats, cwd=None):
+    """Best wall time of ``quantrush args`` and the modules it imported."""
+    timings = []
+    for _ in range(max(repeats, 5)):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-X', 'importtime', QUANTRUSH, *args],
+                              capture_output=True, text=True, cwd=cwd)
+        timings.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            raise RuntimeError(f"quantrush {' '.join(args)} failed: {proc.stderr.strip()[-200:]}")
+    # importtime lines: "import time: self [us] | cumulative | imported package"
+    modules = [line.rsplit('|', 1)[1].strip() for line in proc.stderr.splitlines()
+               if line.startswith('import time:') and line.count('|') == 2]
+    modules = [name for name in modules if not name.startswith('imported package')]
+    heavy = sorted({name.split('.')[0] for name in modules} & set(HEAVY_MODULES))
+    if heavy:
+        raise RuntimeError(f"quantrush {' '.join(args)} imported {', '.join(heavy)}")
+    seconds = min(timings)
+    return {'seconds': seconds, 'modules': len(modules)}
+
+
+def bench_cli_help(rows, path, repeats):
+    result = _cli_startup(['--help'], repeats)
+    return {**result, 'throughput': 1 / result['seconds']}
+
+
+def bench_cli_report_help(rows, path, repeats):
+    result = _cli_startup(['report', '--help'], repeats)
+    return {**result, 'throughput': 1 / result['seconds']}
+
+
+def bench_cli_metrics(rows, path, repeats):
+    from log_cache import ensure_cache
+
+    ensure_cache(path)
+    workdir = os.path.join(os.path.dirname(os.path.abspath(path)), 'cli_metrics')
+    os.makedirs(workdir, exist_ok=True)
+    result = _cli_startup(['report', '--input', os.path.abspath(path), '--no-plots'], repeats,
+                          cwd=workdir)
+    return {**result, 'throughput': rows / result['seconds']}
+
+
+def bench_sample_data(rows, path, repeats):
+    import performancechart
+
+    seconds = min(_timed(performancechart.generate_sample_data, max(repeats, 5)))
+    return {'seconds': seconds, 'throughput': 1 / seconds}
+
+
+def _pnl(path):
+    from log_cache import load_log
+    return np.asarray(load_log(path, columns=['pnl'])['pnl'], dtype=np.float64)
+
+
+def bench_rolling_metrics(rows, path, repeats):
+    from rolling import rolling_max_drawdown, rolling_sharpe
+
+    pnl = _pnl(path)
+    returns = np.diff(pnl, prepend=pnl[:1])
+
+    def run():
+        rolling_sharpe(returns, 300)
+        rolling_max_drawdown(pnl, 300, relative=False)
+
+    seconds = min(_timed(run, repeats))
+    return {'seconds': seconds, 'throughput': rows / seconds}
+
+
+def bench_rolling_risk(rows, path, repeats):
+    from rolling_risk import rolling_var_es
+
+    pnl = _pnl(path)
+    returns = np.diff(pnl, prepend=pnl[:1])
+    seconds = min(_timed(lambda: rolling_var_es(returns, 390), repeats))
+    return {'seconds': seconds, 'throughput': rows / seconds}
+
+
+def bench_orderbook_python(rows, path, repeats):
+    from orderbook import EVENT_DTYPE, OrderBook, synthetic_events
+
+    events = synthetic_events(rows, np.random.default_rng(1))
+    columns = [events[name].tolist() for name in EVENT_DTYPE.names]
+    seconds = min(_timed(lambda: OrderBook().process(zip(*columns)), repeats))
+    return {'seconds': seconds, 'throughput': rows / seconds}
+
+
+def bench_orderbook_native(rows, path, repeats):
+    if not os.path.exists(NATIVE_BENCH):
+        return {'skipped': 'bench_orderbook not built; run `make bench`'}
+    runs = []
+    for seed in range(repeats):
+        out = subprocess.run([NATIVE_BENCH, str(rows), str(seed)], check=True,
+                             capture_output=True, text=True).stdout
+        runs.append(json.loads(out))
+    best = min(runs, key=lambda r: r['seconds'])
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return {'seconds': best['seconds'], 'throughput': best['orders_per_sec'],
+            'latency_p50_ns': best['latency_ns']['p50'], 'latency_p99_ns': best['latency_ns']['p99'],
+            'latency_p999_ns': best['latency_ns']['p999'], 'latency_max_ns': best['latency_ns']['max'],
+            'peak_rss_mb': _rss_mb(child_rss)}
+
+
+# name -> (function, needs a log file, runs once per size)
+BENCHMARKS = {
+    'csv_load_cold': (bench_csv_load_cold, True, True),
+    'csv_load_warm': (bench_csv_load_warm, True, True),
+    'dashboard_refresh': (bench_dashboard_refresh, True, True),
+    'cli_help': (bench_cli_help, False, False),
+    'cli_report_help': (bench_cli_report_help, False, False),
+    'cli_metrics': (bench_cli_metrics, True, True),
+    'sample_data': (bench_sample_data, False, False),
+    'rolling_metrics': (bench_rolling_metrics, True, True),
+    'rolling_risk': (bench_rolling_risk, True, True),
+    'orderbook_python': (bench_orderbook_python, False, True),
+    'orderbook_native': (bench_orderbook_native, False, True),
+}
+
+
+def _rss_mb(maxrss):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def run_child(name, rows, path, repeats):
+    fn = BENCHMARKS[name][0]
+    result = fn(rows, path, repeats)
+    own = _rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    result['peak_rss_mb'] = max(result.get('peak_rss_mb', 0.0), own)
+    print(json.dumps(result))
+
+
+# -- driver --------------------------------------------------------------------
+
+def run_benchmark(name, rows, path, repeats):
+    cmd = [sys.executable, os.path.abspath(__file__), '--child', name, '--repeats', str(repeats)]
+    if rows is not None:
+        cmd += ['--rows', str(rows)]
+    if path is not None:
+        cmd += ['--path', path]
+    env = dict(os.environ, MPLBACKEND='Agg')
+    proc = subprocess.run(cmd, capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        return {'error': proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else 'failed'}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """Keys that got slower or heavier than the baseline by more than ``tolerance``."""
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base or 'throughput' not in result or 'throughput' not in base:
+            continue
+        if result['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append((key, 'throughput', base['throughput'], result['throughput']))
+        if result.get('peak_rss_mb', 0) > base.get('peak_rss_mb', np.inf) * (1 + tolerance):
+            regressions.append((key, 'peak_rss_mb', base['peak_rss_mb'], result['peak_rss_mb']))
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _load_json(path, default):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _write_json(path, value):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(value, f, indent=1)
+    os.replace(tmp, path)
+
+
+def _describe(result):
+    if 'error' in result:
+        return f"❌ {result['error']}"
+    if 'skipped' in result:
+        return f"⏭️  {result['skipped']}"
+    text = f"{result['throughput']:>14,.1f}/s  {result['seconds'] * 1e3:>10.2f} ms  {result['peak_rss_mb']:>8.1f} MB"
+    if 'latency_p50_ns' in result:
+        text += (f"  p50 {result['latency_p50_ns']}ns p99 {result['latency_p99_ns']}ns "
+                 f"p99.9 {result['latency_p999_ns']}ns")
+    if 'p50_ms' in result:
+        text += f"  p50 {result['p50_ms']:.1f}ms max {result['max_ms']:.1f}ms"
+    if 'modules' in result:
+        text += f"  {result['modules']} modules"
+    return text
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the quantRush analytics and order books")
+    parser.add_argument('--sizes', type=str, default=DEFAULT_SIZES,
+                        help='Comma-separated log sizes in rows (e.g. 1e4,1e6,1e8)')
+    parser.add_argument('--only', type=str, help='Comma-separated benchmark names to run')
+    parser.add_argument('--repeats', type=int, default=3, help='Timed repetitions (best is kept)')
+    parser.add_argument('--data-dir', type=str, default=DEFAULT_DATA_DIR, help='Where synthetic logs are kept')
+    parser.add_argument('--history', type=str, default=DEFAULT_HISTORY, help='JSON history to append to')
+    parser.add_argument('--baseline', type=str, default=DEFAULT_BASELINE, help='Baseline to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Store this run as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed fractional slowdown / memory growth before flagging')
+    parser.add_argument('--child', type=str, help=argparse.SUPPRESS)
+    parser.add_argument('--rows', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--path', type=str, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.rows, args.path, args.repeats)
+        sys.exit(0)
+
+    sizes = [int(float(s)) for s in args.sizes.split(',')]
+    names = args.only.split(',') if args.only else list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    results = {}
+    print(f"📊 Benchmarks at sizes {', '.join(f'{s:,}' for s in sizes)}")
+    for name in names:
+        fn, needs_log, sized = BENCHMARKS[name]
+        for rows in (sizes if sized else [None]):
+            path = ensure_log(args.data_dir, rows) if needs_log else None
+            key = name if rows is None else f'{name}@{rows}'
+            results[key] = run_benchmark(name, rows, path, args.repeats)
+            print(f"   {key:<28} {_describe(results[key])}")
+
+    record = {
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'results': results,
+    }
+    history = _load_json(args.history, [])
+    history.append(record)
+    _write_json(args.history, history)
+    print(f"📁 Appended to {args.history}")
+
+    status = 0
+    baseline = _load_json(args.baseline, None)
+    if baseline is not None:
+        regressions = compare(results, baseline['results'], args.tolerance)
+        for key, metric, before, after in regressions:
+            print(f"❌ Regression in {key}: {metric} {before:,.1f} -> {after:,.1f}")
+        if regressions:
+            status = 1
+        else:
+            print(f"✅ No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    if args.save_baseline:
+        _write_json(args.baseline, record)
+        print(f"📌 Saved baseline to {args.baseline}")
+    sys.exit(status)
@@ -0,0 +1,117 @@
+// Push-mode live updates for dashboard.py --push.
+//
+// Listens on the /stream server-sent events (see live_stream.py) and appends
+// the new points of each message to the graphs with dcc.Graph's extendData,
+// keeping at most data-window points per trace. Figures carry a `meta` of
+// {live, token, generation, rows}: the rows they were drawn from. A message
+// from a newer generation, a gap in the rows or a `resync` makes the client
+// bump the interval's n_intervals so Dash redraws the figures in full.
+// Zoomed figures (meta.live false) are left alone. Does nothing unless the
+// layout contains the #live-config element.
+(function () {
+    const GRAPHS = [
+        {id: 'pnl-graph', part: message => message, traces: ['pnl']},
+        {id: 'inventory-graph', part: message => message, traces: ['inventory']},
+        {id: 'risk-graph', part: message => message.risk, traces: ['var', 'es']},
+    ];
+    const drawn = {};   // graph id -> {token, generation, rows} of its current figure
+    let redrawRequested = 0;   // time of the last redraw request, 0 once it arrived
+
+    function figureState(id) {
+        const plot = document.querySelector('#' + id + ' .js-plotly-plot');
+        if (!plot || !plot.layout) {
+            return undefined;
+        }
+        const meta = plot.layout.meta;
+        if (!meta) {
+            return undefined;   // not drawn yet
+        }
+        if (!meta.live) {
+            return null;
+        }
+        if (!drawn[id] || drawn[id].token !== meta.token) {
+            drawn[id] = {token: meta.token, generation: meta.generation, rows: meta.rows};
+            redrawRequested = 0;
+        }
+        return drawn[id];
+    }
+
+    function redraw() {
+        // One request in flight at a time, retried if nothing came back
+        if (Date.now() - redrawRequested > 2000) {
+            redrawRequested = Date.now();
+            window.dash_clientside.set_props('interval-component', {n_intervals: redrawRequested});
+        }
+    }
+
+    // Appends rows [part.start, part.end) to a figure holding the first state.rows
+    // rows; false when rows are missing in between.
+    function extend(graph, state, part, maxPoints) {
+        if (!part || part.end <= state.rows) {
+            return true;
+        }
+        if (part.start > state.rows && part.end - part.start < maxPoints) {
+            return false;
+        }
+        const skip = Math.max(state.rows - part.start, 0);
+        const x = part.x.slice(skip);
+        window.dash_clientside.set_props(graph.id, {extendData: [
+            {x: graph.traces.map(() => x), y: graph.traces.map(name => part[name].slice(skip))},
+            graph.traces.map((_, i) => i),
+            maxPoints,
+        ]});
+        state.rows = part.end;
+        return true;
+    }
+
+    function onExtend(event, maxPoints) {
+        const message = JSON.parse(event.data);
+        let consistent = true;
+        for (const graph of GRAPHS) {
+            const state = figureState(graph.id);
+            if (state === undefined) {
+                consistent = false;
+            } else if (state === null || message.generation < state.generation) {
+                continue;
+            } else if (message.generation > state.generation) {
+                consistent = false;
+            } else {
+                consistent = extend(graph, state, graph.part(message), maxPoints) && consistent;
+            }
+        }
+        if (!consistent) {
+            redraw();
+        }
+    }
+
+    function onReset(event) {
+        const generation = JSON.parse(event.data).generation;
+        if (GRAPHS.some(graph => {
+            const state = figureState(graph.id);
+            return state && state.generation < generation;
+        })) {
+            redraw();
+        }
+    }
+
+    function connect(config) {
+        const maxPoints = Number(config.dataset.window);
+        const source = new EventSource(config.dataset.stream);
+        source.addEventListener('extend', event => onExtend(event, maxPoints));
+        source.addEventListener('reset', onReset);
+        source.addEventListener('resync', redraw);
+    }
+
+    // The layout is rendered by Dash after this script loads; give up after
+    // 30s, the page is then in polling mode
+    let tries = 120;
+    const waiting = setInterval(() => {
+        const config = document.getElementById('live-config');
+        if (config && window.dash_clientside && window.dash_clientside.set_props) {
+            clearInterval(waiting);
+            connect(config);
+        } else if (--tries === 0) {
+            clearInterval(waiting);
+        }
+    }, 250);
+})();
@@ -0,0 +1,149 @@
+"""
+Fixed-width binary simulation log (``.qrlog``).
+
+Layout: a 16-byte header followed by packed little-endian records.
+
+    header   magic b'QRLOG\\0' | uint16 version | uint32 record size | uint32 reserved
+    record   int64   timestamp  (ns since the Unix epoch)
+             float64 pnl
+             float64 price
+             int32   inventory
+             int32   qty
+             int8    side       (+1 buy, -1 sell, 0 none)
+
+Records are 33 bytes, against ~55+ bytes for the same row as CSV text, and
+``read_binlog`` maps the file straight into a NumPy structured array without
+any parsing. A partially written trailing record is ignored, so the file can
+be read while the engine is still appending to it.
+"""
+
+import argparse
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+
+from orderbook import SIDE_CODES
+
+MAGIC = b'QRLOG\x00'
+VERSION = 1
+HEADER = struct.Struct('<6sHII')
+HEADER_SIZE = HEADER.size
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<i8'),
+    ('pnl', '<f8'),
+    ('price', '<f8'),
+    ('inventory', '<i4'),
+    ('qty', '<i4'),
+    ('side', 'i1'),
+])
+
+
+def is_binlog(path):
+    """True if ``path`` starts with the binary log magic bytes."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _check_header(f):
+    magic, version, record_size, _ = HEADER.unpack(f.read(HEADER_SIZE))
+    if magic != MAGIC:
+        raise ValueError(f"{f.name} is not a quantRush binary log")
+    if version != VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"{f.name}: unsupported binary log version {version} "
+                         f"(record size {record_size})")
+
+
+def record_count(size):
+    return max(size - HEADER_SIZE, 0) // RECORD_DTYPE.itemsize
+
+
+def read_binlog(path):
+    """Memory-map a binary log as a read-only structured array (zero copy)."""
+    with open(path, 'rb') as f:
+        _check_header(f)
+        n = record_count(os.fstat(f.fileno()).st_size)
+    if n == 0:
+        return np.empty(0, dtype=RECORD_DTYPE)
+    return np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE, shape=(n,))
+
+
+def records_to_frame(records):
+    """DataFrame view of binary log records, with ``timestamp`` as datetime64[ns]."""
+    columns = {name: records[name] for name in RECORD_DTYPE.names}
+    columns['timestamp'] = records['timestamp'].view('datetime64[ns]')
+    return pd.DataFrame(columns, copy=False)
+
+
+class BinaryLogWriter:
+    """Append records to a binary log, writing the header for new files."""
+
+    def __init__(self, path):
+        self.path = path
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        self._f = open(path, 'r+b' if exists else 'wb')
+        if exists:
+            _check_header(self._f)
+            # Drop any torn record left by an interrupted writer
+            size = HEADER_SIZE + record_count(os.fstat(self._f.fileno()).st_size) * RECORD_DTYPE.itemsize
+            self._f.truncate(size)
+            self._f.seek(size)
+        else:
+            self._f.write(HEADER.pack(MAGIC, VERSION, RECORD_DTYPE.itemsize, 0))
+
+    def write(self, records):
+        """Append a structured array with ``RECORD_DTYPE`` fields."""
+        self._f.write(np.ascontiguousarray(records, dtype=RECORD_DTYPE).tobytes())
+
+    def write_frame(self, df):
+        """Append DataFrame rows; columns missing from ``df`` are written as zero."""
+        records = np.zeros(len(df), dtype=RECORD_DTYPE)
+        for name in RECORD_DTYPE.names:
+            if name not in df:
+                continue
+            values = df[name].to_numpy()
+            if name == 'timestamp':
+                values = values.astype('datetime64[ns]').view('i8')
+            elif name == 'side' and values.dtype.kind in 'OUST':
+                values = np.array([SIDE_CODES.get(str(v).upper(), 0) for v in values], dtype='i1')
+            records[name] = values
+        self.write(records)
+
+    def flush(self):
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def convert_csv(csv_path, out_path, chunksize=1_000_000):
+    """Convert a CSV simulation log to the binary format."""
+    if os.path.exists(out_path):
+        os.remove(out_path)
+    rows = 0
+    with BinaryLogWriter(out_path) as writer:
+        for chunk in pd.read_csv(csv_path, parse_dates=['timestamp'], chunksize=chunksize):
+            writer.write_frame(chunk)
+            rows += len(chunk)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a CSV simulation log to the binary .qrlog format")
+    parser.add_argument('input', help='Path to simulation_log.csv')
+    parser.add_argument('output', help='Path of the .qrlog file to write')
+    args = parser.parse_args()
+    rows = convert_csv(args.input, args.output)
+    print(f"✅ Wrote {rows:,} records to {args.output} "
+          f"({os.path.getsize(args.output) / max(os.path.getsize(args.input), 1):.0%} of the CSV size)")
@@ -0,0 +1,192 @@
+"""
+Checkpoint index for reconstructing the order book at any timestamp.
+
+While an event log is replayed, the full book is written out every ``every``
+events into ``<events>.ckpt/``:
+
+    orders.bin   resting orders of every checkpoint, back to back (ORDER_DTYPE)
+    index.npy    one row per checkpoint: events applied, timestamp of the last
+                 one, and the checkpoint's slice of orders.bin
+    meta.json    source size/mtime, so a changed event log rebuilds the index
+
+``BookIndex.book_at(t)`` binary-searches the events for ``t``, then the index
+for the last checkpoint at or before it, and replays at most ``every`` events
+from there, so any instant of a long session costs O(log n) plus a short
+forward replay instead of a replay from the open.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from orderbook import BUY, ORDER_DTYPE, SELL, OrderBook, iter_events, load_events, replay
+
+INDEX_VERSION = 1
+CHECKPOINT_SUFFIX = '.ckpt'
+DEFAULT_EVERY = 50_000
+
+INDEX_DTYPE = np.dtype([
+    ('events', '<i8'),    # events applied before the checkpoint was taken
+    ('ts', '<i8'),        # timestamp of the last applied event
+    ('start', '<i8'),     # first record in orders.bin
+    ('count', '<i8'),     # number of resting orders
+])
+
+
+def checkpoint_dir(path):
+    return path + CHECKPOINT_SUFFIX
+
+
+class CheckpointWriter:
+    """Append book snapshots to a checkpoint directory being built."""
+
+    def __init__(self, directory, events):
+        self.directory = directory
+        self.events = events
+        self.rows = [(0, np.iinfo(np.int64).min, 0, 0)]   # the empty book before any event
+        self._orders = open(os.path.join(directory, 'orders.bin'), 'wb')
+        self._written = 0
+
+    def __call__(self, book, applied):
+        records = book.snapshot()
+        self._orders.write(records.tobytes())
+        self.rows.append((applied, int(self.events['ts'][applied - 1]), self._written, len(records)))
+        self._written += len(records)
+
+    def close(self):
+        self._orders.close()
+        np.save(os.path.join(self.directory, 'index.npy'), np.array(self.rows, dtype=INDEX_DTYPE))
+
+
+def build_checkpoints(path, every=DEFAULT_EVERY, events=None, trader=None, output=None, tick_size=0.01):
+    """Replay the event log at ``path`` and write its checkpoints.
+
+    ``trader``/``output`` also write that trader's simulation log in the same
+    pass, as ``orderbook.replay`` does. Returns the index metadata.
+    """
+    events = load_events(path) if events is None else events
+    st = os.stat(path)
+    directory = checkpoint_dir(path)
+    parent = os.path.dirname(os.path.abspath(path))
+    staging = tempfile.mkdtemp(prefix='.ckpt-', dir=parent)
+    try:
+        writer = CheckpointWriter(staging, events)
+        try:
+            replay(events, trader, output, tick_size, every=every, on_checkpoint=writer)
+        finally:
+            writer.close()
+        meta = {'version': INDEX_VERSION, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+                'every': every, 'events': len(events), 'checkpoints': len(writer.rows)}
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(staging, directory)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return meta
+
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, 'meta.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def ensure_checkpoints(path, every=DEFAULT_EVERY):
+    """Checkpoint metadata for ``path``, building the index if missing, stale or
+    taken at a different ``every``."""
+    st = os.stat(path)
+    meta = _read_meta(checkpoint_dir(path))
+    if (meta and meta.get('version') == INDEX_VERSION and meta['size'] == st.st_size
+            and meta['mtime_ns'] == st.st_mtime_ns and meta.get('every') == every):
+        return meta
+    return build_checkpoints(path, every)
+
+
+def depth_snapshot(book, levels=6, tick_size=0.01, trader=None, ts=None):
+    """Plot-ready top ``levels`` of each side, prices converted from ticks.
+
+    Returns ``{'timestamp', 'bids', 'asks', 'quotes'}`` where bids/asks are
+    ``[(price, qty), ...]`` best first and ``quotes`` is ``trader``'s best
+    resting ``(bid, ask)`` (either may be None), or None without a trader.
+    """
+    def price(ticks):
+        return round(ticks * tick_size, 10)
+
+    snapshot = {
+        'timestamp': None if ts is None else np.datetime64(int(ts), 'ns'),
+        'bids': [(price(p), q) for p, q in book.depth(BUY, levels)],
+        'asks': [(price(p), q) for p, q in book.depth(SELL, levels)],
+        'quotes': None,
+    }
+    if trader is not None:
+        mine = [o for o in book.orders.values() if o.trader == trader]
+        bids = [o.price for o in mine if o.side == BUY]
+        asks = [o.price for o in mine if o.side == SELL]
+        snapshot['quotes'] = (price(max(bids)) if bids else None,
+                              price(min(asks)) if asks else None)
+    return snapshot
+
+
+class BookIndex:
+    """Random access to the book of a replayed session by timestamp."""
+
+    def __init__(self, path, every=DEFAULT_EVERY):
+        self.path = path
+        self.meta = ensure_checkpoints(path, every)
+        directory = checkpoint_dir(path)
+        self.events = load_events(path)
+        self.index = np.load(os.path.join(directory, 'index.npy'))
+        orders_path = os.path.join(directory, 'orders.bin')
+        if os.path.getsize(orders_path):
+            self.orders = np.memmap(orders_path, dtype=ORDER_DTYPE, mode='r')
+        else:
+            self.orders = np.empty(0, dtype=ORDER_DTYPE)
+
+    def book_at(self, ts):
+        """The book after every event with a timestamp at or before ``ts``."""
+        target = int(np.searchsorted(self.events['ts'], _to_ns(ts), side='right'))
+        k = int(np.searchsorted(self.index['events'], target, side='right')) - 1
+        row = self.index[k]
+        book = OrderBook.from_snapshot(self.orders[row['start']:row['start'] + row['count']])
+        book.process(iter_events(self.events[row['events']:target]), on_fill=_discard)
+        return book
+
+    def snapshot_at(self, ts, levels=6, tick_size=0.01, trader=None):
+        """``depth_snapshot`` of the book at ``ts``."""
+        return depth_snapshot(self.book_at(ts), levels, tick_size, trader, ts=_to_ns(ts))
+
+
+def _discard(fill):
+    pass
+
+
+def _to_ns(ts):
+    if isinstance(ts, (int, np.integer)):
+        return int(ts)
+    return int(np.datetime64(ts, 'ns').astype(np.int64))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the checkpoint index of an order event log")
+    parser.add_argument('events', help='Event log (.npy or .csv)')
+    parser.add_argument('--every', type=int, default=DEFAULT_EVERY, help='Events between checkpoints')
+    parser.add_argument('--trader', type=int, help='Also write this trader\'s simulation log')
+    parser.add_argument('--output', type=str, default='results/simulation_log.csv',
+                        help='Simulation log path when --trader is given')
+    args = parser.parse_args()
+
+    output = None
+    if args.trader is not None:
+        output = args.output
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    meta = build_checkpoints(args.events, args.every, trader=args.trader, output=output)
+    print(f"✅ {meta['checkpoints']:,} checkpoints over {meta['events']:,} events "
+          f"in {checkpoint_dir(args.events)}")
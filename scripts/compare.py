@@ -0,0 +1,194 @@
+"""
+Ranking of many simulation logs by their per-run metrics.
+
+``RunMetrics`` reads a log a chunk at a time and keeps only running values:
+the final P&L, Welford moments of the P&L changes for the Sharpe ratio
+(annualised by the first chunk's sampling interval), the running peak and
+the deepest drawdown below it (as in ``market_maker.summarize``), the time
+spent with |inventory| at or beyond the limit (each row holds until the
+next one) and downsampled P&L and inventory series for overlay charts. A
+file is read once and memory is bounded by the chunk size, however long
+the run.
+
+``compare_runs`` measures the files on a process pool of ``jobs`` workers,
+with at most two files per worker in flight; only the metrics come back.
+"""
+
+import glob
+import os
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from downsample import DEFAULT_MAX_POINTS, downsample_frame
+from log_cache import CONVERT_CHUNKSIZE, iter_chunks
+from market_maker import DEFAULT_PARAMS, TRADING_SECONDS_PER_YEAR
+from streaming_stats import RunningMoments
+
+LOG_EXTENSIONS = ('.csv', '.qrlog')
+# Metric -> True when smaller is better
+RANK_METRICS = {'final_pnl': False, 'sharpe': False, 'max_drawdown': False, 'time_at_limit': True}
+DEFAULT_INVENTORY_LIMIT = DEFAULT_PARAMS['inventory_limit']
+
+
+def expand_inputs(patterns):
+    """Log files named by directories (their .csv / .qrlog files) and glob patterns."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, name) for name in os.listdir(pattern)
+                       if os.path.splitext(name)[1] in LOG_EXTENSIONS]
+        else:
+            matches = glob.glob(pattern, recursive=True)
+        paths.extend(sorted(path for path in matches if os.path.isfile(path)))
+    paths = list(dict.fromkeys(paths))
+    if not paths:
+        raise FileNotFoundError(f"No simulation logs match {' '.join(patterns)}")
+    return paths
+
+
+def run_names(paths):
+    """Shortest distinguishing name of each path: relative to their common directory, no extension.
+
+    The extension is kept where dropping it would give two runs the same
+    name, as for ``run.csv`` and ``run.qrlog``.
+    """
+    if len(paths) == 1:
+        return [os.path.splitext(os.path.basename(paths[0]))[0]]
+    common = os.path.commonpath([os.path.abspath(path) for path in paths])
+    names = [os.path.relpath(os.path.abspath(path), common) for path in paths]
+    stems = Counter(os.path.splitext(name)[0] for name in names)
+    return [name if stems[os.path.splitext(name)[0]] > 1 else os.path.splitext(name)[0]
+            for name in names]
+
+
+class RunMetrics:
+    """Single-pass metrics of one run, fed chunk by chunk."""
+
+    def __init__(self, inventory_limit=DEFAULT_INVENTORY_LIMIT, max_points=DEFAULT_MAX_POINTS,
+                 method='minmax'):
+        self.inventory_limit = inventory_limit
+        self.max_points = max_points
+        self.method = method
+        self.rows = 0
+        self.changes = RunningMoments()
+        self.annualisation = None
+        self.peak = 0.0
+        self.max_drawdown = 0.0
+        self.max_abs_inventory = 0
+        self.limit_ns = 0
+        self.duration_ns = 0
+        self.last = None        # (timestamp ns, pnl, inventory) of the latest row
+        self.kept = {'pnl': [], 'inventory': []}
+
+    def update(self, frame):
+        if frame.empty:
+            return
+        ts = frame['timestamp'].to_numpy().astype('datetime64[ns]').view('i8')
+        pnl = frame['pnl'].to_numpy(dtype=np.float64)
+        inventory = frame['inventory'].to_numpy()
+
+        if self.annualisation is None:
+            step = np.median(np.diff(ts)) / 1e9 if len(ts) > 1 else 0
+            self.annualisation = TRADING_SECONDS_PER_YEAR / step if step > 0 else 1.0
+        previous = self.last
+        self.changes.update(np.diff(pnl, prepend=previous[1] if previous else 0.0))
+        peaks = np.maximum.accumulate(np.maximum(pnl, self.peak))
+        self.peak = peaks[-1]
+        self.max_drawdown = min(self.max_drawdown, float((pnl - peaks).min()))
+        self.max_abs_inventory = max(self.max_abs_inventory, int(np.abs(inventory).max()))
+
+        if previous:
+            ts = np.concatenate([[previous[0]], ts])
+            held = np.concatenate([[previous[2]], inventory])
+        else:
+            held = inventory
+        durations = np.diff(ts)
+        self.duration_ns += int(durations.sum())
+        self.limit_ns += int(durations[np.abs(held[:-1]) >= self.inventory_limit].sum())
+        self.last = (int(ts[-1]), float(pnl[-1]), int(inventory[-1]))
+        self.rows += len(frame)
+
+        for column, parts in self.kept.items():
+            parts.append(downsample_frame(frame[['timestamp', column]], 'timestamp', column,
+                                          self.max_points, self.method))
+            if len(parts) > 4:
+                merged = pd.concat(parts, ignore_index=True)
+                parts[:] = [downsample_frame(merged, 'timestamp', column, self.max_points, self.method)]
+
+    def sharpe(self):
+        std = self.changes.std
+        return float(self.changes.mean / std * np.sqrt(self.annualisation)) if std > 0 else 0.0
+
+    def result(self):
+        """Metrics row plus the downsampled series."""
+        series = {}
+        for column, parts in self.kept.items():
+            if not parts:
+                series[column] = pd.DataFrame(columns=['timestamp', column])
+                continue
+            merged = pd.concat(parts, ignore_index=True)
+            series[column] = downsample_frame(merged, 'timestamp', column, self.max_points, self.method)
+        return {
+            'row': {
+                'rows': self.rows,
+                'final_pnl': self.last[1] if self.last else 0.0,
+                'sharpe': self.sharpe() if self.rows else 0.0,
+                'max_drawdown': self.max_drawdown,
+                'max_abs_inventory': self.max_abs_inventory,
+                'time_at_limit': self.limit_ns / self.duration_ns if self.duration_ns else 0.0,
+                'seconds_at_limit': self.limit_ns / 1e9,
+                'duration_s': self.duration_ns / 1e9,
+            },
+            'series': series,
+        }
+
+
+def measure_run(path, inventory_limit=DEFAULT_INVENTORY_LIMIT, max_points=DEFAULT_MAX_POINTS,
+                method='minmax', chunksize=CONVERT_CHUNKSIZE):
+    """Worker entry point: ``RunMetrics`` of one log, read in chunks."""
+    metrics = RunMetrics(inventory_limit, max_points, method)
+    for chunk in iter_chunks(path, chunksize):
+        metrics.update(chunk)
+    return metrics.result()
+
+
+def compare_runs(paths, jobs=None, inventory_limit=DEFAULT_INVENTORY_LIMIT,
+                 max_points=DEFAULT_MAX_POINTS, method='minmax', chunksize=CONVERT_CHUNKSIZE):
+    """``(table, series)`` of every log: one metrics row per run and ``{run: series}``."""
+    names = run_names(paths)
+    jobs = min(jobs or os.cpu_count() or 1, len(paths))
+    results = {}
+    if jobs == 1:
+        for name, path in zip(names, paths):
+            results[name] = measure_run(path, inventory_limit, max_points, method, chunksize)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            queue = iter(zip(names, paths))
+            running = {}
+            while True:
+                # A couple of files per worker in flight rather than all of them queued
+                for name, path in queue:
+                    future = pool.submit(measure_run, path, inventory_limit, max_points, method,
+                                         chunksize)
+                    running[future] = name
+                    if len(running) >= 2 * jobs:
+                        break
+                if not running:
+                    break
+                ready, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in ready:
+                    results[running.pop(future)] = future.result()
+
+    table = pd.DataFrame([{'run': name, 'path': path, **results[name]['row']}
+                          for name, path in zip(names, paths)])
+    return table, {name: results[name]['series'] for name in names}
+
+
+def rank_runs(table, by='final_pnl'):
+    """Best run first by ``by`` (see ``RANK_METRICS``), with a 1-based ``rank`` column."""
+    ranked = table.sort_values(by, ascending=RANK_METRICS[by], kind='stable').reset_index(drop=True)
+    ranked.insert(0, 'rank', np.arange(1, len(ranked) + 1))
+    return ranked
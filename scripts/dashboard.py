@@ -1,46 +1,445 @@
+import numpy as np
 import pandas as pd
-import dash
-from dash import dcc, html
-from dash.dependencies import Input, Output
-import plotly.express as px
 import argparse
+import itertools
 import threading
+from collections import OrderedDict
 import time
 import os
 
-app = dash.Dash(__name__)
+from downsample import DEFAULT_MAX_POINTS, METHODS, downsample_frame
+from file_watch import FileWatcher
+from live_stream import DEFAULT_WINDOW as DEFAULT_LIVE_WINDOW, LiveStream
+from log_cache import ensure_cache, load_log
+from log_tail import BackgroundIngester, LogTailer, open_tailer
+import profiling
+from profiling import LatencyTracker, stage
+from pyramid import AggregatePyramid
+from rolling_risk import DEFAULT_CONFIDENCE, DEFAULT_WINDOW, RiskFeed
+from shards import combine_buckets, is_sharded, last_per_bucket, open_shards
+
+# Built by create_app(); Dash, Flask and Plotly are only imported then, so
+# importing this module (or `quantrush dashboard --help`) stays cheap
+app = None
 
 DATA_FILE = "results/simulation_log.csv"
 
+# One ingester thread per server process; every viewer reads its snapshot.
+# The pyramid holds 1s/1min/1h aggregates so any zoom level is cheap to draw.
+pyramid = AggregatePyramid(columns=('pnl', 'inventory'))
+# Rolling VaR / ES of P&L changes, extended incrementally with each batch
+risk_feed = RiskFeed('pnl', DEFAULT_WINDOW, DEFAULT_CONFIDENCE)
+ingester = BackgroundIngester(LogTailer(DATA_FILE), pyramid=pyramid, feeds=[risk_feed])
+
+# Point budget per plotted series, see downsample.py
+MAX_POINTS = DEFAULT_MAX_POINTS
+DOWNSAMPLE_METHOD = 'minmax'
+# Up to this many raw rows in view are downsampled directly, beyond it the
+# pyramid is used so the cost no longer depends on the length of the run
+RAW_SCAN_FACTOR = 50
+
+# Push mode (--push): the browser draws each figure once and then receives
+# only appended rows over /stream (server-sent events, see live_stream.py),
+# applied with extendData by assets/live_updates.js and capped at
+# LIVE_WINDOW points. Unzoomed figures show the last LIVE_WINDOW rows.
+PUSH_UPDATES = False
+LIVE_WINDOW = DEFAULT_LIVE_WINDOW
+live_stream = None
+# Identifies each full draw so the client knows to re-read the figure's rows
+draws = itertools.count(1)
+
+# Sharded logs (--data is a shard directory or a log with a symbol column):
+# viewers pick symbols and only those shards are loaded, each by its own
+# ingester. At most MAX_OPEN_SYMBOLS stay loaded, least recently shown first out.
+SHARDS = None
+INGEST_INTERVAL = 1.0
+MAX_OPEN_SYMBOLS = 32
+DEFAULT_SELECTED = 4
+# Multi-symbol totals are summed on this time grid, see shards.combine_buckets
+TOTAL_BUCKET_NS = 1_000_000_000
+symbol_ingesters = OrderedDict()
+symbol_lock = threading.Lock()
+# (versions, totals) of the last drawn selection
+totals_cache = {}
+
+# Recent callback latencies, served as percentiles at /debug/latency. The
+# request timing includes Dash's JSON serialization of the figures.
+latency = LatencyTracker()
+CALLBACK_PATH = '/_dash-update-component'
+
+def start_callback_timer():
+    import flask
+
+    if flask.request.path == CALLBACK_PATH:
+        flask.g.callback_start = time.perf_counter()
+        flask.g.callback_stage = stage('dashboard.request')
+        flask.g.callback_stage.__enter__()
+
+def stop_callback_timer(exc):
+    import flask
+
+    if 'callback_start' in flask.g:
+        flask.g.callback_stage.__exit__(None, None, None)
+        latency.record('request', time.perf_counter() - flask.g.callback_start)
+
+def stream():
+    import flask
+
+    if live_stream is None:
+        flask.abort(404)
+    last_id = flask.request.headers.get('Last-Event-ID', type=int)
+    return flask.Response(live_stream.events(last_id), mimetype='text/event-stream',
+                          headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def debug_latency():
+    import flask
+
+    return flask.jsonify({'profiling': profiling.enabled(), 'callbacks': latency.percentiles()})
+
 def serve_layout():
-    df = pd.read_csv(DATA_FILE, parse_dates=['timestamp'])
+    from dash import dcc, html
+
+    live = [html.Div(id='live-config', **{'data-stream': '/stream', 'data-window': LIVE_WINDOW})]
+    symbols = list(SHARDS or [])
     return html.Div([
         html.H1("📈 QuantRush Real-Time Dashboard"),
+        # Symbol picker, shown for sharded logs only
+        dcc.Dropdown(id='symbol-select', options=symbols, value=symbols[:DEFAULT_SELECTED],
+                     multi=True, placeholder='Symbols',
+                     style={} if SHARDS else {'display': 'none'}),
         dcc.Graph(id='pnl-graph'),
         dcc.Graph(id='inventory-graph'),
-        dcc.Interval(id='interval-component', interval=5000, n_intervals=0)
+        dcc.Graph(id='risk-graph'),
+        dcc.Store(id='view-state', data={'version': -1, 'range': None}),
+        # In push mode the client bumps n_intervals itself when it needs a full redraw
+        dcc.Interval(id='interval-component', interval=5000, n_intervals=0, disabled=PUSH_UPDATES),
+    ] + (live if PUSH_UPDATES else []))
+
+def relayout_range(relayout, current):
+    """Visible x-range after a zoom/pan event, ``None`` meaning the full run."""
+    if not relayout:
+        return current
+    if 'xaxis.range[0]' in relayout:
+        return [relayout['xaxis.range[0]'], relayout['xaxis.range[1]']]
+    if 'xaxis.range' in relayout:
+        return list(relayout['xaxis.range'])
+    if relayout.get('xaxis.autorange'):
+        return None
+    return current
+
+def build_figure(df, column, title, x_range, live=None):
+    """Figure of ``column`` over ``x_range``; ``live`` (push mode) is the draw's meta."""
+    import plotly.express as px
+    import plotly.graph_objects as go
+
+    if df.empty:
+        # A log truncated back to its header: clear the graph rather than keep stale data
+        fig = go.Figure()
+        fig.update_layout(title=title, xaxis_title='timestamp', yaxis_title=column, uirevision=column)
+        if live is not None:
+            fig.update_layout(meta={**live, 'rows': 0})
+        return fig
+
+    if live is not None:
+        fig = px.line(df.iloc[-LIVE_WINDOW:], x='timestamp', y=column, title=title)
+        fig.update_layout(uirevision=column, meta={**live, 'rows': len(df)})
+        return fig
+
+    ts = df['timestamp'].to_numpy()
+    if x_range is None:
+        start, end = ts[0], ts[-1]
+    else:
+        start, end = (np.datetime64(pd.Timestamp(x).as_unit('ns').to_datetime64()) for x in x_range)
+    # Fetch half a view either side so small pans don't show empty space
+    pad = (end - start) // 2
+    lo = np.searchsorted(ts, start - pad)
+    hi = np.searchsorted(ts, end + pad, side='right')
+
+    if hi - lo <= RAW_SCAN_FACTOR * MAX_POINTS:
+        view = downsample_frame(df.iloc[lo:hi], 'timestamp', column, MAX_POINTS, DOWNSAMPLE_METHOD)
+        fig = px.line(view, x='timestamp', y=column, title=title)
+    else:
+        start_ns = int((start - pad).astype('datetime64[ns]').view('i8'))
+        end_ns = int((end + pad).astype('datetime64[ns]').view('i8'))
+        level, buckets = pyramid.query(start_ns, end_ns, MAX_POINTS)
+        stats = buckets[column]
+        fig = go.Figure([
+            go.Scatter(x=buckets['timestamp'], y=stats['max'], mode='lines',
+                       line=dict(width=0), showlegend=False, hoverinfo='skip'),
+            go.Scatter(x=buckets['timestamp'], y=stats['min'], mode='lines', fill='tonexty',
+                       line=dict(width=0), name=f'{level} min/max'),
+            go.Scatter(x=buckets['timestamp'], y=stats['mean'], mode='lines', name=f'{level} mean'),
+        ])
+        fig.update_layout(title=f'{title} ({level} buckets)', xaxis_title='timestamp',
+                          yaxis_title=column)
+
+    if x_range is not None:
+        fig.update_xaxes(range=x_range)
+    fig.update_layout(uirevision=column)
+    return fig
+
+def build_risk_figure(x_range, live=None):
+    import plotly.graph_objects as go
+
+    risk = risk_feed.frame()
+    rows = len(risk)
+    if live is not None:
+        var = es = risk.iloc[-LIVE_WINDOW:]
+    else:
+        if x_range is not None and len(risk):
+            start, end = (np.datetime64(pd.Timestamp(x).as_unit('ns').to_datetime64()) for x in x_range)
+            ts = risk['timestamp'].to_numpy()
+            risk = risk.iloc[np.searchsorted(ts, start):np.searchsorted(ts, end, side='right')]
+        var = downsample_frame(risk, 'timestamp', 'var', MAX_POINTS, DOWNSAMPLE_METHOD)
+        es = downsample_frame(risk, 'timestamp', 'es', MAX_POINTS, DOWNSAMPLE_METHOD)
+    level = f"{risk_feed.risk.confidence:.0%}"
+    fig = go.Figure([
+        go.Scatter(x=var['timestamp'], y=var['var'], mode='lines', name=f'VaR ({level})',
+                   line=dict(color='red')),
+        go.Scatter(x=es['timestamp'], y=es['es'], mode='lines', name='Expected Shortfall',
+                   line=dict(color='darkred')),
     ])
+    fig.update_layout(title=f'Rolling Risk ({risk_feed.risk.window} rows)', xaxis_title='timestamp',
+                      yaxis_title='loss', uirevision='risk')
+    if live is not None:
+        fig.update_layout(meta={**live, 'rows': rows})
+    if x_range is not None:
+        fig.update_xaxes(range=x_range)
+    return fig
 
-@app.callback(
-    Output('pnl-graph', 'figure'),
-    Output('inventory-graph', 'figure'),
-    Input('interval-component', 'n_intervals')
-)
-def update_graphs(n):
-    df = pd.read_csv(DATA_FILE, parse_dates=['timestamp'])
+def symbol_ingester(symbol):
+    """Ingester of one symbol's shard, started on first use."""
+    with symbol_lock:
+        ingester = symbol_ingesters.get(symbol)
+        if ingester is not None:
+            symbol_ingesters.move_to_end(symbol)
+            return ingester
+        path = SHARDS[symbol]
+        ingester = BackgroundIngester(open_tailer(path), INGEST_INTERVAL,
+                                      feeds=[RiskFeed('pnl', risk_feed.risk.window,
+                                                      risk_feed.risk.confidence)])
+        seed_from_cache(ingester, path)
+        ingester.refresh()
+        symbol_ingesters[symbol] = ingester.start()
+        while len(symbol_ingesters) > MAX_OPEN_SYMBOLS:
+            _, evicted = symbol_ingesters.popitem(last=False)
+            evicted.stop()
+        return ingester
 
-    pnl_fig = px.line(df, x='timestamp', y='pnl', title='PnL Over Time')
-    inv_fig = px.line(df, x='timestamp', y='inventory', title='Inventory Over Time')
+def clip_range(df, x_range):
+    if x_range is None or df.empty:
+        return df
+    start, end = (np.datetime64(pd.Timestamp(x).as_unit('ns').to_datetime64()) for x in x_range)
+    ts = df['timestamp'].to_numpy()
+    return df.iloc[np.searchsorted(ts, start):np.searchsorted(ts, end, side='right')]
 
-    return pnl_fig, inv_fig
+def selection_totals(frames, versions):
+    """P&L and inventory summed over the selected symbols, recomputed when any shard grew."""
+    if totals_cache.get('versions') != versions:
+        parts = [last_per_bucket(df['timestamp'].to_numpy().astype('datetime64[ns]').view('i8'),
+                                 {'pnl': df['pnl'].to_numpy(), 'inventory': df['inventory'].to_numpy()},
+                                 TOTAL_BUCKET_NS)
+                 for df in frames.values()]
+        totals_cache.update(versions=versions, totals=combine_buckets(parts))
+    return totals_cache['totals']
 
-app.layout = serve_layout
+def build_symbols_figure(frames, totals, column, title, x_range):
+    """One line per selected symbol, plus their total when there are several."""
+    import plotly.graph_objects as go
 
-def run_dashboard(port):
-    app.run_server(debug=False, port=port)
+    budget = max(MAX_POINTS // max(len(frames), 1), 200)
+    fig = go.Figure()
+    for symbol, df in frames.items():
+        view = downsample_frame(clip_range(df, x_range), 'timestamp', column, budget, DOWNSAMPLE_METHOD)
+        fig.add_trace(go.Scatter(x=view['timestamp'], y=view[column], mode='lines', name=symbol))
+    if totals is not None:
+        view = downsample_frame(clip_range(totals, x_range), 'timestamp', column, MAX_POINTS,
+                                DOWNSAMPLE_METHOD)
+        fig.add_trace(go.Scatter(x=view['timestamp'], y=view[column], mode='lines', name='Total',
+                                 line=dict(color='black', width=2)))
+    fig.update_layout(title=title, xaxis_title='timestamp', yaxis_title=column, uirevision=column)
+    if x_range is not None:
+        fig.update_xaxes(range=x_range)
+    return fig
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
+def build_symbols_risk_figure(feeds, x_range):
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    for symbol, feed in feeds.items():
+        risk = clip_range(feed.frame(), x_range)
+        var = downsample_frame(risk, 'timestamp', 'var', MAX_POINTS, DOWNSAMPLE_METHOD)
+        fig.add_trace(go.Scatter(x=var['timestamp'], y=var['var'], mode='lines',
+                                 name=f'{symbol} VaR'))
+    fig.update_layout(title=f'Rolling VaR ({risk_feed.risk.confidence:.0%}, '
+                            f'{risk_feed.risk.window} rows)',
+                      xaxis_title='timestamp', yaxis_title='loss', uirevision='risk')
+    if x_range is not None:
+        fig.update_xaxes(range=x_range)
+    return fig
+
+def update_symbol_graphs(symbols, x_range, state):
+    """``update_graphs`` for sharded logs: only the selected shards are read."""
+    from dash.exceptions import PreventUpdate
+
+    if not symbols:
+        raise PreventUpdate
+    ingesters = {symbol: symbol_ingester(symbol) for symbol in symbols}
+    snapshots = {symbol: ingester.snapshot() for symbol, ingester in ingesters.items()}
+    version = [[symbol, snapshot[0]] for symbol, snapshot in snapshots.items()]
+    if version == state['version'] and x_range == state['range']:
+        raise PreventUpdate
+    frames = {symbol: df for symbol, (_, df) in snapshots.items() if not df.empty}
+    with latency.measure('update_graphs'), stage('dashboard.update_graphs', symbols=len(frames)):
+        totals = selection_totals(frames, version) if len(frames) > 1 else None
+        figures = (
+            build_symbols_figure(frames, totals, 'pnl', 'PnL Over Time', x_range),
+            build_symbols_figure(frames, totals, 'inventory', 'Inventory Over Time', x_range),
+            build_symbols_risk_figure({symbol: ingesters[symbol].feeds[0] for symbol in frames},
+                                      x_range),
+        )
+    return (*figures, {'version': version, 'range': x_range})
+
+def update_graphs(n, pnl_relayout, inv_relayout, symbols, state):
+    import dash
+    from dash.exceptions import PreventUpdate
+
+    if SHARDS is not None:
+        x_range = state['range']
+        if dash.ctx.triggered_id == 'pnl-graph':
+            x_range = relayout_range(pnl_relayout, x_range)
+        elif dash.ctx.triggered_id == 'inventory-graph':
+            x_range = relayout_range(inv_relayout, x_range)
+        return update_symbol_graphs(symbols, x_range, state)
+
+    # Read before the snapshot: a reset in between then shows up as a newer generation
+    generation = live_stream.generation if live_stream is not None else 0
+    version, df = ingester.snapshot()
+    x_range = state['range']
+    if dash.ctx.triggered_id == 'pnl-graph':
+        x_range = relayout_range(pnl_relayout, x_range)
+    elif dash.ctx.triggered_id == 'inventory-graph':
+        x_range = relayout_range(inv_relayout, x_range)
+
+    # In push mode the interval only fires when the client asks for a redraw
+    forced = live_stream is not None and dash.ctx.triggered_id == 'interval-component'
+    if not forced and version == state['version'] and x_range == state['range']:
+        raise PreventUpdate
+
+    live = None
+    if live_stream is not None and x_range is None:
+        live = {'live': True, 'token': next(draws), 'generation': generation}
+    with latency.measure('update_graphs'), stage('dashboard.update_graphs', rows=len(df)):
+        with stage('dashboard.figure.pnl'):
+            pnl_fig = build_figure(df, 'pnl', 'PnL Over Time', x_range, live)
+        with stage('dashboard.figure.inventory'):
+            inv_fig = build_figure(df, 'inventory', 'Inventory Over Time', x_range, live)
+        with stage('dashboard.figure.risk'):
+            risk_fig = build_risk_figure(x_range, live)
+        if live is None and live_stream is not None:
+            # Zoomed in: the client leaves these figures alone until the view resets
+            for fig in (pnl_fig, inv_fig, risk_fig):
+                fig.update_layout(meta={'live': False})
+
+    return pnl_fig, inv_fig, risk_fig, {'version': version, 'range': x_range}
+
+def create_app():
+    """Build the Dash app: the timing hooks, routes, layout and figure callback."""
+    global app
+    import dash
+    from dash.dependencies import Input, Output, State
+
+    app = dash.Dash(__name__)
+    app.server.before_request(start_callback_timer)
+    app.server.teardown_request(stop_callback_timer)
+    app.server.route('/stream')(stream)
+    app.server.route('/debug/latency')(debug_latency)
+    app.callback(
+        Output('pnl-graph', 'figure'),
+        Output('inventory-graph', 'figure'),
+        Output('risk-graph', 'figure'),
+        Output('view-state', 'data'),
+        Input('interval-component', 'n_intervals'),
+        Input('pnl-graph', 'relayoutData'),
+        Input('inventory-graph', 'relayoutData'),
+        Input('symbol-select', 'value'),
+        State('view-state', 'data')
+    )(update_graphs)
+    app.layout = serve_layout
+    return app
+
+def seed_from_cache(ingester, path):
+    """Start the tailer from the columnar cache rather than parsing the whole CSV."""
+    if not isinstance(ingester.tailer, LogTailer) or not os.path.exists(path):
+        return
+    meta = ensure_cache(path)
+    ingester.seed(load_log(path), meta['offset'])
+
+def run_dashboard(port, ingest_interval=1.0, max_points=DEFAULT_MAX_POINTS, method='minmax',
+                  data_file=DATA_FILE, risk_window=DEFAULT_WINDOW, confidence=DEFAULT_CONFIDENCE,
+                  push=False, live_window=DEFAULT_LIVE_WINDOW):
+    global MAX_POINTS, DOWNSAMPLE_METHOD, DATA_FILE, risk_feed
+    global PUSH_UPDATES, LIVE_WINDOW, live_stream, SHARDS, INGEST_INTERVAL
+    MAX_POINTS, DOWNSAMPLE_METHOD, DATA_FILE = max_points, method, data_file
+    risk_feed = RiskFeed('pnl', risk_window, confidence)
+    INGEST_INTERVAL = ingest_interval
+    if is_sharded(DATA_FILE):
+        SHARDS = open_shards(DATA_FILE)
+        print(f"📂 {len(SHARDS):,} symbols in {DATA_FILE}; shards are loaded as they are selected")
+        create_app().run(debug=False, port=port, threaded=True)
+        return
+    ingester.feeds = [risk_feed]
+    if push:
+        PUSH_UPDATES, LIVE_WINDOW = True, live_window
+        # After risk_feed, so each message can carry the batch's new VaR / ES points
+        live_stream = LiveStream(('pnl', 'inventory'), risk_feed, live_window)
+        ingester.feeds.append(live_stream)
+        # Wake on appends rather than every ingest_interval
+        ingester.watcher = FileWatcher(DATA_FILE)
+    # CSV or binary .qrlog, detected from the file itself
+    ingester.tailer = open_tailer(DATA_FILE)
+    ingester.interval = ingest_interval
+    seed_from_cache(ingester, DATA_FILE)
+    ingester.refresh()
+    ingester.start()
+    create_app().run(debug=False, port=port, threaded=True)
+
+def build_parser(prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Serve the real-time QuantRush dashboard")
     parser.add_argument('--port', type=int, default=8080)
-    args = parser.parse_args()
-    run_dashboard(args.port)
+    parser.add_argument('--data', default=DATA_FILE,
+                        help='Simulation log to watch (CSV or binary .qrlog), or a directory of '
+                             'per-symbol shards / a log with a symbol column')
+    parser.add_argument('--ingest-interval', type=float, default=1.0,
+                        help='Seconds between background polls of the simulation log')
+    parser.add_argument('--max-points', type=int, default=DEFAULT_MAX_POINTS,
+                        help='Maximum points sent to the browser per series')
+    parser.add_argument('--downsample', choices=METHODS, default='minmax',
+                        help='Downsampling method for long series')
+    parser.add_argument('--risk-window', type=int, default=DEFAULT_WINDOW,
+                        help='Rows in the rolling VaR / Expected Shortfall window')
+    parser.add_argument('--confidence', type=float, default=DEFAULT_CONFIDENCE,
+                        help='VaR / Expected Shortfall confidence level')
+    parser.add_argument('--push', action='store_true',
+                        help='Push appended rows to the browser as they arrive instead of 5s polling')
+    parser.add_argument('--live-window', type=int, default=DEFAULT_LIVE_WINDOW,
+                        help='Points kept per series in the browser in --push mode')
+    parser.add_argument('--profile', nargs='?', const=profiling.DEFAULT_TRACE, default=None,
+                        metavar='TRACE',
+                        help=f'Time ingestion and callback stages; the Chrome trace is written on exit '
+                             f'(default {profiling.DEFAULT_TRACE}; also enabled by {profiling.ENV_VAR})')
+    return parser
+
+def main(argv=None, prog=None):
+    parser = build_parser(prog)
+    args = parser.parse_args(argv)
+    if args.push and is_sharded(args.data):
+        parser.error("--push needs a single-symbol log")
+    trace = profiling.configure(args.profile)
+    if trace:
+        print(f"⏱️  Profiling enabled, stage trace will be written to {trace}")
+    run_dashboard(args.port, args.ingest_interval, args.max_points, args.downsample, args.data,
+                  args.risk_window, args.confidence, args.push, args.live_window)
+
+if __name__ == "__main__":
+    main()
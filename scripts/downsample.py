@@ -0,0 +1,105 @@
+"""
+Vectorized downsampling of long time series before plotting.
+
+A chart is only a couple of thousand pixels wide, so plotting millions of raw
+rows just inflates the figure payload. Both reducers return sorted row
+indices into the original series so callers can slice any aligned columns.
+
+``minmax`` keeps the lowest and highest point of every bucket, so P&L spikes
+and inventory limit breaches always survive. ``lttb`` (largest triangle three
+buckets) keeps the visually most significant point per bucket and is smoother
+for trending series; the global extremes are always added back. Either way
+at most ``max_points`` indices are returned, the first and last point included.
+"""
+
+import numpy as np
+
+DEFAULT_MAX_POINTS = 2000
+METHODS = ('minmax', 'lttb')
+
+
+def _as_float(values):
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64) or np.issubdtype(values.dtype, np.timedelta64):
+        return values.view('i8').astype(np.float64)
+    return values.astype(np.float64, copy=False)
+
+
+def minmax_indices(y, max_points=DEFAULT_MAX_POINTS):
+    """Indices of the first and last point and of the min and max of equal-width buckets."""
+    y = _as_float(y)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    if max_points < 4:
+        # No room for a bucket's min and max next to the endpoints
+        return np.array([0, n - 1])[:max(max_points, 0)]
+    # The two endpoints come out of the budget
+    buckets = (max_points - 2) // 2
+
+    width = -(-n // buckets)
+    buckets = -(-n // width)
+    padded_lo = np.full(buckets * width, np.inf)
+    padded_hi = np.full(buckets * width, -np.inf)
+    padded_lo[:n] = np.where(np.isnan(y), np.inf, y)
+    padded_hi[:n] = np.where(np.isnan(y), -np.inf, y)
+
+    offsets = np.arange(buckets) * width
+    lo = offsets + padded_lo.reshape(buckets, width).argmin(axis=1)
+    hi = offsets + padded_hi.reshape(buckets, width).argmax(axis=1)
+    return np.unique(np.concatenate(([0, n - 1], lo, hi)))
+
+
+def lttb_indices(x, y, max_points=DEFAULT_MAX_POINTS):
+    """Largest-triangle-three-buckets selection of ``max_points`` indices."""
+    x = _as_float(x)
+    y = _as_float(y)
+    n = len(y)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+    # Keep room for the global extremes within the budget
+    extremes = max_points >= 5 and not np.isnan(y).all()
+    points = max_points - 2 if extremes else max_points
+
+    # Interior buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    starts, stops = edges[:-1], edges[1:]
+
+    # Average of every bucket, used as the third triangle vertex
+    x_avg = np.add.reduceat(x[1:n - 1], starts - 1) / (stops - starts)
+    y_avg = np.add.reduceat(y[1:n - 1], starts - 1) / (stops - starts)
+    x_avg = np.append(x_avg, x[-1])
+    y_avg = np.append(y_avg, y[-1])
+
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i, (start, stop) in enumerate(zip(starts, stops)):
+        bx = x[start:stop]
+        by = y[start:stop]
+        cx, cy = x_avg[i + 1], y_avg[i + 1]
+        area = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = start + int(np.nanargmax(area)) if not np.isnan(area).all() else start
+        selected[i + 1] = a
+
+    if not extremes:
+        # nanargmin / nanargmax raise on an all-NaN series
+        return np.unique(selected)
+    return np.unique(np.concatenate((selected, [int(np.nanargmin(y)), int(np.nanargmax(y))])))
+
+
+def downsample_indices(x, y, max_points=DEFAULT_MAX_POINTS, method='minmax'):
+    if method == 'minmax':
+        return minmax_indices(y, max_points)
+    if method == 'lttb':
+        return lttb_indices(x, y, max_points)
+    raise ValueError(f"Unknown downsampling method {method!r}, expected one of {METHODS}")
+
+
+def downsample_frame(df, x, y, max_points=DEFAULT_MAX_POINTS, method='minmax'):
+    """Rows of ``df`` that best represent ``df[y]`` against ``df[x]``."""
+    if len(df) <= max_points:
+        return df
+    idx = downsample_indices(df[x].to_numpy(), df[y].to_numpy(), max_points, method)
+    return df.iloc[idx]
@@ -0,0 +1,112 @@
+"""
+Wake-ups on changes to a single file.
+
+``FileWatcher.wait(timeout)`` returns as soon as the watched file may have
+changed, so a tailer can react within milliseconds instead of sleeping for
+a fixed poll interval. On Linux it uses inotify (through libc, no extra
+dependency) on the file's directory, which also catches the file being
+created, replaced or rotated. Elsewhere, or if inotify is unavailable, it
+falls back to polling ``os.stat`` for size, mtime and inode changes.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+# <sys/inotify.h>
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')
+
+DEFAULT_STAT_INTERVAL = 0.1
+
+
+def _inotify():
+    """libc if it provides inotify, else None."""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+    except OSError:
+        return None
+    if not (hasattr(libc, 'inotify_init1') and hasattr(libc, 'inotify_add_watch')):
+        return None
+    return libc
+
+
+class FileWatcher:
+    """Wait for changes to ``path``; ``backend`` is ``'inotify'`` or ``'stat'``."""
+
+    def __init__(self, path, stat_interval=DEFAULT_STAT_INTERVAL):
+        self.path = path
+        self.stat_interval = stat_interval
+        self._fd = None
+        self._name = os.fsencode(os.path.basename(path))
+        libc = _inotify()
+        if libc is not None:
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            directory = os.path.dirname(os.path.abspath(path))
+            if fd >= 0 and libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) >= 0:
+                self._fd = fd
+            elif fd >= 0:
+                os.close(fd)
+        self.backend = 'stat' if self._fd is None else 'inotify'
+        self._last = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns, st.st_ino
+
+    def _matching_events(self):
+        """Drain pending inotify events; True if any concerned the watched file."""
+        matched = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return matched
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                matched = matched or name == self._name
+
+    def wait(self, timeout):
+        """Block up to ``timeout`` seconds; True if the file changed meanwhile."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if self._fd is not None:
+                readable, _, _ = select.select([self._fd], [], [], max(remaining, 0))
+                if readable and self._matching_events():
+                    return True
+            else:
+                current = self._stat()
+                if current != self._last:
+                    self._last = current
+                    return True
+                if remaining > 0:
+                    time.sleep(min(self.stat_interval, remaining))
+            if remaining <= 0:
+                return False
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -1,41 +1,439 @@
-
 import argparse
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
 
-def generate_report(input_file):
-    df = pd.read_csv(input_file, parse_dates=['timestamp'])
+from attribution import (COMPONENT_LABELS, COMPONENTS, DEFAULT_INTERVAL, PnLAttribution,
+                         attribute_frame, has_attribution_columns)
+from compare import (DEFAULT_INVENTORY_LIMIT, RANK_METRICS, compare_runs, expand_inputs,
+                     rank_runs)
+from downsample import DEFAULT_MAX_POINTS, METHODS, downsample_frame
+from hdr import PERCENTILES, read_logs
+from log_cache import iter_chunks, load_log
+from market_maker import TRADING_SECONDS_PER_YEAR
+import profiling
+from profiling import stage
+from rolling import rolling_max_drawdown, rolling_sharpe
+from shards import (DEFAULT_BUCKET, combine_buckets, is_sharded, open_shards, select_symbols,
+                    summarize_shards)
+from streaming_stats import StreamingSummary
 
-    # Summary statistics
-    summary = df.describe()
-    print("📊 Summary Statistics:\n", summary)
+DEFAULT_CHUNKSIZE = 1_000_000
+DEFAULT_LATENCY_LOG = 'results/latency_histograms.jsonl'
+DEFAULT_WINDOW = 300
 
-    # PnL over time
-    plt.figure(figsize=(10, 5))
-    sns.lineplot(data=df, x='timestamp', y='pnl')
-    plt.title("PnL Over Time")
-    plt.xlabel("Timestamp")
-    plt.ylabel("PnL")
-    plt.tight_layout()
-    plt.savefig("results/pnl_over_time.png")
+def periods_per_year(timestamps):
+    """Annualisation factor for the log's median sampling interval."""
+    ts = np.asarray(timestamps).astype('datetime64[ns]').view('i8')
+    if len(ts) < 2:
+        return 1.0
+    step = np.median(np.diff(ts)) / 1e9
+    return TRADING_SECONDS_PER_YEAR / step if step > 0 else 1.0
+
+def rolling_metrics(timestamps, pnl, window, annualisation):
+    """Rolling Sharpe of P&L changes and rolling max drawdown of P&L."""
+    pnl = np.asarray(pnl, dtype=np.float64)
+    returns = np.diff(pnl, prepend=pnl[:1])
+    return pd.DataFrame({
+        'timestamp': timestamps,
+        'rolling_sharpe': rolling_sharpe(returns, window, annualisation, fill=np.nan),
+        'rolling_drawdown': rolling_max_drawdown(pnl, window, relative=False, fill=np.nan),
+    })
+
+def plot_series(df, column, title, ylabel, output):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
-    # Inventory over time
     plt.figure(figsize=(10, 5))
-    sns.lineplot(data=df, x='timestamp', y='inventory')
-    plt.title("Inventory Level Over Time")
+    sns.lineplot(data=df, x='timestamp', y=column, estimator=None)
+    plt.title(title)
     plt.xlabel("Timestamp")
-    plt.ylabel("Inventory")
+    plt.ylabel(ylabel)
     plt.tight_layout()
-    plt.savefig("results/inventory_over_time.png")
+    with stage('plot.savefig', output=output):
+        plt.savefig(output)
 
-    print("✅ Report generated and plots saved in results/")
+def plot_rolling(sharpe_df, drawdown_df, window, output):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Generate Performance Report from Simulation Log")
-    parser.add_argument('--input', type=str, required=True, help='Path to simulation_log.csv')
-    args = parser.parse_args()
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8), sharex=True)
+    sns.lineplot(data=sharpe_df, x='timestamp', y='rolling_sharpe', estimator=None, ax=ax1)
+    ax1.axhline(y=0, color='black', linestyle='-', alpha=0.5)
+    ax1.set_title(f"Rolling Sharpe Ratio ({window} rows, annualised)")
+    ax1.set_ylabel("Sharpe Ratio")
+    sns.lineplot(data=drawdown_df, x='timestamp', y='rolling_drawdown', estimator=None, ax=ax2,
+                 color='#C73E1D')
+    ax2.set_title(f"Rolling Maximum Drawdown ({window} rows)")
+    ax2.set_xlabel("Timestamp")
+    ax2.set_ylabel("Drawdown (PnL)")
+    fig.tight_layout()
+    with stage('plot.savefig', output=output):
+        fig.savefig(output)
+
+def plot_attribution(attribution, output):
+    import matplotlib.pyplot as plt
+
+    totals = attribution.totals()
+    intervals = attribution.intervals()
+    colors = ['#2E8B57', '#1F77B4', '#9467BD', '#8C564B']
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8))
+    labels = [COMPONENT_LABELS[c] for c in COMPONENTS] + ['Net']
+    ax1.bar(labels, [totals[c] for c in COMPONENTS] + [totals['net']], color=colors + ['black'],
+            alpha=0.7)
+    ax1.axhline(y=0, color='black', linestyle='-', alpha=0.5)
+    ax1.set_title("P&L Attribution by Component")
+    ax1.set_ylabel("PnL")
+    # Per-interval breakdown: gains stacked above zero, losses below
+    x = intervals.index
+    width = (x[1] - x[0]) * 0.8 if len(x) > 1 else pd.Timedelta(attribution.interval) * 0.8
+    up = np.zeros(len(x))
+    down = np.zeros(len(x))
+    for component, color in zip(COMPONENTS, colors):
+        values = intervals[component].to_numpy(dtype=np.float64)
+        bottom = np.where(values >= 0, up, down)
+        ax2.bar(x, values, width=width, bottom=bottom, color=color, alpha=0.7,
+                label=COMPONENT_LABELS[component])
+        up += np.maximum(values, 0)
+        down += np.minimum(values, 0)
+    ax2.plot(x, intervals['net'], color='black', marker='.', linewidth=1, label='Net')
+    ax2.axhline(y=0, color='black', linestyle='-', alpha=0.5)
+    ax2.set_title(f"P&L Attribution per {pd.Timedelta(attribution.interval)} Interval")
+    ax2.set_xlabel("Timestamp")
+    ax2.set_ylabel("PnL")
+    ax2.legend(fontsize=8)
+    fig.tight_layout()
+    with stage('plot.savefig', output=output):
+        fig.savefig(output)
+
+def latency_table(histograms):
+    """Percentiles in microseconds per latency path, merged over runs and per run."""
+    rows = []
+    for name, by_run in sorted(histograms.items()):
+        runs = [key for key in by_run if key != 'all']
+        for key in ['all'] + sorted(runs):
+            row = by_run[key].summary()
+            rows.append({'path': name, 'run': key, 'runs': len(runs) if key == 'all' else 1,
+                         'count': row.pop('count'),
+                         **{k: v / 1e3 for k, v in row.items()}})
+    return pd.DataFrame(rows)
+
+def plot_latency(histograms, output):
+    """Latency by percentile (HDR-style), one line per path, merged over runs."""
+    import matplotlib.pyplot as plt
+
+    quantiles = 100 - np.logspace(np.log10(50), -3, 200)
+    fig, ax = plt.subplots(figsize=(10, 5))
+    for name, by_run in sorted(histograms.items()):
+        merged = by_run['all']
+        values = [merged.value_at_percentile(q) / 1e3 for q in quantiles]
+        ax.plot(100 / (100 - quantiles), values, label=f"{name} ({merged.count:,} samples)")
+    ticks = [50, 90, 99, 99.9, 99.99, 99.999]
+    ax.set_xscale('log')
+    ax.set_xticks([100 / (100 - q) for q in ticks])
+    ax.set_xticklabels([f"{q:g}%" for q in ticks])
+    ax.set_title("Latency by Percentile (all runs)")
+    ax.set_xlabel("Percentile")
+    ax.set_ylabel("Latency (µs)")
+    ax.legend()
+    fig.tight_layout()
+    with stage('plot.savefig', output=output):
+        fig.savefig(output)
+
+def latency_report(paths=None, plots=True):
+    """Merge latency histogram dumps and report p50/p99/p99.9/max per path.
+
+    ``paths`` defaults to the engine's default dump, if there is one.
+    """
+    if paths is None:
+        paths = [DEFAULT_LATENCY_LOG] if os.path.exists(DEFAULT_LATENCY_LOG) else []
+    if not paths:
+        return
+    histograms = read_logs(paths)
+    if not histograms:
+        print("ℹ️  Latency logs hold no histograms; skipping latency section")
+        return
+    table = latency_table(histograms)
+    columns = ['path', 'runs', 'count'] + [f'p{q:g}' for q in PERCENTILES] + ['max']
+    print("⏱️  Latency (µs, merged over runs):\n",
+          table[table['run'] == 'all'][columns].to_string(index=False, float_format='{:.2f}'.format))
+    table.to_csv("results/latency_summary.csv", index=False)
+    if plots:
+        with stage('plot.latency'):
+            plot_latency(histograms, "results/latency_percentiles.png")
+
+def plot_overlay(series, runs, column, title, ylabel, output):
+    """One line per run, best first."""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    for run in runs:
+        df = series[run][column]
+        ax.plot(df['timestamp'], df[column], linewidth=1, label=run)
+    ax.set_title(title)
+    ax.set_xlabel("Timestamp")
+    ax.set_ylabel(ylabel)
+    ax.legend(fontsize=8)
+    fig.tight_layout()
+    with stage('plot.savefig', output=output):
+        fig.savefig(output)
+
+def comparison_report(patterns, top=10, rank_by='final_pnl', jobs=None,
+                      inventory_limit=DEFAULT_INVENTORY_LIMIT, max_points=DEFAULT_MAX_POINTS,
+                      method='minmax', chunksize=DEFAULT_CHUNKSIZE, plots=True):
+    """Rank every log matched by ``patterns`` and overlay the ``top`` runs."""
+    paths = expand_inputs(patterns)
+    print(f"🚀 Comparing {len(paths):,} logs on {min(jobs or os.cpu_count() or 1, len(paths))} workers")
+    with stage('compare.measure', runs=len(paths)):
+        table, series = compare_runs(paths, jobs, inventory_limit, max_points, method, chunksize)
+    ranked = rank_runs(table, rank_by)
+    ranked.to_csv("results/run_comparison.csv", index=False)
+
+    columns = ['rank', 'run', 'final_pnl', 'sharpe', 'max_drawdown', 'max_abs_inventory',
+               'time_at_limit']
+    print(f"📊 Top {min(top, len(ranked))} of {len(ranked)} runs by {rank_by} "
+          f"(time at |inventory| >= {inventory_limit}):\n",
+          ranked[columns].head(top).to_string(index=False, float_format='{:.3f}'.format))
+
+    if not plots:
+        print("✅ Comparison saved in results/run_comparison.csv")
+        return
+    best = ranked['run'].head(top).tolist()
+    with stage('plot.compare'):
+        plot_overlay(series, best, 'pnl', f"PnL of the Top {len(best)} Runs by {rank_by}", "PnL",
+                     "results/run_comparison_pnl.png")
+        plot_overlay(series, best, 'inventory', f"Inventory of the Top {len(best)} Runs by {rank_by}",
+                     "Inventory", "results/run_comparison_inventory.png")
+    print("✅ Comparison saved in results/run_comparison.csv and results/run_comparison_*.png")
+
+def summarize_streaming(input_file, max_points, method, chunksize=DEFAULT_CHUNKSIZE,
+                        window=DEFAULT_WINDOW, attribution=None):
+    """describe() and plot-ready series of a log too large to load at once.
+
+    Memory stays bounded by ``chunksize``: statistics are accumulated in
+    StreamingSummary and each series is kept downsampled as chunks arrive.
+    Rolling metrics carry the last ``window + 1`` rows across chunk borders,
+    so they are identical to the in-memory computation. Chunks are also fed
+    to ``attribution`` (a ``PnLAttribution``) when given.
+    """
+    summary = StreamingSummary()
+    kept = {'pnl': [], 'inventory': [], 'rolling_sharpe': [], 'rolling_drawdown': []}
+    carry = None
+    annualisation = None
 
+    def keep(column, frame):
+        parts = kept[column]
+        parts.append(downsample_frame(frame[['timestamp', column]].dropna(), 'timestamp', column,
+                                      max_points, method))
+        if len(parts) > 4:
+            merged = pd.concat(parts, ignore_index=True)
+            parts[:] = [downsample_frame(merged, 'timestamp', column, max_points, method)]
+
+    for chunk in iter_chunks(input_file, chunksize):
+        with stage('aggregate.describe', rows=len(chunk)):
+            summary.update(chunk)
+        if attribution is not None:
+            with stage('aggregate.attribution', rows=len(chunk)):
+                attribution.update_frame(chunk)
+        with stage('aggregate.downsample'):
+            keep('pnl', chunk)
+            keep('inventory', chunk)
+
+        if annualisation is None:
+            annualisation = periods_per_year(chunk['timestamp'].to_numpy())
+        history = chunk[['timestamp', 'pnl']]
+        if carry is not None:
+            history = pd.concat([carry, history], ignore_index=True)
+        with stage('aggregate.rolling', rows=len(history)):
+            metrics = rolling_metrics(history['timestamp'].to_numpy(), history['pnl'].to_numpy(),
+                                      window, annualisation)
+        metrics = metrics.iloc[0 if carry is None else len(carry):]
+        with stage('aggregate.downsample'):
+            keep('rolling_sharpe', metrics)
+            keep('rolling_drawdown', metrics)
+        carry = history.iloc[-(window + 1):]
+
+    series = {}
+    with stage('aggregate.downsample'):
+        for column, parts in kept.items():
+            merged = pd.concat(parts, ignore_index=True)
+            series[column] = downsample_frame(merged, 'timestamp', column, max_points, method)
+    return summary, series
+
+def symbol_report(input_file, symbols=None, jobs=None, max_points=DEFAULT_MAX_POINTS,
+                  method='minmax', bucket=DEFAULT_BUCKET, symbol_plots=True, latency_logs=None,
+                  plots=True):
+    """Per-symbol and aggregate P&L / inventory of a sharded log, one process per shard."""
+    symbol_plots = symbol_plots and plots
+    shards = select_symbols(open_shards(input_file), symbols)
+    print(f"🚀 {len(shards):,} symbols on {min(jobs or os.cpu_count() or 1, len(shards))} workers")
+    with stage('shards.summarize', symbols=len(shards)):
+        results = summarize_shards(shards, jobs, max_points, method, bucket,
+                                   "results/symbols" if symbol_plots else None)
+
+    table = pd.DataFrame([result['row'] for result in results.values()])
+    table.to_csv("results/symbol_summary.csv", index=False)
+    with stage('aggregate.combine', symbols=len(shards)):
+        totals = combine_buckets([result['buckets'] for result in results.values()])
+    totals.to_csv("results/aggregate_pnl_inventory.csv", index=False)
+
+    columns = ['symbol', 'rows', 'final_pnl', 'sharpe', 'max_drawdown', 'max_abs_inventory',
+               'final_inventory']
+    ranked = table.sort_values('final_pnl', ascending=False)[columns]
+    print("📊 Per-Symbol Summary (best and worst 5 by final PnL):\n",
+          (ranked if len(ranked) <= 10 else pd.concat([ranked.head(5), ranked.tail(5)]))
+          .to_string(index=False, float_format='{:.2f}'.format))
+    if len(totals):
+        print(f"📊 Aggregate: final PnL {totals['pnl'].iloc[-1]:.2f}, final inventory "
+              f"{totals['inventory'].iloc[-1]:.0f}, max |inventory| {totals['inventory'].abs().max():.0f} "
+              f"({bucket} buckets)")
+
+    if plots:
+        with stage('plot.pnl'):
+            plot_series(downsample_frame(totals, 'timestamp', 'pnl', max_points, method), 'pnl',
+                        f"Aggregate PnL Over Time ({len(shards)} symbols)", "PnL",
+                        "results/pnl_over_time.png")
+        with stage('plot.inventory'):
+            plot_series(downsample_frame(totals, 'timestamp', 'inventory', max_points, method),
+                        'inventory', f"Aggregate Inventory Over Time ({len(shards)} symbols)",
+                        "Inventory", "results/inventory_over_time.png")
+    if symbol_plots:
+        print("🖼️  Per-symbol figures saved in results/symbols/")
+
+    latency_report(latency_logs, plots)
+    print("✅ Report generated and plots saved in results/" if plots else
+          "✅ Report tables saved in results/")
+
+def generate_report(input_file, max_points=DEFAULT_MAX_POINTS, method='minmax',
+                    streaming=False, chunksize=DEFAULT_CHUNKSIZE, window=DEFAULT_WINDOW,
+                    interval=DEFAULT_INTERVAL, fee_per_share=0.0, latency_logs=None, plots=True):
+    """Summary, plots and attribution of one log; ``plots=False`` prints and writes tables only."""
+    attribution = None
+    if streaming:
+        if has_attribution_columns(next(iter_chunks(input_file, 1)).columns):
+            attribution = PnLAttribution(interval, fee_per_share)
+        stats, series = summarize_streaming(input_file, max_points, method, chunksize, window,
+                                            attribution)
+        summary = stats.describe()
+    else:
+        with stage('load_log', path=input_file):
+            df = load_log(input_file)
+        with stage('aggregate.describe', rows=len(df)):
+            summary = df.describe()
+        if has_attribution_columns(df.columns):
+            with stage('aggregate.attribution', rows=len(df)):
+                attribution = attribute_frame(df, interval, fee_per_share)
+    if not streaming and plots:
+        ts = df['timestamp'].to_numpy()
+        with stage('aggregate.rolling', rows=len(df)):
+            metrics = rolling_metrics(ts, df['pnl'].to_numpy(), window, periods_per_year(ts)).dropna()
+        with stage('aggregate.downsample'):
+            series = {
+                'pnl': downsample_frame(df, 'timestamp', 'pnl', max_points, method),
+                'inventory': downsample_frame(df, 'timestamp', 'inventory', max_points, method),
+                'rolling_sharpe': downsample_frame(metrics, 'timestamp', 'rolling_sharpe', max_points, method),
+                'rolling_drawdown': downsample_frame(metrics, 'timestamp', 'rolling_drawdown', max_points, method),
+            }
+
+    # Summary statistics
+    print("📊 Summary Statistics:\n", summary)
+    if streaming:
+        print(f"ℹ️  Quantiles are approximate: rank error at most ±{stats.relative_error:.3%} "
+              f"of the row count (count/mean/std/min/max are exact)")
+
+    if plots:
+        # PnL over time
+        with stage('plot.pnl'):
+            plot_series(series['pnl'], 'pnl', "PnL Over Time", "PnL", "results/pnl_over_time.png")
+
+        # Inventory over time
+        with stage('plot.inventory'):
+            plot_series(series['inventory'], 'inventory', "Inventory Level Over Time", "Inventory",
+                        "results/inventory_over_time.png")
+
+        # Rolling Sharpe and drawdown
+        with stage('plot.rolling'):
+            plot_rolling(series['rolling_sharpe'], series['rolling_drawdown'], window,
+                         "results/rolling_metrics.png")
+
+    # P&L attribution (logs with price/qty/side/mid columns)
+    if attribution is not None:
+        print("📊 P&L Attribution:\n", attribution.totals().to_string())
+        if plots:
+            with stage('plot.attribution'):
+                plot_attribution(attribution, "results/pnl_attribution.png")
+        attribution.intervals().to_csv("results/pnl_attribution.csv")
+    else:
+        print("ℹ️  No price/qty/side/mid columns in the log; skipping P&L attribution")
+
+    # Latency histograms dumped by the C++ engine, merged across runs
+    latency_report(latency_logs, plots)
+
+    print("✅ Report generated and plots saved in results/" if plots else
+          "✅ Report tables saved in results/")
+
+def build_parser(prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Generate Performance Report from Simulation Log")
+    inputs = parser.add_mutually_exclusive_group(required=True)
+    inputs.add_argument('--input', type=str, help='Path to simulation_log.csv, a binary .qrlog or a directory of per-symbol shards')
+    inputs.add_argument('--compare', nargs='+', metavar='LOGS',
+                        help='Rank many runs instead: directories of logs and/or glob patterns')
+    parser.add_argument('--no-plots', action='store_true',
+                        help='Metrics only: print and write the tables, draw nothing (no plotting backend is loaded)')
+    parser.add_argument('--max-points', type=int, default=DEFAULT_MAX_POINTS,
+                        help='Maximum points plotted per series')
+    parser.add_argument('--downsample', choices=METHODS, default='minmax',
+                        help='Downsampling method for long series')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Read the log in chunks with bounded memory (approximate quantiles)')
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help='Rows per chunk in --streaming mode')
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW,
+                        help='Rolling window (rows) for the Sharpe and drawdown panels')
+    parser.add_argument('--interval', type=str, default=DEFAULT_INTERVAL,
+                        help='Interval of the P&L attribution breakdown (e.g. 1min, 1h)')
+    parser.add_argument('--fee-per-share', type=float, default=0.0,
+                        help='Fee per unit traded, for logs without a fee column')
+    parser.add_argument('--top', type=int, default=10, help='Runs overlaid in --compare charts')
+    parser.add_argument('--rank-by', choices=list(RANK_METRICS), default='final_pnl',
+                        help='Metric ranking --compare runs')
+    parser.add_argument('--inventory-limit', type=float, default=DEFAULT_INVENTORY_LIMIT,
+                        help='|inventory| counted as at the limit by --compare')
+    parser.add_argument('--symbols', nargs='+', default=None, metavar='SYMBOL',
+                        help='Symbols to report on, for a shard directory or a log with a symbol column '
+                             '(default: all)')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='Worker processes for sharded logs and --compare (default: all cores)')
+    parser.add_argument('--bucket', type=str, default=DEFAULT_BUCKET,
+                        help='Time bucket on which symbol P&L and inventory are summed (e.g. 1s, 1min)')
+    parser.add_argument('--no-symbol-plots', action='store_true',
+                        help='Skip the per-symbol figures of sharded logs')
+    parser.add_argument('--latency', nargs='+', default=None, metavar='LOG',
+                        help=f'Latency histogram dumps to merge (default {DEFAULT_LATENCY_LOG} if present)')
+    parser.add_argument('--profile', nargs='?', const=profiling.DEFAULT_TRACE, default=None,
+                        metavar='TRACE',
+                        help=f'Time each stage and write a Chrome trace (default {profiling.DEFAULT_TRACE}; '
+                             f'also enabled by {profiling.ENV_VAR})')
+    return parser
+
+def main(argv=None, prog=None):
+    args = build_parser(prog).parse_args(argv)
     os.makedirs("results", exist_ok=True)
-    generate_report(args.input)
+    trace = profiling.configure(args.profile)
+    plots = not args.no_plots
+    if args.compare:
+        comparison_report(args.compare, args.top, args.rank_by, args.jobs, args.inventory_limit,
+                          args.max_points, args.downsample, args.chunksize, plots)
+    elif is_sharded(args.input):
+        symbol_report(args.input, args.symbols, args.jobs, args.max_points, args.downsample,
+                      args.bucket, not args.no_symbol_plots, args.latency, plots)
+    else:
+        generate_report(args.input, args.max_points, args.downsample, args.streaming,
+                        args.chunksize, args.window, args.interval, args.fee_per_share,
+                        args.latency, plots)
+    if trace:
+        profiling.print_summary()
+        print(f"⏱️  Stage trace written to {profiling.write_trace()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Log-bucketed (HDR-style) latency histograms.
+
+The bucket layout is the one of ``src/latency_histogram.hpp``: values below
+``2**sub_bucket_bits`` have a bucket each, above that every power of two is
+split into ``2**(sub_bucket_bits - 1)`` equal buckets, so any value is kept
+to within ``1 / 2**(sub_bucket_bits - 1)`` of its true size (0.8% with the
+default 8 bits) in a fixed number of counters. Histograms with the same
+layout merge by adding counts, which is how intervals and runs combine.
+
+Dumps are JSON lines, one histogram per line::
+
+    {"name": "order_to_fill", "run": ..., "time_ns": ..., "unit": "ns",
+     "sub_bucket_bits": 8, "max_bits": 44, "count": ..., "sum": ...,
+     "min": ..., "max": ..., "buckets": [gap, count, gap, count, ...]}
+
+``buckets`` lists the non-empty buckets only, each index given as the gap
+from the previous one.
+"""
+
+import json
+from collections import defaultdict
+
+import numpy as np
+
+SUB_BUCKET_BITS = 8
+MAX_BITS = 44
+PERCENTILES = (50, 99, 99.9)
+
+
+def bucket_count(sub_bucket_bits=SUB_BUCKET_BITS, max_bits=MAX_BITS):
+    return (1 << sub_bucket_bits) + (max_bits - sub_bucket_bits) * (1 << (sub_bucket_bits - 1))
+
+
+def bucket_index(values, sub_bucket_bits=SUB_BUCKET_BITS, max_bits=MAX_BITS):
+    """Bucket of each (non-negative integer) value."""
+    values = np.maximum(np.asarray(values, dtype=np.int64), 0)
+    sub_buckets = 1 << sub_bucket_bits
+    half = sub_buckets >> 1
+    # frexp is exact for integers below 2**53: value = m * 2**e with m in [0.5, 1)
+    msb = np.frexp(values.astype(np.float64))[1] - 1
+    shift = np.maximum(msb - (sub_bucket_bits - 1), 1)
+    top = values >> shift
+    index = np.where(values < sub_buckets, values, sub_buckets + (shift - 1) * half + (top - half))
+    return np.minimum(index, bucket_count(sub_bucket_bits, max_bits) - 1)
+
+
+def bucket_bounds(index, sub_bucket_bits=SUB_BUCKET_BITS):
+    """Lowest and highest value of each bucket."""
+    index = np.asarray(index, dtype=np.int64)
+    sub_buckets = 1 << sub_bucket_bits
+    half = sub_buckets >> 1
+    offset = np.maximum(index - sub_buckets, 0)
+    shift = offset // half + 1
+    lower = np.where(index < sub_buckets, index, (offset % half + half) << shift)
+    upper = np.where(index < sub_buckets, index, lower + (1 << shift) - 1)
+    return lower, upper
+
+
+class LatencyHistogram:
+    """Counts per log bucket plus exact count, sum, min and max."""
+
+    def __init__(self, sub_bucket_bits=SUB_BUCKET_BITS, max_bits=MAX_BITS):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.max_bits = max_bits
+        self.counts = np.zeros(bucket_count(sub_bucket_bits, max_bits), dtype=np.int64)
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, values):
+        """Add one value or an array of them (integer nanoseconds)."""
+        values = np.atleast_1d(np.asarray(values, dtype=np.int64))
+        if not len(values):
+            return
+        index = bucket_index(values, self.sub_bucket_bits, self.max_bits)
+        self.counts += np.bincount(index, minlength=len(self.counts))
+        self.count += len(values)
+        self.sum += int(values.sum())
+        low = int(values.min())
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = max(self.max, int(values.max()))
+
+    def add(self, other):
+        """Merge ``other`` into this histogram."""
+        if (other.sub_bucket_bits, other.max_bits) != (self.sub_bucket_bits, self.max_bits):
+            raise ValueError("Cannot merge histograms with different bucket layouts")
+        self.counts += other.counts
+        self.count += other.count
+        self.sum += other.sum
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def value_at_percentile(self, percentile):
+        """Highest value of the bucket holding the percentile, capped at the max."""
+        if not self.count:
+            return 0
+        rank = max(int(np.ceil(percentile / 100 * self.count)), 1)
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        _, upper = bucket_bounds(index, self.sub_bucket_bits)
+        return min(int(upper), self.max)
+
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def summary(self, percentiles=PERCENTILES):
+        """``{'count', 'mean', 'p50', ..., 'max'}`` in the recorded unit."""
+        row = {'count': self.count, 'mean': self.mean()}
+        for q in percentiles:
+            row[f'p{q:g}'] = self.value_at_percentile(q)
+        row['max'] = self.max
+        return row
+
+    def to_dict(self, name, run=0, time_ns=0):
+        index = np.flatnonzero(self.counts)
+        gaps = np.diff(index, prepend=0)
+        buckets = np.column_stack([gaps, self.counts[index]]).ravel().tolist()
+        return {'name': name, 'run': run, 'time_ns': time_ns, 'unit': 'ns',
+                'sub_bucket_bits': self.sub_bucket_bits, 'max_bits': self.max_bits,
+                'count': self.count, 'sum': self.sum, 'min': self.min or 0, 'max': self.max,
+                'buckets': buckets}
+
+    @classmethod
+    def from_dict(cls, record):
+        hist = cls(record['sub_bucket_bits'], record['max_bits'])
+        pairs = np.asarray(record['buckets'], dtype=np.int64).reshape(-1, 2)
+        hist.counts[np.cumsum(pairs[:, 0])] = pairs[:, 1]
+        hist.count = int(record['count'])
+        hist.sum = int(record['sum'])
+        hist.min = int(record['min']) if hist.count else None
+        hist.max = int(record['max'])
+        return hist
+
+
+def write_log(path, histograms, run=0, time_ns=0):
+    """Append ``{name: LatencyHistogram}`` to a dump file."""
+    with open(path, 'a') as f:
+        for name, hist in histograms.items():
+            if hist.count:
+                f.write(json.dumps(hist.to_dict(name, run, time_ns)) + '\n')
+
+
+def read_logs(paths):
+    """Merge dump files into ``{name: {'all': histogram, run: histogram, ...}}``."""
+    merged = defaultdict(dict)
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                hist = LatencyHistogram.from_dict(record)
+                by_run = merged[record['name']]
+                for key in ('all', record['run']):
+                    if key in by_run:
+                        by_run[key].add(hist)
+                    else:
+                        by_run[key] = LatencyHistogram.from_dict(record)
+    return dict(merged)
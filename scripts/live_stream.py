@@ -0,0 +1,112 @@
+"""
+Server-sent events carrying only the rows appended to the log.
+
+``LiveStream`` is an ingester feed (see log_tail.BackgroundIngester): each
+batch of new rows becomes one ``extend`` message holding the new points of
+every column, plus the new VaR / ES points when a ``RiskFeed`` is given. A
+batch longer than the client window is cut to its last ``window`` rows,
+since the browser would drop the rest anyway. Messages are numbered and the
+most recent ``history`` are kept, so a reconnecting EventSource resumes
+from ``Last-Event-ID``.
+
+Each message names the row range it covers, ``[start, end)``, and the
+stream ``generation``, which changes whenever the log is truncated or
+rewritten (the ingester calls ``clear()``). A client that drew its figure
+from the first ``rows`` rows applies only the points past ``rows``; on a
+generation change, a gap or a ``resync`` it asks for a full redraw instead.
+"""
+
+import json
+import threading
+from collections import deque
+
+import numpy as np
+
+DEFAULT_WINDOW = 5000
+DEFAULT_HISTORY = 256
+HEARTBEAT_SECONDS = 15
+
+
+def _timestamps(values):
+    return np.datetime_as_string(np.asarray(values).astype('datetime64[us]')).tolist()
+
+
+def _values(values):
+    """JSON-safe list, NaN as null."""
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+class LiveStream:
+    """Numbered push messages for the rows appended since the previous batch."""
+
+    def __init__(self, columns=('pnl', 'inventory'), risk_feed=None, window=DEFAULT_WINDOW,
+                 history=DEFAULT_HISTORY):
+        self.columns = tuple(columns)
+        self.risk_feed = risk_feed
+        self.window = window
+        self.generation = 0
+        self.seq = 0
+        self._messages = deque(maxlen=history)
+        self._changed = threading.Condition()
+        self.rows = 0
+        self.risk_rows = 0
+
+    def _publish(self, event, data):
+        with self._changed:
+            self.seq += 1
+            data = json.dumps({'generation': self.generation, **data}, separators=(',', ':'))
+            self._messages.append((self.seq, event, data))
+            self._changed.notify_all()
+
+    def clear(self):
+        self.generation += 1
+        self.rows = 0
+        self.risk_rows = 0
+        self._publish('reset', {})
+
+    def update(self, frame):
+        """Publish the rows appended to the log since the previous call."""
+        if len(frame) == 0:
+            return
+        end = self.rows + len(frame)
+        tail = frame.iloc[-self.window:]
+        message = {'start': end - len(tail), 'end': end, 'x': _timestamps(tail['timestamp'])}
+        for column in self.columns:
+            message[column] = _values(tail[column])
+        self.rows = end
+
+        if self.risk_feed is not None:
+            risk = self.risk_feed.frame()
+            start = max(self.risk_rows, len(risk) - self.window)
+            new = risk.iloc[start:]
+            message['risk'] = {'start': start, 'end': len(risk), 'x': _timestamps(new['timestamp']),
+                               'var': _values(new['var']), 'es': _values(new['es'])}
+            self.risk_rows = len(risk)
+        self._publish('extend', message)
+
+    def messages(self, after):
+        """``[(seq, event, data)]`` published after ``after``.
+
+        A client too far behind for the kept history gets a single ``resync``.
+        """
+        with self._changed:
+            if self._messages and after < self._messages[0][0] - 1:
+                return [(self.seq, 'resync', json.dumps({'generation': self.generation}))]
+            return [message for message in self._messages if message[0] > after]
+
+    def events(self, last_id=None, heartbeat=HEARTBEAT_SECONDS):
+        """Server-sent event stream, starting after ``last_id`` or at the oldest kept message."""
+        after = self._messages[0][0] - 1 if last_id is None and self._messages else (last_id or 0)
+        yield 'retry: 1000\n\n'
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: self.seq > after, timeout=heartbeat)
+            pending = self.messages(after)
+            if not pending:
+                # Comment line; lets the server notice clients that went away
+                yield ': keep-alive\n\n'
+                continue
+            for seq, event, data in pending:
+                yield f'id: {seq}\nevent: {event}\ndata: {data}\n\n'
+            after = pending[-1][0]
@@ -0,0 +1,216 @@
+"""
+Columnar on-disk cache for simulation logs.
+
+The first load of ``simulation_log.csv`` converts it, chunk by chunk, into
+one ``.npy`` file per column under ``simulation_log.csv.cache/``. Later loads
+memory-map those files instead of parsing, as long as the source file's size
+and mtime are unchanged, and only the requested columns are touched.
+
+Numeric, boolean and datetime columns are stored as-is (timestamps as
+``datetime64[ns]``); text columns are stored as int32 category codes with the
+categories kept in ``meta.json``.
+
+Binary ``.qrlog`` files (see binlog.py) are detected by their magic bytes and
+mapped directly; they need no cache.
+"""
+
+import io
+import json
+import os
+import shutil
+import struct
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from binlog import is_binlog, read_binlog, records_to_frame
+from log_tail import parse_timestamps
+from profiling import stage
+
+CACHE_VERSION = 1
+CACHE_SUFFIX = '.cache'
+CONVERT_CHUNKSIZE = 1_000_000
+# Fixed .npy header size so the row count can be patched in after streaming
+NPY_HEADER_BYTES = 128
+
+
+def cache_dir(path):
+    return path + CACHE_SUFFIX
+
+
+def _npy_header(dtype, rows):
+    header = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (rows,)}
+    body = repr(header).encode('latin1').ljust(NPY_HEADER_BYTES - 11) + b'\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(body)) + body
+
+
+class _LimitedReader(io.RawIOBase):
+    """Expose only the first ``limit`` bytes of a binary file."""
+
+    def __init__(self, f, limit):
+        self._f = f
+        self._left = limit
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self._f.readinto(memoryview(b)[:min(len(b), self._left)])
+        self._left -= n
+        return n
+
+
+def complete_lines_size(path, size):
+    """Byte length of the prefix of ``path`` that ends on a newline."""
+    with open(path, 'rb') as f:
+        pos = size
+        while pos > 0:
+            start = max(pos - 65536, 0)
+            f.seek(start)
+            block = f.read(pos - start)
+            nl = block.rfind(b'\n')
+            if nl >= 0:
+                return start + nl + 1
+            pos = start
+    return 0
+
+
+def _column_values(series, categories):
+    if series.dtype == object or isinstance(series.dtype, pd.StringDtype):
+        known = categories.setdefault(series.name, {})
+        codes, uniques = pd.factorize(series.astype(str))
+        mapping = np.array([known.setdefault(value, len(known)) for value in uniques], dtype=np.int32)
+        return mapping[codes]
+    if np.issubdtype(series.dtype, np.datetime64):
+        return series.to_numpy().astype('datetime64[ns]')
+    return series.to_numpy()
+
+
+def _read_chunks(source, chunksize, dates, **kwargs):
+    """``read_csv`` in chunks, with the date columns converted as a separate stage."""
+    with pd.read_csv(source, chunksize=chunksize, **kwargs) as chunks:
+        while True:
+            with stage('csv.parse'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            yield parse_timestamps(chunk, dates)
+
+
+def _convert(path, target, st, parse_dates):
+    """Stream the CSV into per-column .npy files under ``target``."""
+    limit = complete_lines_size(path, st.st_size)
+    overrides = {}
+    while True:
+        files, dtypes, categories, rows = {}, {}, {}, 0
+        restart = False
+        with open(path, 'rb') as raw:
+            reader = io.BufferedReader(_LimitedReader(raw, limit))
+            header = pd.read_csv(reader, nrows=0).columns
+            raw.seek(0)
+            reader = io.BufferedReader(_LimitedReader(raw, limit))
+            dates = [c for c in parse_dates if c in header]
+            for chunk in _read_chunks(reader, CONVERT_CHUNKSIZE, dates, dtype=overrides or None):
+                for name in chunk.columns:
+                    values = _column_values(chunk[name], categories)
+                    if name not in files:
+                        dtypes[name] = values.dtype
+                        files[name] = open(os.path.join(target, f'{name}.npy'), 'wb')
+                        files[name].write(_npy_header(values.dtype, 0))
+                    elif not np.can_cast(values.dtype, dtypes[name], 'same_kind'):
+                        # e.g. ints in the first chunk, floats later on
+                        overrides[name] = np.result_type(values.dtype, dtypes[name])
+                        restart = True
+                        break
+                    files[name].write(np.ascontiguousarray(values, dtype=dtypes[name]).tobytes())
+                if restart:
+                    break
+                rows += len(chunk)
+            for name, f in files.items():
+                f.seek(0)
+                f.write(_npy_header(dtypes[name], rows))
+                f.close()
+        if not restart:
+            break
+
+    columns = list(files) or list(header)
+    for name in columns:
+        if name not in files:
+            np.save(os.path.join(target, f'{name}.npy'), np.empty(0))
+    return {
+        'version': CACHE_VERSION,
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'offset': limit,
+        'rows': rows,
+        'columns': columns,
+        'categories': {name: list(known) for name, known in categories.items()},
+    }
+
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, 'meta.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def ensure_cache(path, parse_dates=('timestamp',)):
+    """Return the cache metadata for ``path``, (re)building the cache if stale."""
+    st = os.stat(path)
+    directory = cache_dir(path)
+    meta = _read_meta(directory)
+    if (meta and meta.get('version') == CACHE_VERSION and meta['size'] == st.st_size
+            and meta['mtime_ns'] == st.st_mtime_ns):
+        return meta
+
+    parent = os.path.dirname(os.path.abspath(path))
+    staging = tempfile.mkdtemp(prefix='.cache-', dir=parent)
+    try:
+        with stage('cache.convert', path=path):
+            meta = _convert(path, staging, st, parse_dates)
+        with open(os.path.join(staging, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(staging, directory)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return meta
+
+
+def load_log(path, columns=None, parse_dates=('timestamp',)):
+    """Load a simulation log as a DataFrame over memory-mapped column files.
+
+    ``columns`` restricts loading to the named columns; the others are never
+    read from disk.
+    """
+    if is_binlog(path):
+        frame = records_to_frame(read_binlog(path))
+        return frame[list(columns)] if columns else frame
+
+    meta = ensure_cache(path, parse_dates)
+    directory = cache_dir(path)
+    data = {}
+    for name in columns or meta['columns']:
+        if name not in meta['columns']:
+            raise KeyError(f"Column {name!r} not in {path}")
+        values = np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+        if name in meta['categories']:
+            values = pd.Categorical.from_codes(values, meta['categories'][name])
+        data[name] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def iter_chunks(path, chunksize=CONVERT_CHUNKSIZE, parse_dates=('timestamp',)):
+    """Yield the log as DataFrames of at most ``chunksize`` rows, CSV or binary."""
+    if is_binlog(path):
+        records = read_binlog(path)
+        for start in range(0, len(records), chunksize):
+            yield records_to_frame(records[start:start + chunksize])
+        return
+    header = pd.read_csv(path, nrows=0).columns
+    dates = [c for c in parse_dates if c in header]
+    yield from _read_chunks(path, chunksize, dates)
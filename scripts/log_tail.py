@@ -0,0 +1,331 @@
+"""
+Incremental reader for an append-only simulation log CSV.
+
+The tailer remembers the byte offset just past the last complete line it has
+parsed, so every poll only parses rows appended since the previous one.
+Partial trailing lines are left on disk until their newline arrives, and a
+truncated, rewritten or rotated file is detected and re-read from the start.
+"""
+
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from binlog import HEADER_SIZE, RECORD_DTYPE, is_binlog, read_binlog, record_count, records_to_frame
+from profiling import stage
+
+READ_BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def parse_timestamps(frame, columns):
+    """Convert the date columns of a freshly read CSV frame in place.
+
+    pandas infers one timestamp format per column, so a log whose writer
+    switched between ``...:20.100`` and ``...:21`` falls back to parsing
+    each value on its own.
+    """
+    with stage('csv.timestamps', rows=len(frame)):
+        for name in columns:
+            if name in frame and frame[name].dtype.kind != 'M':
+                try:
+                    frame[name] = pd.to_datetime(frame[name])
+                except ValueError:
+                    frame[name] = pd.to_datetime(frame[name], format='mixed')
+    return frame
+
+
+class ColumnBuffer:
+    """Growable columnar store backed by one NumPy array per column.
+
+    Arrays are over-allocated and doubled on demand, so appends are amortised
+    O(rows appended). Rows below ``len(self)`` are never written again, which
+    makes the views returned by ``frame()`` safe to hand out as snapshots.
+    """
+
+    def __init__(self, capacity=4096):
+        self._initial_capacity = capacity
+        self.clear()
+
+    def __len__(self):
+        return self._size
+
+    def clear(self):
+        # Fresh arrays rather than rewinding, so old snapshots stay intact
+        self._columns = {}
+        self._size = 0
+        self._capacity = self._initial_capacity
+
+    @property
+    def columns(self):
+        return list(self._columns)
+
+    def _grow(self, needed):
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        for name, arr in self._columns.items():
+            grown = np.empty(capacity, dtype=arr.dtype)
+            grown[:self._size] = arr[:self._size]
+            self._columns[name] = grown
+        self._capacity = capacity
+
+    def append(self, frame):
+        n = len(frame)
+        if n == 0:
+            return
+        if self._size + n > self._capacity:
+            self._grow(self._size + n)
+        for name in frame.columns:
+            values = frame[name].to_numpy()
+            arr = self._columns.get(name)
+            if arr is None:
+                arr = np.empty(self._capacity, dtype=values.dtype)
+                self._columns[name] = arr
+            elif np.result_type(arr.dtype, values.dtype) != arr.dtype:
+                # e.g. an int column that starts receiving floats
+                arr = arr.astype(np.result_type(arr.dtype, values.dtype))
+                self._columns[name] = arr
+            arr[self._size:self._size + n] = values
+        self._size += n
+
+    def column(self, name):
+        return self._columns[name][:self._size]
+
+    def frame(self):
+        """Zero-copy DataFrame over the rows ingested so far."""
+        return pd.DataFrame({name: arr[:self._size] for name, arr in self._columns.items()},
+                            copy=False)
+
+
+class LogTailer:
+    """Parse only the rows appended to ``path`` since the last ``poll()``."""
+
+    def __init__(self, path, parse_dates=('timestamp',)):
+        self.path = path
+        self.parse_dates = tuple(parse_dates)
+        self.buffer = ColumnBuffer()
+        self.resets = 0
+        self._reset()
+
+    def _reset(self):
+        self.offset = 0
+        self._inode = None
+        self._names = None
+        self._last_line = b''
+        self.buffer.clear()
+
+    def resume(self, frame, offset):
+        """Start from already-parsed rows covering the first ``offset`` bytes.
+
+        Used to seed the tailer from the columnar cache (log_cache.py) instead
+        of re-parsing the whole file; ``offset`` must end on a line boundary.
+        """
+        self._reset()
+        with open(self.path, 'rb') as f:
+            self._inode = os.fstat(f.fileno()).st_ino
+            head = f.readline()
+            self._names = head.decode().strip().split(',')
+            f.seek(max(offset - 65536, 0))
+            tail = f.read(offset - max(offset - 65536, 0))
+        self._last_line = tail[tail.rfind(b'\n', 0, len(tail) - 1) + 1:]
+        self.offset = offset
+        self.buffer.append(frame)
+
+    def _rewound(self, f, st):
+        """True if the file no longer continues the bytes we already parsed."""
+        if self._inode is None:
+            return False
+        if st.st_ino != self._inode or st.st_size < self.offset:
+            return True
+        # Same inode and at least as long: truncated then refilled past our
+        # offset? Compare the last complete line we parsed with what is there now.
+        f.seek(self.offset - len(self._last_line))
+        return f.read(len(self._last_line)) != self._last_line
+
+    def poll(self):
+        """Ingest newly appended complete lines; returns the number of new rows."""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return 0
+        with f:
+            st = os.fstat(f.fileno())
+            if self._rewound(f, st):
+                self._reset()
+                self.resets += 1
+            if self._inode is None:
+                self._inode = st.st_ino
+
+            added = 0
+            f.seek(self.offset)
+            pending = b''
+            while True:
+                block = f.read(READ_BLOCK_BYTES)
+                if not block:
+                    break
+                data = pending + block
+                end = data.rfind(b'\n')
+                if end < 0:
+                    pending = data
+                    continue
+                added += self._ingest(data[:end + 1])
+                pending = data[end + 1:]
+        return added
+
+    def _ingest(self, data):
+        if self._names is None:
+            header_end = data.find(b'\n')
+            header = data[:header_end + 1]
+            self._names = header.decode().strip().split(',')
+            self.offset += len(header)
+            self._last_line = header
+            data = data[header_end + 1:]
+            if not data:
+                return 0
+
+        parse_dates = [c for c in self.parse_dates if c in self._names]
+        with stage('csv.parse', bytes=len(data)):
+            frame = pd.read_csv(io.BytesIO(data), names=self._names, header=None)
+        self.buffer.append(parse_timestamps(frame, parse_dates))
+
+        self.offset += len(data)
+        start = data.rfind(b'\n', 0, len(data) - 1) + 1
+        self._last_line = data[start:]
+        return len(frame)
+
+    def frame(self):
+        return self.buffer.frame()
+
+
+class BinaryLogTailer:
+    """``LogTailer`` counterpart for binary ``.qrlog`` files.
+
+    Records are fixed width, so new rows are just the complete records past
+    the last count and are copied straight out of a memory map.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.buffer = ColumnBuffer()
+        self.resets = 0
+        self.rows = 0
+        self._inode = None
+        self._last_record = b''
+
+    def _rewound(self, st):
+        """True if the file no longer continues the records we already read."""
+        if self._inode is None:
+            return False
+        if st.st_ino != self._inode or record_count(st.st_size) < self.rows:
+            return True
+        if not self.rows:
+            return False
+        # Truncated then refilled past our count? Compare the last record we read.
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset - RECORD_DTYPE.itemsize)
+            return f.read(RECORD_DTYPE.itemsize) != self._last_record
+
+    def poll(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return 0
+        if self._rewound(st):
+            self.buffer.clear()
+            self.rows = 0
+            self._last_record = b''
+            self.resets += 1
+        self._inode = st.st_ino
+        if st.st_size < HEADER_SIZE or record_count(st.st_size) == self.rows:
+            return 0
+        records = read_binlog(self.path)[self.rows:]
+        self.buffer.append(records_to_frame(records))
+        self.rows += len(records)
+        self._last_record = records[-1:].tobytes()
+        return len(records)
+
+    @property
+    def offset(self):
+        return HEADER_SIZE + self.rows * RECORD_DTYPE.itemsize
+
+    def frame(self):
+        return self.buffer.frame()
+
+
+def open_tailer(path):
+    """Tailer for ``path``, picking the binary or CSV reader by file contents."""
+    return BinaryLogTailer(path) if is_binlog(path) else LogTailer(path)
+
+
+class BackgroundIngester:
+    """Single thread that tails a log and publishes versioned snapshots.
+
+    Readers call ``snapshot()`` and never touch the file themselves, so the
+    parsing cost is paid once no matter how many consumers there are. The
+    version only changes when the visible data changes. An optional
+    ``pyramid`` (see pyramid.py) and any other ``feeds`` (objects with
+    ``update(frame)`` and ``clear()``, e.g. rolling_risk.RiskFeed) are fed
+    each batch of new rows. With a ``watcher`` (see file_watch.py) the thread
+    wakes as soon as the log changes, ``interval`` becoming the longest wait.
+    """
+
+    def __init__(self, tailer, interval=1.0, pyramid=None, feeds=(), watcher=None):
+        self.tailer = tailer
+        self.interval = interval
+        self.pyramid = pyramid
+        self.feeds = list(feeds)
+        self.watcher = watcher
+        self._snapshot = (0, tailer.frame())
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='log-ingester', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def seed(self, frame, offset):
+        """Publish already-parsed rows (see ``LogTailer.resume``) before tailing."""
+        self.tailer.resume(frame, offset)
+        frame = self.tailer.frame()
+        for feed in self._consumers():
+            feed.clear()
+            feed.update(frame)
+        self._snapshot = (self._snapshot[0] + 1, frame)
+
+    def _consumers(self):
+        return ([self.pyramid] if self.pyramid is not None else []) + self.feeds
+
+    def refresh(self):
+        """Poll once and publish a new snapshot if anything changed."""
+        resets = self.tailer.resets
+        added = self.tailer.poll()
+        if added or self.tailer.resets != resets:
+            frame = self.tailer.frame()
+            for feed in self._consumers():
+                if self.tailer.resets != resets:
+                    feed.clear()
+                with stage(f'ingest.{type(feed).__name__}', rows=added):
+                    feed.update(frame.iloc[len(frame) - added:])
+            version = self._snapshot[0] + 1
+            # Tuple assignment is atomic, readers see either snapshot in full
+            self._snapshot = (version, frame)
+        return added
+
+    def snapshot(self):
+        """Return ``(version, DataFrame)`` for the latest ingested data."""
+        return self._snapshot
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            if self.watcher is not None:
+                self.watcher.wait(self.interval)
+            else:
+                self._stop.wait(self.interval)
@@ -0,0 +1,224 @@
+"""
+Market-making strategy simulated on the Python order book.
+
+Mirrors ``MarketMaker`` in src/main.cpp (quote ``quote_size`` at the mid
+plus/minus half of ``spread`` around ``base_price``) and adds the settings
+the README lists: quotes on a side are withheld once |inventory| reaches
+``inventory_limit``, and the background order flow follows a random-walk mid
+whose standard deviation over the session is ``volatility`` times the base
+price. Background flow is ``orderbook.synthetic_events``; the strategy
+requotes every ``requote_every`` events against the live book's mid.
+
+``simulation_log`` turns a run into a fill/mid-price log (see attribution.py).
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from orderbook import ADD, BUY, CANCEL, SELL, OrderBook, iter_events, synthetic_events
+
+MM_TRADER = -1
+TRADING_SECONDS_PER_YEAR = 252 * 6.5 * 3600
+
+# One row per strategy fill; prices in ticks, cash/inventory after the fill
+MM_FILL_DTYPE = np.dtype([
+    ('ts', '<i8'),
+    ('price', '<i8'),
+    ('qty', '<i4'),
+    ('side', 'i1'),
+    ('quote', '<i8'),         # limit price of the strategy's order
+    ('mid', '<f8'),           # mid the quotes were set against
+    ('cash', '<i8'),
+    ('inventory', '<i8'),
+])
+
+DEFAULT_PARAMS = {
+    'base_price': 100.0,
+    'quote_size': 10,
+    'spread': 0.2,
+    'inventory_limit': 1000,
+    'volatility': 0.02,
+    'events': 200_000,
+    'requote_every': 100,
+    'tick_size': 0.01,
+    'sweep_depth': 40,        # ticks marketable background orders reach through the touch
+}
+
+
+def simulate_market_maker(rng=None, **params):
+    """Run one session; returns a dict of ``(n_requotes,)`` arrays.
+
+    ``timestamp`` (ns), ``pnl`` (cash plus inventory at the mid, in price
+    units), ``inventory`` and ``mid`` are sampled after each requote;
+    ``fills`` is the number of strategy fills and ``fill_log`` holds them
+    (``MM_FILL_DTYPE``).
+    """
+    unknown = set(params) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise TypeError(f"Unknown market maker parameters: {', '.join(sorted(unknown))}")
+    p = {**DEFAULT_PARAMS, **params}
+    if rng is None:
+        rng = np.random.default_rng()
+
+    tick = p['tick_size']
+    n = int(p['events'])
+    every = int(p['requote_every'])
+    base = round(p['base_price'] / tick)
+    half_spread = max(int(round(p['spread'] / tick / 2)), 1)
+    size = int(p['quote_size'])
+    limit = p['inventory_limit']
+
+    step = p['volatility'] * base / np.sqrt(n)
+    path = base + np.rint(np.cumsum(rng.standard_normal(n)) * step).astype(np.int64)
+    events = synthetic_events(n, rng, mid=np.maximum(path, 1), cross_depth=int(p['sweep_depth']))
+
+    book = OrderBook()
+    state = {'cash': 0, 'inventory': 0, 'mid': float(base)}
+    fill_log = []
+    quote_prices = {}
+
+    def on_fill(fill):
+        ts, price, qty, aggressor, maker_id, taker_id, maker_trader, taker_trader = fill
+        if maker_trader == MM_TRADER:
+            side, oid = -aggressor, maker_id
+        elif taker_trader == MM_TRADER:
+            side, oid = aggressor, taker_id
+        else:
+            return
+        state['inventory'] += side * qty
+        state['cash'] -= side * qty * price
+        fill_log.append((ts, price, qty, side, quote_prices[oid], state['mid'],
+                         state['cash'], state['inventory']))
+
+    steps = -(-n // every)
+    out_ts = np.empty(steps, dtype=np.int64)
+    out_pnl = np.empty(steps)
+    out_inv = np.empty(steps, dtype=np.int64)
+    out_mid = np.empty(steps)
+    next_id = n
+    live = []
+    for k, start in enumerate(range(0, n, every)):
+        chunk = events[start:start + every]
+        book.process(iter_events(chunk), on_fill=on_fill)
+        ts = int(chunk['ts'][-1])
+
+        mid = book.mid()
+        if mid is None:
+            mid = float(path[min(start + every, n) - 1])
+        state['mid'] = mid
+        inventory = state['inventory']
+
+        # Pull the old quotes and post fresh ones around the current mid
+        quotes = [(ts, CANCEL, oid, 0, 0, 0, MM_TRADER) for oid in live]
+        live = []
+        if inventory < limit:
+            quotes.append((ts, ADD, next_id, BUY, int(mid) - half_spread, size, MM_TRADER))
+        if inventory > -limit:
+            quotes.append((ts, ADD, next_id + 1, SELL, int(np.ceil(mid)) + half_spread, size, MM_TRADER))
+        quote_prices.clear()
+        for _, kind, oid, _, price, _, _ in quotes:
+            if kind == ADD:
+                quote_prices[oid] = price
+                live.append(oid)
+        next_id += 2
+        book.process(quotes, on_fill=on_fill)
+
+        out_ts[k] = ts
+        out_inv[k] = state['inventory']
+        out_mid[k] = mid * tick
+        out_pnl[k] = (state['cash'] + state['inventory'] * mid) * tick
+
+    return {
+        'timestamp': out_ts,
+        'pnl': out_pnl,
+        'inventory': out_inv,
+        'mid': out_mid,
+        'fills': len(fill_log),
+        'fill_log': np.array(fill_log, dtype=MM_FILL_DTYPE),
+    }
+
+
+def simulation_log(run, tick_size=DEFAULT_PARAMS['tick_size']):
+    """A run as simulation log rows: every fill plus a mark after each requote.
+
+    Columns are those of ``orderbook.replay`` (timestamp, pnl, inventory,
+    price, qty, side) plus ``quote`` and ``mid``; marks have ``qty`` 0 and
+    no price, side or quote.
+    """
+    fills = run['fill_log']
+    marks = len(run['timestamp'])
+    ts = np.concatenate([fills['ts'], run['timestamp']])
+    order = np.argsort(ts, kind='stable')      # fills before the mark of the same requote
+    empty = np.full(marks, np.nan)
+    columns = {
+        'timestamp': ts.astype('datetime64[ns]'),
+        'pnl': np.concatenate([(fills['cash'] + fills['inventory'] * fills['mid']) * tick_size,
+                               run['pnl']]),
+        'inventory': np.concatenate([fills['inventory'], run['inventory']]),
+        'price': np.concatenate([fills['price'] * tick_size, empty]),
+        'qty': np.concatenate([fills['qty'], np.zeros(marks, dtype=np.int32)]),
+        'side': np.concatenate([np.where(fills['side'] == BUY, 'B', 'S'), np.full(marks, '')]),
+        'quote': np.concatenate([fills['quote'] * tick_size, empty]),
+        'mid': np.concatenate([fills['mid'] * tick_size, run['mid']]),
+    }
+    frame = pd.DataFrame({name: values[order] for name, values in columns.items()})
+    for name in ('pnl', 'price', 'quote', 'mid'):
+        frame[name] = frame[name].round(10)
+    return frame
+
+
+def summarize(run, periods_per_year=None):
+    """Final P&L, Sharpe of P&L changes, max drawdown and max |inventory|."""
+    pnl = run['pnl']
+    changes = np.diff(pnl, prepend=0.0)
+    std = changes.std(ddof=1) if len(changes) > 1 else 0.0
+    if periods_per_year is None:
+        # Annualise by the sampling interval, as generate_report does
+        step = np.median(np.diff(run['timestamp'])) / 1e9 if len(pnl) > 1 else 0
+        periods_per_year = TRADING_SECONDS_PER_YEAR / step if step > 0 else 1.0
+    sharpe = changes.mean() / std * np.sqrt(periods_per_year) if std > 0 else 0.0
+    drawdown = pnl - np.maximum.accumulate(np.maximum(pnl, 0.0))
+    return {
+        'final_pnl': float(pnl[-1]) if len(pnl) else 0.0,
+        'sharpe': float(sharpe),
+        'max_drawdown': float(drawdown.min()) if len(pnl) else 0.0,
+        'max_abs_inventory': int(np.abs(run['inventory']).max()) if len(pnl) else 0,
+        'fills': int(run['fills']),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate the market maker and write its simulation log")
+    parser.add_argument('--seed', type=int, default=42, help='Seed of the session')
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE',
+                        help='Override a strategy parameter (repeatable)')
+    parser.add_argument('--output', type=str, default='results/simulation_log.csv', help='Output CSV')
+    parser.add_argument('--symbols', type=int, default=1,
+                        help='Independent sessions (seeds seed, seed+1, ...) written as one log with a '
+                             'symbol column')
+    args = parser.parse_args()
+
+    params = {}
+    for item in args.set:
+        name, _, value = item.partition('=')
+        params[name.strip()] = type(DEFAULT_PARAMS.get(name.strip(), 0.0))(float(value))
+    tick_size = params.get('tick_size', DEFAULT_PARAMS['tick_size'])
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    if args.symbols == 1:
+        run = simulate_market_maker(np.random.default_rng(args.seed), **params)
+        simulation_log(run, tick_size).to_csv(args.output, index=False)
+        print(f"✅ {run['fills']:,} fills, final P&L {run['pnl'][-1]:.2f} -> {args.output}")
+    else:
+        logs = []
+        for i in range(args.symbols):
+            run = simulate_market_maker(np.random.default_rng(args.seed + i), **params)
+            log = simulation_log(run, tick_size)
+            log.insert(1, 'symbol', f"SYM{i:03d}")
+            logs.append(log)
+        log = pd.concat(logs, ignore_index=True).sort_values('timestamp', kind='stable')
+        log.to_csv(args.output, index=False)
+        print(f"✅ {args.symbols} symbols, {len(log):,} rows, final P&L "
+              f"{sum(l['pnl'].iloc[-1] for l in logs):.2f} -> {args.output}")
@@ -0,0 +1,149 @@
+"""
+Scalable building blocks for the microstructure charts.
+
+``autocorrelation`` computes every lag at once from one FFT cross-correlation
+plus prefix sums, O(n log n) instead of one ``np.corrcoef`` per lag, and
+returns exactly what the per-lag loop did: the Pearson correlation of
+``x[:-k]`` with ``x[k:]``.
+
+``Histogram2D`` is a fixed-bin 2-D histogram that is fed chunk by chunk and
+merged across processes. Alongside the counts it keeps the co-moments of a
+least-squares line, combined with the same parallel Welford update as
+``streaming_stats.RunningMoments``, so the trend overlay drawn on top of the
+histogram needs no second pass over the data either.
+"""
+
+import numpy as np
+
+
+def autocorrelation(values, max_lag):
+    """Lagged Pearson correlation ``corr(x[:-k], x[k:])`` for ``k < max_lag``.
+
+    Lag 0 is 1.0 by definition; lags with fewer than two overlapping points
+    or a constant side are NaN, as with ``np.corrcoef``.
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = len(x)
+    out = np.full(max_lag, np.nan)
+    if max_lag == 0 or n == 0:
+        return out
+    out[0] = 1.0
+    lags = np.arange(1, min(max_lag, n))
+    if len(lags) == 0:
+        return out
+
+    # Centring keeps the prefix-sum differences below well conditioned
+    x = x - x.mean()
+    size = 1 << int(np.ceil(np.log2(2 * n)))
+    spectrum = np.fft.rfft(x, size)
+    cross = np.fft.irfft(spectrum * np.conj(spectrum), size)[lags]  # sum x[t] x[t+k]
+
+    s1 = np.concatenate(([0.0], np.cumsum(x)))
+    s2 = np.concatenate(([0.0], np.cumsum(x * x)))
+    m = n - lags
+    head1, head2 = s1[m], s2[m]                     # over x[:n-k]
+    tail1, tail2 = s1[n] - s1[lags], s2[n] - s2[lags]  # over x[k:]
+
+    cov = cross - head1 * tail1 / m
+    var_head = head2 - head1 * head1 / m
+    var_tail = tail2 - tail1 * tail1 / m
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = cov / np.sqrt(var_head * var_tail)
+    corr[(m < 2) | (var_head <= 0) | (var_tail <= 0)] = np.nan
+    out[lags] = np.clip(corr, -1.0, 1.0)
+    return out
+
+
+class Histogram2D:
+    """Fixed-edge 2-D histogram with chunked updates and exact merging.
+
+    Binning follows ``np.histogram2d``: bins are half-open except the last,
+    which includes its right edge, and points outside the edges are counted
+    in ``dropped`` rather than binned. The trend-line moments cover every
+    point fed, binned or not.
+    """
+
+    def __init__(self, x_edges, y_edges):
+        self.x_edges = np.asarray(x_edges, dtype=np.float64).ravel()
+        self.y_edges = np.asarray(y_edges, dtype=np.float64).ravel()
+        if min(len(self.x_edges), len(self.y_edges)) < 2:
+            raise ValueError("Histogram2D needs at least two edges on each axis")
+        self.counts = np.zeros((len(self.x_edges) - 1, len(self.y_edges) - 1), dtype=np.int64)
+        self.dropped = 0
+        # Trend-line co-moments: count, means, sum of dx*dx and dx*dy
+        self.count = 0
+        self.mean_x = self.mean_y = 0.0
+        self.cxx = self.cxy = 0.0
+        self.x_min = np.inf
+        self.x_max = -np.inf
+
+    @classmethod
+    def uniform(cls, x_range, y_range, bins=30):
+        """Evenly spaced bins over ``x_range`` and ``y_range``."""
+        x_bins, y_bins = (bins, bins) if np.ndim(bins) == 0 else bins
+        return cls(np.linspace(*x_range, x_bins + 1), np.linspace(*y_range, y_bins + 1))
+
+    @staticmethod
+    def _bin(values, edges):
+        idx = np.searchsorted(edges, values, side='right') - 1
+        # The last bin is closed on the right
+        idx[values == edges[-1]] = len(edges) - 2
+        return idx
+
+    def update(self, x, y):
+        """Add a chunk of ``(x, y)`` points; NaNs are ignored."""
+        x = np.asarray(x, dtype=np.float64).ravel()
+        y = np.asarray(y, dtype=np.float64).ravel()
+        if x.shape != y.shape:
+            raise ValueError("x and y must have the same length")
+        ok = ~(np.isnan(x) | np.isnan(y))
+        x, y = x[ok], y[ok]
+        if len(x) == 0:
+            return self
+
+        mx, my = x.mean(), y.mean()
+        dx = x - mx
+        self._combine(len(x), mx, my, np.dot(dx, dx), np.dot(dx, y - my))
+        self.x_min = min(self.x_min, x.min())
+        self.x_max = max(self.x_max, x.max())
+
+        nx, ny = self.counts.shape
+        ix, iy = self._bin(x, self.x_edges), self._bin(y, self.y_edges)
+        inside = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+        self.dropped += int(len(x) - inside.sum())
+        flat = ix[inside] * ny + iy[inside]
+        self.counts += np.bincount(flat, minlength=nx * ny).reshape(nx, ny)
+        return self
+
+    def merge(self, other):
+        """Fold in a histogram built over the same edges (e.g. by another worker)."""
+        if not (np.array_equal(self.x_edges, other.x_edges) and np.array_equal(self.y_edges, other.y_edges)):
+            raise ValueError("Cannot merge histograms with different bin edges")
+        self.counts += other.counts
+        self.dropped += other.dropped
+        if other.count:
+            self._combine(other.count, other.mean_x, other.mean_y, other.cxx, other.cxy)
+        self.x_min = min(self.x_min, other.x_min)
+        self.x_max = max(self.x_max, other.x_max)
+        return self
+
+    def _combine(self, n, mean_x, mean_y, cxx, cxy):
+        total = self.count + n
+        dx, dy = mean_x - self.mean_x, mean_y - self.mean_y
+        weight = self.count * n / total
+        self.cxx += cxx + dx * dx * weight
+        self.cxy += cxy + dx * dy * weight
+        self.mean_x += dx * n / total
+        self.mean_y += dy * n / total
+        self.count = total
+
+    def trend(self):
+        """``(slope, intercept)`` of the least-squares line, as ``np.polyfit(x, y, 1)``."""
+        if self.count < 2 or self.cxx == 0:
+            return np.nan, np.nan
+        slope = self.cxy / self.cxx
+        return slope, self.mean_y - slope * self.mean_x
+
+    def plot(self, ax, **kwargs):
+        """Draw the counts like ``Axes.hist2d`` and return the mesh."""
+        return ax.pcolormesh(self.x_edges, self.y_edges, self.counts.T, **kwargs)
@@ -0,0 +1,147 @@
+"""
+ctypes binding for the C++ OrderBook batch API (src/capi.cpp).
+
+Build the library with ``make lib``; it is looked up at ``$QUANTRUSH_LIB``
+and then at ``libquantrush.so`` in the repository root. ``NativeOrderBook``
+hands whole NumPy arrays of (price_ticks, qty, side, ts) to the library in
+one call, and fills and per-order top-of-book snapshots come back in
+preallocated structured arrays, so backtests never cross the Python/C
+boundary per order.
+"""
+
+import ctypes
+import os
+
+import numpy as np
+
+ABI_VERSION = 1
+LIBRARY_NAME = 'libquantrush.so'
+
+# Field layouts must match QRFill / QRTop in src/capi.cpp
+FILL_DTYPE = np.dtype([
+    ('ts', '<i8'),
+    ('price', '<i8'),
+    ('maker_id', '<i8'),
+    ('taker_id', '<i8'),
+    ('qty', '<i4'),
+    ('side', 'i1'),
+], align=True)
+
+TOP_DTYPE = np.dtype([
+    ('bid', '<i8'),
+    ('bid_qty', '<i8'),
+    ('ask', '<i8'),
+    ('ask_qty', '<i8'),
+])
+
+_lib = None
+
+
+def _library_path():
+    if os.environ.get('QUANTRUSH_LIB'):
+        return os.environ['QUANTRUSH_LIB']
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', LIBRARY_NAME)
+
+
+def load_library(path=None):
+    """Load and type the shared library; raises OSError if it is missing.
+
+    The default library is loaded once and reused.
+    """
+    global _lib
+    if path is None:
+        if _lib is None:
+            _lib = load_library(_library_path())
+        return _lib
+    if not os.path.exists(path):
+        raise OSError(f"{path} not found; build it with `make lib`")
+    lib = ctypes.CDLL(path)
+    if lib.qr_abi_version() != ABI_VERSION:
+        raise OSError(f"{path}: ABI version {lib.qr_abi_version()}, expected {ABI_VERSION}; "
+                      f"rebuild with `make lib`")
+
+    ptr = ctypes.c_void_p
+    lib.qr_book_new.restype = ptr
+    lib.qr_book_free.argtypes = [ptr]
+    lib.qr_book_next_id.argtypes = [ptr]
+    lib.qr_book_next_id.restype = ctypes.c_int64
+    lib.qr_book_submit.argtypes = [ptr, ctypes.c_int64, ptr, ptr, ptr, ptr, ptr, ctypes.c_int64,
+                                   ctypes.POINTER(ctypes.c_int64), ptr]
+    lib.qr_book_submit.restype = ctypes.c_int64
+    return lib
+
+
+def _input(values, dtype, n):
+    values = np.ascontiguousarray(values, dtype=dtype)
+    if values.shape != (n,):
+        raise ValueError(f"Expected {n} values, got shape {values.shape}")
+    return values
+
+
+class NativeOrderBook:
+    """Price-time priority book in C++, driven by NumPy batches."""
+
+    _handle = None
+
+    def __init__(self, lib=None):
+        self._lib = lib or load_library()
+        self._handle = self._lib.qr_book_new()
+
+    def close(self):
+        if self._handle:
+            self._lib.qr_book_free(self._handle)
+            self._handle = None
+
+    def __del__(self):
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def next_order_id(self):
+        return self._lib.qr_book_next_id(self._handle)
+
+    def submit(self, price, qty, side, ts=None, tops=True, fill_capacity=None):
+        """Match a batch of limit orders in arrival order.
+
+        ``price`` is in integer ticks, ``side`` is +1 (buy) / -1 (sell) and
+        ``ts`` nanoseconds (zeros if omitted). Order ``i`` is assigned id
+        ``next_order_id + i``. Returns ``(fills, tops)``: a ``FILL_DTYPE``
+        array of every fill and, if ``tops`` is true, a ``TOP_DTYPE`` array
+        with the book's top after each order (-1 price / 0 qty for an empty
+        side). ``fill_capacity`` sizes the first output buffer; the call
+        continues with a larger one if it fills up.
+        """
+        price = np.asarray(price)
+        n = len(price)
+        price = _input(price, np.int64, n)
+        qty = _input(qty, np.int32, n)
+        side = _input(side, np.int8, n)
+        ts = np.zeros(n, dtype=np.int64) if ts is None else _input(ts, np.int64, n)
+        top_buf = np.empty(n, dtype=TOP_DTYPE) if tops else None
+
+        capacity = max(fill_capacity or n, 1024)
+        chunks = []
+        done = 0
+        written = ctypes.c_int64()
+        while True:
+            fills = np.empty(capacity, dtype=FILL_DTYPE)
+            stop = self._lib.qr_book_submit(
+                self._handle, n - done,
+                price[done:].ctypes.data, qty[done:].ctypes.data,
+                side[done:].ctypes.data, ts[done:].ctypes.data,
+                fills.ctypes.data, capacity, ctypes.byref(written),
+                top_buf[done:].ctypes.data if tops else None)
+            chunks.append(fills[:written.value])
+            done += stop
+            if done == n:
+                break
+            if stop == 0:
+                # Not even one order fits: it could fill against the whole book
+                capacity *= 2
+        fills = chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+        return fills, top_buf
@@ -0,0 +1,404 @@
+"""
+Live Poisson order-flow feed.
+
+``PoissonFlow`` generates order events (``orderbook.EVENT_DTYPE``) whose
+arrivals are a Poisson process at ``rate`` events per second. The mid price
+follows a jump diffusion: Gaussian log-returns scaled by the annualised
+``volatility`` over each inter-arrival gap, plus Poisson jumps
+(``jump_rate`` per second, log-size ~ N(0, ``jump_size``)). The order mix
+around the mid (adds, cancels, marketable orders) is that of
+``orderbook.synthetic_events``. Events are generated a time slice at a time
+with array operations, so rates from 10 to 10^6 events per second cost the
+same per event.
+
+``OrderFeed`` publishes the slices to subscribers, each behind its own
+bounded ``asyncio.Queue``:
+
+* paced (default): every slice is released when the wall clock reaches it,
+  events carry wall-clock timestamps. A full queue drops the batch for that
+  subscriber (``on_full='drop'``) or stalls the feed (``'block'``). Batches
+  released more than ``lag_threshold`` late are counted as lagging.
+* fast (``realtime=False``): no pacing, for backtests; full queues always
+  block, so nothing is dropped and the feed runs at the consumers' speed.
+
+Subscribers are in-process queues or, with ``serve_unix``, clients of a Unix
+socket, who receive ``<u4 count`` followed by ``count`` raw event records
+per batch (``read_unix`` decodes them). ``consume_book`` applies a stream to
+an ``OrderBook`` and can append one trader's fills to a simulation log, so a
+live run drives dashboard.py end to end.
+"""
+
+import argparse
+import asyncio
+import os
+import struct
+import time
+
+import numpy as np
+
+from market_maker import TRADING_SECONDS_PER_YEAR
+from orderbook import EVENT_DTYPE, OrderBook, replay, synthetic_events
+
+DEFAULT_RATE = 1000.0
+DEFAULT_VOLATILITY = 0.2
+DEFAULT_JUMP_RATE = 0.05
+DEFAULT_JUMP_SIZE = 0.002
+DEFAULT_SLICE = 0.01                  # seconds of flow per paced batch
+FAST_BATCH_EVENTS = 50_000            # events per batch when not paced
+DEFAULT_QUEUE_SIZE = 100              # batches buffered per subscriber
+DEFAULT_LAG_THRESHOLD = 0.05
+DRAIN_SECONDS = 10.0                  # wait for socket clients to take the tail of the feed
+BATCH_HEADER = struct.Struct('<I')
+
+
+class PoissonFlow:
+    """Order events with Poisson arrivals around a jump-diffusion mid."""
+
+    def __init__(self, rate=DEFAULT_RATE, volatility=DEFAULT_VOLATILITY, jump_rate=DEFAULT_JUMP_RATE,
+                 jump_size=DEFAULT_JUMP_SIZE, price=100.0, tick_size=0.01, rng=None, start_ns=None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.volatility = volatility
+        self.jump_rate = jump_rate
+        self.jump_size = jump_size
+        self.tick_size = tick_size
+        self.rng = rng if rng is not None else np.random.default_rng()
+        if start_ns is None:
+            start_ns = np.datetime64('2024-01-01T09:30', 'ns').astype(np.int64)
+        self.start_ns = int(start_ns)
+        self.log_mid = np.log(price)
+        self.elapsed = 0.0        # seconds of flow generated
+        self.last_arrival = 0.0
+        self.next_id = 0
+
+    def next_slice(self, seconds):
+        """Events arriving in the next ``seconds`` of flow, possibly none."""
+        rng = self.rng
+        t0 = self.elapsed
+        self.elapsed += seconds
+        n = rng.poisson(self.rate * seconds)
+        # Given their count, Poisson arrivals are uniform order statistics
+        times = t0 + np.sort(rng.random(n)) * seconds
+
+        dt = np.diff(times, prepend=self.last_arrival)
+        steps = np.zeros(n + 1)
+        steps[:n] = self.volatility * np.sqrt(dt / TRADING_SECONDS_PER_YEAR) * rng.standard_normal(n)
+        jumps = rng.poisson(self.jump_rate * seconds)
+        if jumps:
+            # A jump moves every arrival after it; ones after the last arrival carry over
+            at = np.searchsorted(times, t0 + rng.random(jumps) * seconds)
+            np.add.at(steps, at, self.jump_size * rng.standard_normal(jumps))
+        if n == 0:
+            self.log_mid += steps[0]
+            return np.zeros(0, dtype=EVENT_DTYPE)
+        path = self.log_mid + np.cumsum(steps[:n])
+        self.log_mid = path[-1] + steps[n]
+        self.last_arrival = times[-1]
+
+        mid = np.rint(np.exp(path) / self.tick_size).astype(np.int64)
+        events = synthetic_events(n, rng, mid=mid)
+        events['ts'] = self.start_ns + (times * 1e9).astype(np.int64)
+        events['order_id'] += self.next_id
+        self.next_id += n
+        return events
+
+    def mid(self):
+        return np.exp(self.log_mid)
+
+
+class FeedStats:
+    """Counters of one feed run."""
+
+    def __init__(self):
+        self.generated = 0
+        self.batches = 0
+        self.dropped = {}         # subscriber -> events dropped on a full queue
+        self.lagged = 0
+        self.max_lag = 0.0
+        self.started = time.perf_counter()
+
+    def line(self):
+        elapsed = time.perf_counter() - self.started
+        dropped = sum(self.dropped.values())
+        return (f"📡 {self.generated:,} events in {elapsed:.1f}s "
+                f"({self.generated / max(elapsed, 1e-9):,.0f}/s), {dropped:,} dropped, "
+                f"{self.lagged:,} lagging (max lag {self.max_lag * 1e3:.1f} ms)")
+
+
+class OrderFeed:
+    """Publishes a ``PoissonFlow`` to bounded per-subscriber queues."""
+
+    def __init__(self, flow, realtime=True, on_full='drop', slice_seconds=DEFAULT_SLICE,
+                 lag_threshold=DEFAULT_LAG_THRESHOLD):
+        if on_full not in ('drop', 'block'):
+            raise ValueError("on_full must be 'drop' or 'block'")
+        self.flow = flow
+        self.realtime = realtime
+        self.on_full = on_full if realtime else 'block'
+        self.slice_seconds = slice_seconds if realtime else max(slice_seconds,
+                                                                FAST_BATCH_EVENTS / flow.rate)
+        self.lag_threshold = lag_threshold
+        self.stats = FeedStats()
+        self.clients = set()      # socket handler tasks, see serve_unix
+        self._queues = {}
+        self._closed = {}         # subscriber -> set once it unsubscribes
+        self._subscribed = asyncio.Event()
+
+    def subscribe(self, name, maxsize=DEFAULT_QUEUE_SIZE):
+        """Queue receiving event batches, then ``None`` when the feed ends."""
+        queue = asyncio.Queue(maxsize)
+        self._queues[name] = queue
+        self._closed[name] = asyncio.Event()
+        self.stats.dropped.setdefault(name, 0)
+        self._subscribed.set()
+        return queue
+
+    def unsubscribe(self, name):
+        self._queues.pop(name, None)
+        closed = self._closed.pop(name, None)
+        if closed is not None:
+            # Releases a put blocked on this subscriber's full queue
+            closed.set()
+
+    async def wait_subscribers(self, count):
+        while len(self._queues) < count:
+            self._subscribed.clear()
+            await self._subscribed.wait()
+
+    async def _put(self, name, queue, item):
+        """``queue.put(item)``, given up if ``name`` unsubscribes while it waits."""
+        closed = self._closed.get(name)
+        if closed is None or closed.is_set():
+            return
+        try:
+            queue.put_nowait(item)
+            return
+        except asyncio.QueueFull:
+            pass
+        put = asyncio.ensure_future(queue.put(item))
+        gone = asyncio.ensure_future(closed.wait())
+        try:
+            await asyncio.wait((put, gone), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            put.cancel()
+            gone.cancel()
+
+    async def _publish(self, batch):
+        for name, queue in list(self._queues.items()):
+            if self.on_full == 'block':
+                await self._put(name, queue, batch)
+            else:
+                try:
+                    queue.put_nowait(batch)
+                except asyncio.QueueFull:
+                    self.stats.dropped[name] += len(batch)
+
+    async def run(self, duration=None, max_events=None):
+        """Generate until ``duration`` seconds of flow or ``max_events`` events."""
+        stats = self.stats
+        stats.started = start = time.perf_counter()
+        if self.realtime:
+            self.flow.start_ns = time.time_ns()
+        try:
+            while ((duration is None or self.flow.elapsed < duration)
+                   and (max_events is None or stats.generated < max_events)):
+                seconds = self.slice_seconds
+                if duration is not None:
+                    # Fast slices can be far longer than the run; never generate past its end
+                    seconds = min(seconds, duration - self.flow.elapsed)
+                batch = self.flow.next_slice(seconds)
+                if max_events is not None:
+                    batch = batch[:max_events - stats.generated]
+                if self.realtime:
+                    delay = start + self.flow.elapsed - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    elif -delay > self.lag_threshold:
+                        stats.lagged += len(batch)
+                        stats.max_lag = max(stats.max_lag, -delay)
+                if len(batch):
+                    stats.generated += len(batch)
+                    stats.batches += 1
+                    await self._publish(batch)
+                elif not self.realtime:
+                    await asyncio.sleep(0)
+        finally:
+            for name, queue in list(self._queues.items()):
+                if self.on_full == 'drop' and queue.full():
+                    # Never wait on a stalled subscriber, make room for the end marker
+                    self.stats.dropped[name] += len(queue.get_nowait())
+                await self._put(name, queue, None)
+
+
+async def iter_queue(queue):
+    """Batches from a subscription until the feed ends."""
+    while True:
+        batch = await queue.get()
+        if batch is None:
+            return
+        yield batch
+
+
+async def serve_unix(feed, path, maxsize=DEFAULT_QUEUE_SIZE):
+    """Stream ``feed`` to every client of a Unix socket at ``path``."""
+    if os.path.exists(path):
+        os.unlink(path)
+    clients = 0
+
+    async def handle(reader, writer):
+        nonlocal clients
+        clients += 1
+        name = f'socket-{clients}'
+        queue = feed.subscribe(name, maxsize)
+        task = asyncio.current_task()
+        feed.clients.add(task)
+        try:
+            async for batch in iter_queue(queue):
+                writer.write(BATCH_HEADER.pack(len(batch)) + batch.tobytes())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            feed.unsubscribe(name)
+            feed.clients.discard(task)
+            writer.close()
+
+    return await asyncio.start_unix_server(handle, path)
+
+
+async def read_unix(path):
+    """Event batches from a ``serve_unix`` socket until the feed ends."""
+    reader, writer = await asyncio.open_unix_connection(path)
+    try:
+        while True:
+            try:
+                count, = BATCH_HEADER.unpack(await reader.readexactly(BATCH_HEADER.size))
+                data = await reader.readexactly(count * EVENT_DTYPE.itemsize)
+            except asyncio.IncompleteReadError:
+                return
+            yield np.frombuffer(data, dtype=EVENT_DTYPE)
+    finally:
+        writer.close()
+
+
+async def consume_book(batches, trader=1, tick_size=0.01, log=None, lag_threshold=DEFAULT_LAG_THRESHOLD):
+    """Apply event batches to an ``OrderBook``; returns counters.
+
+    ``trader``'s fills are appended to the CSV ``log`` when given. Lag is
+    measured from an event's timestamp to when the book has applied it, so
+    it only means something for paced feeds, whose timestamps are wall
+    clock; pass ``lag_threshold=None`` for fast ones.
+    """
+    book = OrderBook()
+    state = {}
+    counts = {'events': 0, 'fills': 0, 'lagged': 0, 'max_lag': 0.0, 'seconds': 0.0}
+    header = log is not None and (not os.path.exists(log) or os.path.getsize(log) == 0)
+    async for batch in batches:
+        start = time.perf_counter()
+        fills = replay(batch, trader, tick_size=tick_size, book=book, state=state)
+        counts['seconds'] += time.perf_counter() - start
+        if lag_threshold is not None:
+            lag = (time.time_ns() - batch['ts']) / 1e9
+            counts['lagged'] += int(np.count_nonzero(lag > lag_threshold))
+            counts['max_lag'] = max(counts['max_lag'], float(lag.max()))
+        counts['events'] += len(batch)
+        counts['fills'] += len(fills)
+        if log is not None and len(fills):
+            fills.to_csv(log, mode='a', header=header, index=False)
+            header = False
+        # Let the feed and other consumers run between batches
+        await asyncio.sleep(0)
+    return counts
+
+
+def print_consumer(counts, realtime=True):
+    rate = counts['events'] / counts['seconds'] if counts['seconds'] else 0.0
+    lag = (f", {counts['lagged']:,} lagging (max lag {counts['max_lag'] * 1e3:.1f} ms)"
+           if realtime else '')
+    print(f"📘 Book applied {counts['events']:,} events ({rate:,.0f}/s of book time), "
+          f"{counts['fills']:,} fills{lag}")
+
+
+async def report(feed, every):
+    while True:
+        await asyncio.sleep(every)
+        print(feed.stats.line())
+
+
+async def main(args):
+    lag_threshold = None if args.fast else DEFAULT_LAG_THRESHOLD
+    if args.connect:
+        print_consumer(await consume_book(read_unix(args.connect), args.trader, args.tick_size,
+                                          args.log, lag_threshold), not args.fast)
+        return
+
+    flow = PoissonFlow(args.rate, args.volatility, args.jump_rate, args.jump_size, args.price,
+                       args.tick_size, np.random.default_rng(args.seed))
+    feed = OrderFeed(flow, realtime=not args.fast, on_full=args.on_full)
+    server = None
+    if args.socket:
+        server = await serve_unix(feed, args.socket, args.queue_size)
+        print(f"🔌 Serving order flow on {args.socket}")
+    consumers = []
+    if args.book:
+        queue = feed.subscribe('book', args.queue_size)
+        consumers.append(asyncio.create_task(
+            consume_book(iter_queue(queue), args.trader, args.tick_size, args.log, lag_threshold)))
+    if args.wait_clients:
+        print(f"⏳ Waiting for {args.wait_clients} socket client(s)")
+        await feed.wait_subscribers(args.wait_clients + len(consumers))
+
+    reporter = asyncio.create_task(report(feed, args.report_every))
+    duration = None if args.fast and args.events else args.duration
+    try:
+        await feed.run(duration, args.events)
+        for counts in await asyncio.gather(*consumers):
+            print_consumer(counts, not args.fast)
+        if feed.clients:
+            await asyncio.wait(feed.clients, timeout=DRAIN_SECONDS)
+    finally:
+        reporter.cancel()
+        if server is not None:
+            server.close()
+            os.unlink(args.socket)
+    print(feed.stats.line())
+    for name, dropped in feed.stats.dropped.items():
+        if dropped:
+            print(f"   {name}: {dropped:,} events dropped on a full queue")
+    print(f"✅ Feed finished, mid {flow.mid():.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Poisson order-flow feed for live runs and backtests")
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help='Order arrivals per second')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of order flow')
+    parser.add_argument('--events', type=int, default=None, help='Stop after this many events')
+    parser.add_argument('--fast', action='store_true',
+                        help='Generate as fast as consumers keep up instead of in real time (backtests); '
+                             'also pass it with --connect to a fast feed')
+    parser.add_argument('--volatility', type=float, default=DEFAULT_VOLATILITY,
+                        help='Annualised volatility of the mid price')
+    parser.add_argument('--jump-rate', type=float, default=DEFAULT_JUMP_RATE,
+                        help='Price jumps per second')
+    parser.add_argument('--jump-size', type=float, default=DEFAULT_JUMP_SIZE,
+                        help='Standard deviation of the log-size of a jump')
+    parser.add_argument('--price', type=float, default=100.0, help='Initial mid price')
+    parser.add_argument('--tick-size', type=float, default=0.01, help='Price of one tick')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed')
+    parser.add_argument('--socket', type=str, default=None, help='Publish on this Unix socket')
+    parser.add_argument('--wait-clients', type=int, default=0,
+                        help='Start once this many socket clients are connected')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help='Batches buffered per subscriber')
+    parser.add_argument('--on-full', choices=('drop', 'block'), default='drop',
+                        help='When a subscriber falls behind: drop its batches or stall the feed')
+    parser.add_argument('--book', action='store_true',
+                        help='Apply the flow to an in-process order book')
+    parser.add_argument('--connect', type=str, default=None,
+                        help='Consume the feed served on this Unix socket with an order book')
+    parser.add_argument('--trader', type=int, default=1, help='Trader whose fills are logged')
+    parser.add_argument('--log', type=str, default=None,
+                        help="Append the trader's fills to this simulation log (e.g. for dashboard.py)")
+    parser.add_argument('--report-every', type=float, default=1.0, help='Seconds between stats lines')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,494 @@
+"""
+Limit order book replay engine.
+
+Prices are integer ticks and every side of the book is a ladder: a Python
+list indexed by tick, each slot holding a ``PriceLevel`` (or None) whose
+orders sit in one contiguous list in arrival order. The best bid and ask are
+plain indices into those ladders, so reading the top of book is O(1) and a
+depleted level only costs a scan to the next populated tick. Orders are
+``__slots__`` records; cancels zero the order in place and drop it from the
+id map, and the level skips dead entries as its head advances (compacting
+once they outnumber the live ones), so cancels are O(1) amortised too.
+Matching is price-time priority and resting orders keep their remaining
+quantity after a partial fill.
+
+Events are a NumPy structured array (``EVENT_DTYPE``):
+
+    ts        int64  nanoseconds
+    kind      int8   ADD or CANCEL
+    order_id  int64
+    side      int8   +1 buy, -1 sell
+    price     int64  ticks (ignored for cancels)
+    qty       int32
+    trader    int32  owner of the order
+
+``replay`` feeds them through a book and turns the fills of one trader into
+``simulation_log.csv`` rows (timestamp, pnl marked to the fill price,
+inventory, price, qty, side).
+"""
+
+import argparse
+import gc
+import os
+
+import numpy as np
+import pandas as pd
+
+ADD = 0
+CANCEL = 1
+BUY = 1
+SELL = -1
+
+EVENT_DTYPE = np.dtype([
+    ('ts', '<i8'),
+    ('kind', 'i1'),
+    ('order_id', '<i8'),
+    ('side', 'i1'),
+    ('price', '<i8'),
+    ('qty', '<i4'),
+    ('trader', '<i4'),
+])
+
+FILL_DTYPE = np.dtype([
+    ('ts', '<i8'),
+    ('price', '<i8'),
+    ('qty', '<i4'),
+    ('side', 'i1'),          # aggressor side
+    ('maker_id', '<i8'),
+    ('taker_id', '<i8'),
+    ('maker_trader', '<i4'),
+    ('taker_trader', '<i4'),
+])
+
+# Resting orders in a book snapshot, in arrival order
+ORDER_DTYPE = np.dtype([
+    ('order_id', '<i8'),
+    ('side', 'i1'),
+    ('price', '<i8'),
+    ('qty', '<i4'),
+    ('ts', '<i8'),
+    ('trader', '<i4'),
+])
+
+KIND_CODES = {'add': ADD, 'cancel': CANCEL}
+SIDE_CODES = {'B': BUY, 'BUY': BUY, 'S': SELL, 'SELL': SELL}
+
+LADDER_GROWTH = 1024
+
+
+class Order:
+    __slots__ = ('id', 'side', 'price', 'qty', 'ts', 'trader')
+
+    def __init__(self, id, side, price, qty, ts, trader):
+        self.id = id
+        self.side = side
+        self.price = price
+        self.qty = qty
+        self.ts = ts
+        self.trader = trader
+
+
+class PriceLevel:
+    """Orders resting at one price, oldest first, starting at ``head``."""
+
+    __slots__ = ('orders', 'head', 'qty', 'live')
+
+    def __init__(self):
+        self.orders = []
+        self.head = 0
+        self.qty = 0
+        self.live = 0
+
+    def live_orders(self):
+        return [o for o in self.orders[self.head:] if o.qty > 0]
+
+
+class OrderBook:
+    """Price-time priority book over integer tick prices."""
+
+    def __init__(self):
+        self.bids = []
+        self.asks = []
+        self.best_bid = -1          # -1: no bids
+        self.best_ask = -1          # -1: no asks
+        self.orders = {}
+        self.fills = []
+        self._bid_levels = 0        # populated levels per side
+        self._ask_levels = 0
+
+    # -- top of book -----------------------------------------------------------
+
+    def top(self):
+        """``(bid, bid_qty, ask, ask_qty)``; missing sides are ``(-1, 0)``."""
+        bid_qty = self.bids[self.best_bid].qty if self.best_bid >= 0 else 0
+        ask_qty = self.asks[self.best_ask].qty if self.best_ask >= 0 else 0
+        return self.best_bid, bid_qty, self.best_ask, ask_qty
+
+    def mid(self):
+        if self.best_bid < 0 or self.best_ask < 0:
+            return None
+        return (self.best_bid + self.best_ask) / 2
+
+    def depth(self, side, levels=10):
+        """``[(price, qty), ...]`` for the best ``levels`` populated prices."""
+        ladder = self.bids if side == BUY else self.asks
+        price = self.best_bid if side == BUY else self.best_ask
+        step = -1 if side == BUY else 1
+        out = []
+        while price >= 0 and price < len(ladder) and len(out) < levels:
+            level = ladder[price]
+            if level is not None and level.qty:
+                out.append((price, level.qty))
+            price += step
+        return out
+
+    # -- events ----------------------------------------------------------------
+
+    def add(self, order_id, side, price, qty, ts=0, trader=0):
+        """Match an incoming limit order, then rest whatever is left."""
+        self.process([(ts, ADD, order_id, side, price, qty, trader)])
+
+    def cancel(self, order_id, ts=0):
+        """Remove a resting order; unknown or already filled ids are ignored."""
+        self.process([(ts, CANCEL, order_id, 0, 0, 0, 0)])
+
+    def process(self, events, on_fill=None):
+        """Apply an iterable of event tuples in ``EVENT_DTYPE`` field order.
+
+        Use ``iter_events`` for a structured array; iterating NumPy scalars
+        is several times slower. ``on_fill(fill_tuple)`` is called for every
+        fill if given, otherwise fills are appended to ``self.fills``.
+        """
+        # The book never forms reference cycles, but the cyclic collector
+        # would rescan every live order each time a few hundred new ones are
+        # allocated; suspending it doubles replay throughput.
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            self._process(events, on_fill)
+        finally:
+            if enabled:
+                gc.enable()
+
+    def _process(self, events, on_fill):
+        # Hot loop: everything is bound to locals and inlined
+        bids, asks, orders = self.bids, self.asks, self.orders
+        record = on_fill if on_fill is not None else self.fills.append
+        best_bid, best_ask = self.best_bid, self.best_ask
+        bid_levels, ask_levels = self._bid_levels, self._ask_levels
+
+        for ts, kind, oid, side, price, qty, trader in events:
+            if kind == CANCEL:
+                order = orders.pop(oid, None)
+                if order is None:
+                    continue
+                price = order.price
+                if order.side == BUY:
+                    level = bids[price]
+                    level.qty -= order.qty
+                    level.live -= 1
+                    order.qty = 0
+                    if level.qty == 0:
+                        level.orders = []
+                        level.head = 0
+                        bid_levels -= 1
+                        if price == best_bid:
+                            if bid_levels == 0:
+                                best_bid = -1
+                            else:
+                                best_bid -= 1
+                                while bids[best_bid] is None or bids[best_bid].qty == 0:
+                                    best_bid -= 1
+                else:
+                    level = asks[price]
+                    level.qty -= order.qty
+                    level.live -= 1
+                    order.qty = 0
+                    if level.qty == 0:
+                        level.orders = []
+                        level.head = 0
+                        ask_levels -= 1
+                        if price == best_ask:
+                            if ask_levels == 0:
+                                best_ask = -1
+                            else:
+                                best_ask += 1
+                                while asks[best_ask] is None or asks[best_ask].qty == 0:
+                                    best_ask += 1
+                if len(level.orders) - level.head > 2 * level.live + 16:
+                    level.orders = level.live_orders()
+                    level.head = 0
+                continue
+
+            if side == BUY:
+                # Cross against the asks
+                while qty and best_ask >= 0 and best_ask <= price:
+                    level = asks[best_ask]
+                    level_orders = level.orders
+                    head = level.head
+                    while qty:
+                        maker = level_orders[head]
+                        if maker.qty == 0:
+                            head += 1
+                            continue
+                        traded = maker.qty if maker.qty < qty else qty
+                        record((ts, best_ask, traded, BUY, maker.id, oid, maker.trader, trader))
+                        qty -= traded
+                        maker.qty -= traded
+                        level.qty -= traded
+                        if maker.qty == 0:
+                            del orders[maker.id]
+                            level.live -= 1
+                            head += 1
+                            if level.qty == 0:
+                                break
+                    if level.qty == 0:
+                        level.orders = []
+                        level.head = 0
+                        ask_levels -= 1
+                        if ask_levels == 0:
+                            best_ask = -1
+                        else:
+                            best_ask += 1
+                            while asks[best_ask] is None or asks[best_ask].qty == 0:
+                                best_ask += 1
+                    else:
+                        level.head = head
+                if not qty:
+                    continue
+                if price < 0:
+                    raise ValueError(f"Order {oid}: negative price {price} ticks")
+                try:
+                    level = bids[price]
+                except IndexError:
+                    bids.extend([None] * (price - len(bids) + LADDER_GROWTH))
+                    level = None
+                if level is None:
+                    level = bids[price] = PriceLevel()
+                if level.qty == 0:
+                    bid_levels += 1
+                    if price > best_bid:
+                        best_bid = price
+                order = Order(oid, BUY, price, qty, ts, trader)
+                level.orders.append(order)
+                level.qty += qty
+                level.live += 1
+                orders[oid] = order
+            else:
+                # Cross against the bids
+                while qty and best_bid >= 0 and best_bid >= price:
+                    level = bids[best_bid]
+                    level_orders = level.orders
+                    head = level.head
+                    while qty:
+                        maker = level_orders[head]
+                        if maker.qty == 0:
+                            head += 1
+                            continue
+                        traded = maker.qty if maker.qty < qty else qty
+                        record((ts, best_bid, traded, SELL, maker.id, oid, maker.trader, trader))
+                        qty -= traded
+                        maker.qty -= traded
+                        level.qty -= traded
+                        if maker.qty == 0:
+                            del orders[maker.id]
+                            level.live -= 1
+                            head += 1
+                            if level.qty == 0:
+                                break
+                    if level.qty == 0:
+                        level.orders = []
+                        level.head = 0
+                        bid_levels -= 1
+                        if bid_levels == 0:
+                            best_bid = -1
+                        else:
+                            best_bid -= 1
+                            while bids[best_bid] is None or bids[best_bid].qty == 0:
+                                best_bid -= 1
+                    else:
+                        level.head = head
+                if not qty:
+                    continue
+                if price < 0:
+                    raise ValueError(f"Order {oid}: negative price {price} ticks")
+                try:
+                    level = asks[price]
+                except IndexError:
+                    asks.extend([None] * (price - len(asks) + LADDER_GROWTH))
+                    level = None
+                if level is None:
+                    level = asks[price] = PriceLevel()
+                if level.qty == 0:
+                    ask_levels += 1
+                    if best_ask < 0 or price < best_ask:
+                        best_ask = price
+                order = Order(oid, SELL, price, qty, ts, trader)
+                level.orders.append(order)
+                level.qty += qty
+                level.live += 1
+                orders[oid] = order
+
+        self.best_bid, self.best_ask = best_bid, best_ask
+        self._bid_levels, self._ask_levels = bid_levels, ask_levels
+
+    def fills_array(self):
+        """Fills recorded so far as a ``FILL_DTYPE`` structured array."""
+        return np.array(self.fills, dtype=FILL_DTYPE)
+
+    def snapshot(self):
+        """Every resting order as an ``ORDER_DTYPE`` array, in arrival order.
+
+        The id map keeps insertion order, which is also each level's time
+        priority, so ``from_snapshot`` rebuilds an identical book.
+        """
+        return np.array([(o.id, o.side, o.price, o.qty, o.ts, o.trader) for o in self.orders.values()],
+                        dtype=ORDER_DTYPE)
+
+    @classmethod
+    def from_snapshot(cls, records):
+        """A book holding the resting orders of a ``snapshot()``."""
+        book = cls()
+        n = len(records)
+        # A snapshot is never crossed, so re-adding the orders only rests them
+        book.process(zip(records['ts'].tolist(), [ADD] * n, records['order_id'].tolist(),
+                         records['side'].tolist(), records['price'].tolist(),
+                         records['qty'].tolist(), records['trader'].tolist()))
+        return book
+
+
+def iter_events(events):
+    """Event tuples from a structured array, via fast per-column ``tolist``."""
+    return zip(*(events[name].tolist() for name in EVENT_DTYPE.names))
+
+
+def load_events(path):
+    """Read an event log: ``.npy`` in ``EVENT_DTYPE`` or a CSV with its columns.
+
+    In CSVs ``kind`` may be ``add``/``cancel`` and ``side`` ``B``/``S``;
+    ``ts`` may be a timestamp string or integer nanoseconds.
+    """
+    if path.endswith('.npy'):
+        return np.load(path, mmap_mode='r')
+    df = pd.read_csv(path)
+    events = np.zeros(len(df), dtype=EVENT_DTYPE)
+    for name in EVENT_DTYPE.names:
+        if name not in df:
+            continue
+        values = df[name]
+        if name == 'ts' and values.dtype.kind not in 'iu':
+            values = pd.to_datetime(values, format='mixed').astype('datetime64[ns]').astype('int64')
+        elif name == 'kind' and values.dtype == object:
+            values = values.str.lower().map(KIND_CODES)
+        elif name == 'side' and values.dtype == object:
+            values = values.str.upper().map(SIDE_CODES)
+        events[name] = values.to_numpy()
+    return events
+
+
+def synthetic_events(n, rng=None, mid=10_000, spread=10, depth=50, cancel_rate=0.3,
+                     cross_rate=0.1, cross_depth=3, traders=10, start='2024-01-01T09:30'):
+    """Random order flow around ``mid`` ticks, for benchmarks and demos.
+
+    ``mid`` is a scalar or one value per event (a price path). A fraction
+    ``cancel_rate`` of events cancel an earlier order and ``cross_rate`` of
+    adds are priced up to ``cross_depth`` ticks through the touch.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    events = np.zeros(n, dtype=EVENT_DTYPE)
+    start_ns = np.datetime64(start, 'ns').astype(np.int64)
+    events['ts'] = start_ns + np.cumsum(rng.exponential(1e6, n)).astype(np.int64)
+    events['order_id'] = np.arange(n)
+    events['trader'] = rng.integers(0, traders, n)
+
+    cancel = rng.random(n) < cancel_rate
+    cancel[0] = False
+    events['kind'][cancel] = CANCEL
+    # Cancel a random earlier order, recent ones being more likely
+    idx = np.flatnonzero(cancel)
+    events['order_id'][cancel] = np.maximum(idx - rng.geometric(1 / 50, len(idx)), 0)
+
+    side = np.where(rng.random(n) < 0.5, BUY, SELL).astype(np.int8)
+    offset = spread // 2 + rng.integers(0, depth, n)
+    cross = rng.random(n) < cross_rate
+    offset[cross] = -rng.integers(spread // 2, spread // 2 + cross_depth, cross.sum())
+    events['side'] = np.where(cancel, 0, side)
+    events['price'] = np.where(cancel, 0, np.asarray(mid, dtype=np.int64) - side * offset)
+    events['qty'] = np.where(cancel, 0, rng.integers(1, 10, n) * 10)
+    return events
+
+
+def replay(events, trader, output=None, tick_size=0.01, book=None, every=None, on_checkpoint=None,
+           state=None):
+    """Replay events and log ``trader``'s fills as simulation log rows.
+
+    Every fill involving ``trader`` (as maker or taker) emits a row with its
+    inventory and P&L marked to the fill price. Rows are written to
+    ``output`` as CSV when given and returned as a DataFrame otherwise.
+    With ``every``, ``on_checkpoint(book, n)`` is called after each ``every``
+    events, ``n`` being the number applied so far (see book_index.py).
+    Passing the same ``book`` and ``state`` dict to successive calls replays
+    a stream in batches, cash and inventory carrying over.
+    """
+    book = book if book is not None else OrderBook()
+    rows = []
+    state = state if state is not None else {}
+    state.setdefault('cash', 0)
+    state.setdefault('inventory', 0)
+
+    def on_fill(fill):
+        ts, price, qty, aggressor, _, _, maker_trader, taker_trader = fill
+        if maker_trader == trader and taker_trader == trader:
+            return
+        if maker_trader == trader:
+            side = -aggressor
+        elif taker_trader == trader:
+            side = aggressor
+        else:
+            return
+        state['inventory'] += side * qty
+        state['cash'] -= side * qty * price
+        rows.append((ts, state['cash'], state['inventory'], price, qty, side))
+
+    if every and on_checkpoint is not None:
+        for start in range(0, len(events), every):
+            book.process(iter_events(events[start:start + every]), on_fill=on_fill)
+            on_checkpoint(book, min(start + every, len(events)))
+    else:
+        book.process(iter_events(events) if isinstance(events, np.ndarray) else events, on_fill=on_fill)
+
+    if not rows:
+        frame = pd.DataFrame(columns=['timestamp', 'pnl', 'inventory', 'price', 'qty', 'side'])
+    else:
+        ts, cash, inventory, price, qty, side = (np.array(c) for c in zip(*rows))
+        frame = pd.DataFrame({
+            'timestamp': ts.astype('datetime64[ns]'),
+            'pnl': np.round((cash + inventory * price) * tick_size, 10),
+            'inventory': inventory,
+            'price': np.round(price * tick_size, 10),
+            'qty': qty,
+            'side': np.where(side == BUY, 'B', 'S'),
+        })
+    if output is not None:
+        frame.to_csv(output, index=False)
+    return frame
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay an order event log and write simulation_log.csv")
+    parser.add_argument('--events', type=str, help='Event log (.npy or .csv); synthetic flow if omitted')
+    parser.add_argument('--synthetic', type=int, default=1_000_000, help='Number of synthetic events')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for synthetic events')
+    parser.add_argument('--trader', type=int, default=1, help='Trader whose fills are logged')
+    parser.add_argument('--tick-size', type=float, default=0.01, help='Price of one tick')
+    parser.add_argument('--output', type=str, default='results/simulation_log.csv', help='Output CSV')
+    args = parser.parse_args()
+
+    if args.events:
+        events = load_events(args.events)
+    else:
+        events = synthetic_events(args.synthetic, np.random.default_rng(args.seed))
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    frame = replay(events, args.trader, args.output, args.tick_size)
+    print(f"✅ Replayed {len(events):,} events, {len(frame):,} fills for trader {args.trader} -> {args.output}")
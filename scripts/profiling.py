@@ -0,0 +1,193 @@
+"""
+Opt-in per-stage profiling.
+
+Pipeline code marks its stages with ``with stage('name'):``. Unless
+profiling is enabled this is a shared no-op context manager, so the hooks
+cost next to nothing in normal runs. ``configure(path)`` (or the
+``QUANTRUSH_PROFILE`` environment variable, set to an output path or to
+``1`` for ``results/profile.json``) turns it on: every stage then records
+its wall time, the CPU time of its thread and the tracemalloc peak reached
+while it ran, and the events are written at exit as a Chrome trace
+(open it in chrome://tracing or https://ui.perfetto.dev).
+
+``peak_kb`` is the highest traced memory while the stage ran and
+``alloc_kb`` how far that rose above the level at its start. tracemalloc is
+process-wide, so stages running concurrently on other threads show up in
+each other's peaks, and it slows allocation-heavy code, so profiled timings
+run higher than unprofiled ones. An outer stage's peak includes its inner
+stages.
+
+``LatencyTracker`` keeps the most recent durations per name and reports
+percentiles; the dashboard serves them at ``/debug/latency``.
+"""
+
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+
+import numpy as np
+
+ENV_VAR = 'QUANTRUSH_PROFILE'
+DEFAULT_TRACE = 'results/profile.json'
+MAX_EVENTS = 100_000
+
+_NULL = contextlib.nullcontext()
+_enabled = False
+_output = None
+_events = deque(maxlen=MAX_EVENTS)
+_local = threading.local()
+_origin = time.perf_counter()
+
+
+def enabled():
+    return _enabled
+
+
+def configure(path=None):
+    """Enable profiling if ``path`` is given or ``QUANTRUSH_PROFILE`` is set.
+
+    Returns the trace path, or None when profiling stays off.
+    """
+    global _enabled, _output
+    path = path or os.environ.get(ENV_VAR)
+    if not path or path == '0':
+        return None
+    if path == '1':
+        path = DEFAULT_TRACE
+    if not _enabled:
+        tracemalloc.start()
+        atexit.register(write_trace)
+    _enabled, _output = True, path
+    return path
+
+
+class _Stage:
+    __slots__ = ('name', 'args', 'wall', 'cpu', 'start_memory', 'inner_peak')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.start_memory, peak = tracemalloc.get_traced_memory()
+        if stack:
+            # Fold the parent's peak so far before resetting it for this stage
+            stack[-1].inner_peak = max(stack[-1].inner_peak, peak)
+        tracemalloc.reset_peak()
+        self.inner_peak = 0
+        stack.append(self)
+        self.cpu = time.thread_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        cpu = time.thread_time() - self.cpu
+        peak = max(self.inner_peak, tracemalloc.get_traced_memory()[1])
+        stack = _local.stack
+        stack.pop()
+        if stack:
+            stack[-1].inner_peak = max(stack[-1].inner_peak, peak)
+        _events.append({
+            'name': self.name,
+            'cat': 'stage',
+            'ph': 'X',
+            'ts': (self.wall - _origin) * 1e6,
+            'dur': (end - self.wall) * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': {'cpu_ms': round(cpu * 1e3, 3), 'peak_kb': round(peak / 1024, 1),
+                     'alloc_kb': round((peak - self.start_memory) / 1024, 1), **self.args},
+        })
+        return False
+
+
+def stage(name, **args):
+    """Context manager timing one pipeline stage; ``args`` are added to the trace event."""
+    if not _enabled:
+        return _NULL
+    return _Stage(name, args)
+
+
+def events():
+    return list(_events)
+
+
+def write_trace(path=None):
+    """Write the recorded stages as a Chrome trace; returns the path written."""
+    path = path or _output
+    if not path or not _events:
+        return None
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'traceEvents': list(_events), 'displayTimeUnit': 'ms'}, f)
+    os.replace(tmp, path)
+    return path
+
+
+def summary():
+    """Per-stage count, total wall/CPU milliseconds and largest peak, slowest first."""
+    totals = defaultdict(lambda: [0, 0.0, 0.0, 0.0])
+    for event in list(_events):
+        row = totals[event['name']]
+        row[0] += 1
+        row[1] += event['dur'] / 1e3
+        row[2] += event['args']['cpu_ms']
+        row[3] = max(row[3], event['args']['peak_kb'])
+    rows = [(name, *values) for name, values in totals.items()]
+    return sorted(rows, key=lambda row: -row[2])
+
+
+def print_summary():
+    rows = summary()
+    if not rows:
+        return
+    width = max(len(row[0]) for row in rows)
+    print(f"⏱️  {'stage':<{width}}  calls    wall ms     cpu ms   peak MB")
+    for name, count, wall, cpu, peak in rows:
+        print(f"   {name:<{width}}  {count:>5}  {wall:>9.1f}  {cpu:>9.1f}  {peak / 1024:>8.1f}")
+
+
+class LatencyTracker:
+    """Most recent ``capacity`` durations per name, with percentiles."""
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self._samples = defaultdict(lambda: deque(maxlen=capacity))
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        with self._lock:
+            self._samples[name].append(seconds)
+
+    @contextlib.contextmanager
+    def measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def percentiles(self, quantiles=(50, 90, 99)):
+        """``{name: {'count', 'p50_ms', ..., 'max_ms'}}`` over the recent samples."""
+        with self._lock:
+            samples = {name: np.array(values) for name, values in self._samples.items()}
+        report = {}
+        for name, values in samples.items():
+            if not len(values):
+                continue
+            entry = {'count': len(values)}
+            for q, value in zip(quantiles, np.percentile(values, quantiles)):
+                entry[f'p{q}_ms'] = round(float(value) * 1e3, 3)
+            entry['max_ms'] = round(float(values.max()) * 1e3, 3)
+            report[name] = entry
+        return report
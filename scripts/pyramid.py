@@ -0,0 +1,183 @@
+"""
+Multi-resolution pre-aggregation of the simulation log.
+
+Each level keeps fixed-width time buckets with first/last/min/max/mean of
+every tracked column. Levels are fed the newly ingested rows only, so the
+cost of keeping the pyramid current is proportional to the data appended,
+and a query for any x-range touches at most a point budget's worth of
+buckets at the level chosen for it.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from log_tail import ColumnBuffer
+
+NS_PER_SECOND = 1_000_000_000
+
+DEFAULT_LEVELS = (
+    ('1s', NS_PER_SECOND),
+    ('1min', 60 * NS_PER_SECOND),
+    ('1h', 3600 * NS_PER_SECOND),
+)
+
+
+def to_ns(timestamps):
+    """Nanosecond int64 view of a datetime64 array of any resolution."""
+    return np.asarray(timestamps).astype('datetime64[ns]').view('i8')
+
+
+class AggregateLevel:
+    """Buckets of ``width`` nanoseconds over the given value columns.
+
+    Completed buckets are appended to a ``ColumnBuffer``; the bucket still
+    receiving rows is held separately until a later timestamp closes it.
+    """
+
+    def __init__(self, name, width, columns):
+        self.name = name
+        self.width = width
+        self.columns = tuple(columns)
+        self.clear()
+
+    def clear(self):
+        self._closed = ColumnBuffer()
+        self._open = None
+
+    def __len__(self):
+        return len(self._closed) + (self._open is not None)
+
+    def update(self, ts_ns, values):
+        """Fold rows (sorted by time) into the level."""
+        if len(ts_ns) == 0:
+            return
+        keys = ts_ns // self.width
+        if self._open is not None:
+            # Out-of-order rows are folded into the still-open bucket
+            keys = np.maximum(keys, self._open['bucket'])
+        keys = np.maximum.accumulate(keys)
+
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        ends = np.r_[starts[1:], len(keys)]
+        new = {'bucket': keys[starts], 'count': ends - starts}
+        for col in self.columns:
+            v = np.asarray(values[col], dtype=np.float64)
+            new[f'{col}_first'] = v[starts]
+            new[f'{col}_last'] = v[ends - 1]
+            new[f'{col}_min'] = np.minimum.reduceat(v, starts)
+            new[f'{col}_max'] = np.maximum.reduceat(v, starts)
+            new[f'{col}_sum'] = np.add.reduceat(v, starts)
+
+        if self._open is not None and new['bucket'][0] == self._open['bucket']:
+            merged = self._merge_open(new)
+        else:
+            merged = None
+            if self._open is not None:
+                self._append_closed({k: np.array([v]) for k, v in self._open.items()})
+
+        if merged is not None:
+            new = {k: v[1:] for k, v in new.items()}
+            if len(new['bucket']) == 0:
+                self._open = merged
+                return
+            self._append_closed({k: np.array([v]) for k, v in merged.items()})
+
+        # Everything but the newest bucket is final
+        self._append_closed({k: v[:-1] for k, v in new.items()})
+        self._open = {k: v[-1] for k, v in new.items()}
+
+    def _merge_open(self, new):
+        cur = self._open
+        merged = {'bucket': cur['bucket'], 'count': cur['count'] + new['count'][0]}
+        for col in self.columns:
+            merged[f'{col}_first'] = cur[f'{col}_first']
+            merged[f'{col}_last'] = new[f'{col}_last'][0]
+            merged[f'{col}_min'] = min(cur[f'{col}_min'], new[f'{col}_min'][0])
+            merged[f'{col}_max'] = max(cur[f'{col}_max'], new[f'{col}_max'][0])
+            merged[f'{col}_sum'] = cur[f'{col}_sum'] + new[f'{col}_sum'][0]
+        return merged
+
+    def _append_closed(self, rows):
+        if len(rows['bucket']):
+            self._closed.append(pd.DataFrame(rows))
+
+    def query(self, start_ns=None, end_ns=None):
+        """Bucket arrays overlapping ``[start_ns, end_ns]``, including the open bucket.
+
+        Returns a dict with ``timestamp`` (bucket start, ns) and, per column,
+        ``first``/``last``/``min``/``max``/``mean`` arrays.
+        """
+        out = {}
+        n = len(self._closed)
+        if n:
+            buckets = self._closed.column('bucket')
+            lo = 0 if start_ns is None else np.searchsorted(buckets, start_ns // self.width)
+            hi = n if end_ns is None else np.searchsorted(buckets, end_ns // self.width, side='right')
+            closed = {k: self._closed.column(k)[lo:hi] for k in self._closed.columns}
+        else:
+            closed = None
+
+        open_ = self._open
+        if open_ is not None and end_ns is not None and open_['bucket'] > end_ns // self.width:
+            open_ = None
+
+        def column(key):
+            parts = []
+            if closed is not None:
+                parts.append(closed[key])
+            if open_ is not None:
+                parts.append([open_[key]])
+            return np.concatenate(parts) if parts else np.empty(0)
+
+        count = column('count')
+        out['timestamp'] = (column('bucket') * self.width).astype('datetime64[ns]')
+        for col in self.columns:
+            out[col] = {
+                'first': column(f'{col}_first'),
+                'last': column(f'{col}_last'),
+                'min': column(f'{col}_min'),
+                'max': column(f'{col}_max'),
+                'mean': column(f'{col}_sum') / np.maximum(count, 1),
+            }
+        return out
+
+
+class AggregatePyramid:
+    """Stack of ``AggregateLevel`` from finest to coarsest, updated incrementally."""
+
+    def __init__(self, columns=('pnl', 'inventory'), levels=DEFAULT_LEVELS, time_column='timestamp'):
+        self.columns = tuple(columns)
+        self.time_column = time_column
+        self.levels = [AggregateLevel(name, width, self.columns) for name, width in levels]
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            for level in self.levels:
+                level.clear()
+
+    def update(self, frame):
+        """Fold newly ingested rows (a DataFrame slice) into every level."""
+        if len(frame) == 0:
+            return
+        ts_ns = to_ns(frame[self.time_column].to_numpy())
+        values = {col: frame[col].to_numpy() for col in self.columns}
+        with self._lock:
+            for level in self.levels:
+                level.update(ts_ns, values)
+
+    def choose_level(self, start_ns, end_ns, max_points):
+        """Finest level whose bucket count over the range fits ``max_points``."""
+        span = max(end_ns - start_ns, 0)
+        for level in self.levels:
+            if span // level.width + 1 <= max_points:
+                return level
+        return self.levels[-1]
+
+    def query(self, start_ns, end_ns, max_points):
+        """``(level_name, buckets)`` for the range at the best fitting resolution."""
+        with self._lock:
+            level = self.choose_level(start_ns, end_ns, max_points)
+            return level.name, level.query(start_ns, end_ns)
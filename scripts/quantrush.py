@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the QuantRush tools.
+
+    quantrush report     performance report of a simulation log (generate_report.py)
+    quantrush dashboard  real-time dashboard (dashboard.py)
+    quantrush charts     performance charts and strategy diagrams (assets/)
+    quantrush sweep      parallel parameter sweep (sweep.py)
+
+Only the chosen command's module is imported, and the modules themselves
+import matplotlib, seaborn, Dash and Plotly inside the functions that draw
+or serve. ``--help`` and metrics-only runs (``report --no-plots``) start
+with numpy and pandas alone; ``benchmarks/run.py --only cli_help,cli_metrics``
+tracks that startup time.
+"""
+
+import argparse
+import importlib
+import os
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSETS_DIR = os.path.join(SCRIPTS_DIR, '..', 'assets')
+
+# command -> (module with build_parser / main, summary)
+COMMANDS = {
+    'report': ('generate_report', 'Generate the performance report of a simulation log'),
+    'dashboard': ('dashboard', 'Serve the real-time dashboard'),
+    'charts': (None, 'Generate the performance charts and strategy diagrams'),
+    'sweep': ('sweep', 'Sweep market maker parameters across all cores'),
+}
+
+
+def charts(argv=None, prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description=COMMANDS['charts'][1])
+    parser.add_argument('--only', choices=['performance', 'strategy'],
+                        help='Generate one set of figures only')
+    parser.add_argument('--jobs', type=int, default=None, help='Render processes (default: all cores)')
+    parser.add_argument('--force', action='store_true', help='Redraw figures even if unchanged')
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, ASSETS_DIR)
+    if args.only in (None, 'performance'):
+        importlib.import_module('performancechart').main(args.jobs, args.force)
+    if args.only in (None, 'strategy'):
+        importlib.import_module('MarketMakingStrategy').main(args.jobs, args.force)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='quantrush', description="QuantRush market-making toolkit",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='commands:\n' + '\n'.join(f'  {name:<10} {summary}'
+                                         for name, (_, summary) in COMMANDS.items())
+              + "\n\nRun 'quantrush <command> --help' for a command's options.")
+    parser.add_argument('command', choices=COMMANDS, metavar='command')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    prog = f'quantrush {args.command}'
+    module = COMMANDS[args.command][0]
+    if module is None:
+        return charts(args.args, prog)
+    sys.path.insert(0, SCRIPTS_DIR)
+    return importlib.import_module(module).main(args.args, prog=prog)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Parallel, cached rendering of independent matplotlib figures.
+
+A ``FigureJob`` names an output file, the module-level function that builds
+the figure and the arguments it is called with. Every job is keyed by a
+SHA-256 of its inputs: the builder's name, the source of its module and of
+every project module reachable from there through module-level names (so
+constants such as sample data and helpers such as a histogram's ``plot``
+count too), its arguments (DataFrames and arrays by content, other objects
+by their pickle), the ``savefig`` options and the matplotlib version. Keys of finished outputs
+are kept in ``.render_cache.json`` next to them, so a job whose key and
+output file are unchanged is skipped.
+
+Pending jobs are drawn in a process pool on the Agg backend, one figure per
+task; the builder and its arguments are pickled to the worker, so builders
+must be importable functions. Each figure is written to a temporary file
+and renamed into place, and ``print_summary`` reports what was drawn.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sys
+import sysconfig
+import tempfile
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+import numpy as np
+import pandas as pd
+
+MANIFEST_NAME = '.render_cache.json'
+SAVE_OPTIONS = {'dpi': 300, 'bbox_inches': 'tight', 'facecolor': 'white', 'edgecolor': 'none'}
+# Modules under these are installed packages, covered by their version rather than their source
+LIBRARY_PATHS = tuple(sorted({os.path.realpath(sysconfig.get_path(name))
+                              for name in ('stdlib', 'platstdlib', 'purelib', 'platlib')}))
+
+
+class FigureJob:
+    """One output file: ``build(*args, **kwargs)`` saved with ``savefig`` options."""
+
+    def __init__(self, output, build, args=(), kwargs=None, savefig=None):
+        self.output = output
+        self.build = build
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs or {})
+        self.savefig = dict(SAVE_OPTIONS if savefig is None else savefig)
+
+    def key(self):
+        digest = hashlib.sha256()
+        # The defining file rather than __module__, which is '__main__' when run as a script
+        try:
+            source_file = os.path.basename(inspect.getfile(self.build))
+        except TypeError:
+            source_file = self.build.__module__
+        digest.update(f"{source_file}:{self.build.__qualname__}".encode())
+        for path in source_files(self.build):
+            digest.update(os.path.basename(path).encode())
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        _hash_value(digest, self.args)
+        _hash_value(digest, sorted(self.kwargs.items()))
+        _hash_value(digest, sorted(self.savefig.items()))
+        digest.update(matplotlib.__version__.encode())
+        return digest.hexdigest()
+
+
+def _project_file(obj):
+    """Source file of the project module defining ``obj``, or None."""
+    module = obj if isinstance(obj, types.ModuleType) else sys.modules.get(getattr(obj, '__module__', None))
+    path = getattr(module, '__file__', None)
+    if not path or not path.endswith('.py'):
+        return None
+    path = os.path.realpath(path)
+    return None if path.startswith(LIBRARY_PATHS) else path
+
+
+def source_files(build):
+    """Sorted source files of ``build``'s module and the project modules it reaches.
+
+    Modules are followed through their globals: imported modules, functions
+    and classes, transitively.
+    """
+    start = _project_file(build)
+    if start is None:
+        return []
+    files = {start: sys.modules[build.__module__]}
+    pending = [start]
+    while pending:
+        module = files[pending.pop()]
+        for value in list(vars(module).values()):
+            path = _project_file(value)
+            if path is not None and path not in files:
+                files[path] = value if isinstance(value, types.ModuleType) else sys.modules[value.__module__]
+                pending.append(path)
+    return sorted(files)
+
+
+def _hash_value(digest, value):
+    """Feed ``value`` to ``digest`` by content."""
+    if isinstance(value, pd.DataFrame):
+        digest.update(b'frame')
+        digest.update(repr(list(value.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        digest.update(b'series')
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(f"array{value.dtype.str}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        digest.update(b'dict')
+        _hash_value(digest, sorted(value.items(), key=lambda item: repr(item[0])))
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode())
+        for item in value:
+            _hash_value(digest, item)
+    elif value is None or isinstance(value, (bool, int, float, str, bytes)):
+        digest.update(repr(value).encode())
+    else:
+        digest.update(pickle.dumps(value, protocol=4))
+
+
+def _use_agg():
+    matplotlib.use('Agg')
+
+
+def _render(build, args, kwargs, output, savefig):
+    """Draw and save one figure; returns the seconds it took."""
+    import matplotlib.pyplot as plt
+
+    start = time.perf_counter()
+    fig = build(*args, **kwargs)
+    directory = os.path.dirname(output) or '.'
+    suffix = os.path.splitext(output)[1]
+    fd, tmp = tempfile.mkstemp(prefix='.render-', suffix=suffix, dir=directory)
+    os.close(fd)
+    try:
+        fig.savefig(tmp, **savefig)
+        os.replace(tmp, output)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    finally:
+        plt.close(fig)
+    return time.perf_counter() - start
+
+
+def _load_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(path, manifest):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def render_figures(jobs, workers=None, force=False):
+    """Render the jobs whose inputs changed; returns ``[(output, status, seconds)]``.
+
+    ``status`` is ``'rendered'`` or ``'cached'``. ``workers`` defaults to
+    one process per pending figure, capped at the CPU count; with a single
+    worker figures are drawn in this process.
+    """
+    results = {}
+    pending = []
+    manifests = {}
+    for job in jobs:
+        os.makedirs(os.path.dirname(job.output) or '.', exist_ok=True)
+        manifest_path = os.path.join(os.path.dirname(job.output) or '.', MANIFEST_NAME)
+        manifest = manifests.setdefault(manifest_path, _load_manifest(manifest_path))
+        name = os.path.basename(job.output)
+        key = job.key()
+        if not force and manifest.get(name) == key and os.path.exists(job.output):
+            results[job.output] = (job.output, 'cached', 0.0)
+        else:
+            pending.append((job, manifest_path, name, key))
+
+    workers = min(workers or os.cpu_count() or 1, max(len(pending), 1))
+
+    def finished(job, manifest_path, name, key, seconds):
+        results[job.output] = (job.output, 'rendered', seconds)
+        manifests[manifest_path][name] = key
+        _save_manifest(manifest_path, manifests[manifest_path])
+
+    if workers == 1:
+        _use_agg()
+        for job, manifest_path, name, key in pending:
+            seconds = _render(job.build, job.args, job.kwargs, job.output, job.savefig)
+            finished(job, manifest_path, name, key, seconds)
+    elif pending:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_use_agg) as pool:
+            futures = {pool.submit(_render, job.build, job.args, job.kwargs, job.output, job.savefig):
+                       (job, manifest_path, name, key)
+                       for job, manifest_path, name, key in pending}
+            for future in as_completed(futures):
+                finished(*futures[future], future.result())
+    return [results[job.output] for job in jobs]
+
+
+def print_summary(results, elapsed):
+    """Per-figure timing table."""
+    width = max((len(output) for output, _, _ in results), default=0)
+    for output, status, seconds in results:
+        timing = f"{seconds:6.2f}s" if status == 'rendered' else '      -'
+        print(f"   {output:<{width}}  {timing}  {status}")
+    rendered = sum(status == 'rendered' for _, status, _ in results)
+    print(f"   {rendered} rendered, {len(results) - rendered} unchanged, {elapsed:.2f}s total")
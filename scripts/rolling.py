@@ -0,0 +1,207 @@
+"""
+Vectorized rolling-window performance metrics.
+
+All functions take whole NumPy arrays and avoid per-window Python loops:
+
+* ``rolling_mean_std`` / ``rolling_sharpe`` use cumulative sums, O(n).
+* ``rolling_max`` / ``rolling_min`` use the van Herk/Gil-Werman block scheme,
+  the vectorized equivalent of a monotonic deque: O(n) with three
+  comparisons per element regardless of the window length.
+* ``rolling_drawdown`` is the drawdown from the trailing-window peak, O(n).
+* ``rolling_max_drawdown`` is the worst drawdown *inside* each window (the
+  peak restarts at the window's first point), which is what
+  ``assets/performancechart.py`` plots. The peaks inside a window form a
+  chain of "next greater element" links; it is resolved with sparse tables
+  and binary lifting in O(n log w) vectorized work, processed in chunks so
+  memory stays bounded.
+
+Outputs are aligned with the input: element ``i`` describes the window that
+ends at ``i`` and the first ``window`` elements hold ``fill``.
+"""
+
+import numpy as np
+
+TRADING_MINUTES_PER_YEAR = 390 * 252
+_CHUNK = 1 << 18
+
+
+def _windows(n, window):
+    if window < 1:
+        raise ValueError("window must be at least 1")
+    return max(n - window, 0)
+
+
+def rolling_mean_std(values, window):
+    """Mean and population std of ``values[i-window:i]`` for each ``i >= window``.
+
+    Returned arrays have ``len(values) - window`` entries, the first one
+    describing ``values[0:window]``.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    count = _windows(len(values), window)
+    if count == 0:
+        return np.empty(0), np.empty(0)
+    # Centre first so the cumulative sums stay well conditioned on long series
+    shift = values.mean()
+    centred = values - shift
+    s1 = np.concatenate(([0.0], np.cumsum(centred)))
+    s2 = np.concatenate(([0.0], np.cumsum(centred * centred)))
+    sum1 = s1[window:window + count] - s1[:count]
+    sum2 = s2[window:window + count] - s2[:count]
+    mean = sum1 / window
+    var = np.maximum(sum2 / window - mean * mean, 0.0)
+    # Differences of running sums never cancel exactly, so flat windows are
+    # found directly and given exactly zero spread
+    flat = (_rolling_extreme(values, window, np.maximum, -np.inf)[:count]
+            == _rolling_extreme(values, window, np.minimum, np.inf)[:count])
+    var[flat] = 0.0
+    return mean + shift, np.sqrt(var)
+
+
+def rolling_sharpe(returns, window, periods_per_year=TRADING_MINUTES_PER_YEAR, fill=0.0):
+    """Annualised Sharpe ratio of the ``window`` returns preceding each point."""
+    returns = np.asarray(returns, dtype=np.float64)
+    out = np.full(len(returns), fill, dtype=np.float64)
+    mean, std = rolling_mean_std(returns, window)
+    sharpe = np.zeros_like(mean)
+    ok = std > 0
+    sharpe[ok] = mean[ok] / std[ok] * np.sqrt(periods_per_year)
+    out[window:] = sharpe
+    return out
+
+
+def _rolling_extreme(values, length, op, identity):
+    """``op`` over ``values[i-length+1:i+1]`` for every ``i >= length - 1``."""
+    n = len(values)
+    if length > n:
+        return np.empty(0)
+    blocks = -(-n // length)
+    padded = np.full(blocks * length, identity)
+    padded[:n] = values
+    grid = padded.reshape(blocks, length)
+    prefix = op.accumulate(grid, axis=1).ravel()
+    suffix = op.accumulate(grid[:, ::-1], axis=1)[:, ::-1].ravel()
+    ends = np.arange(length - 1, n)
+    return op(suffix[ends - length + 1], prefix[ends])
+
+
+def rolling_max(values, window):
+    """Max of the ``window + 1`` points ending at each ``i >= window``."""
+    return _rolling_extreme(np.asarray(values, dtype=np.float64), window + 1, np.maximum, -np.inf)
+
+
+def rolling_min(values, window):
+    """Min of the ``window + 1`` points ending at each ``i >= window``."""
+    return _rolling_extreme(np.asarray(values, dtype=np.float64), window + 1, np.minimum, np.inf)
+
+
+def _drawdown(x, peak, relative):
+    if not relative:
+        return x - peak
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (x - peak) / peak * 100
+
+
+def rolling_drawdown(cumulative, window, relative=True, fill=0.0):
+    """Drawdown of each point from the highest point of its trailing window."""
+    cumulative = np.asarray(cumulative, dtype=np.float64)
+    out = np.full(len(cumulative), fill, dtype=np.float64)
+    peak = rolling_max(cumulative, window)
+    out[window:] = _drawdown(cumulative[window:], peak, relative)
+    return out
+
+
+class _SparseTable:
+    """Range max/min queries in O(1) after O(n log w) vectorized setup.
+
+    Values are padded with +inf so windows running past the end never
+    compare as "not greater" and bounds checks are unnecessary.
+    """
+
+    def __init__(self, values, levels):
+        width = len(values) + (1 << levels)
+        padded = np.full(width, np.inf)
+        padded[:len(values)] = values
+        self.max = np.empty((levels, width))
+        self.min = np.empty((levels, width))
+        self.max[0] = self.min[0] = padded
+        for k in range(1, levels):
+            half = 1 << (k - 1)
+            self.max[k, :-half] = np.maximum(self.max[k - 1, :-half], self.max[k - 1, half:])
+            self.min[k, :-half] = np.minimum(self.min[k - 1, :-half], self.min[k - 1, half:])
+            self.max[k, -half:] = self.min[k, -half:] = np.inf
+
+    def range_min(self, lo, hi):
+        """Min over ``values[lo:hi + 1]`` for arrays of bounds (``hi >= lo``)."""
+        k = np.log2(hi - lo + 1).astype(np.int64)
+        return np.minimum(self.min[k, lo], self.min[k, hi - (1 << k) + 1])
+
+
+def _max_drawdown_chunk(c, window, relative):
+    """Windowed max drawdown for every window fully inside ``c``."""
+    n = len(c)
+    levels = max(int(np.ceil(np.log2(window + 1))) + 1, 1)
+    table = _SparseTable(c, levels)
+    idx = np.arange(n)
+
+    # Next strictly greater element within ``window`` steps, by binary descent
+    # over the longest run of values <= c[j] that follows j.
+    run = np.zeros(n, dtype=np.int64)
+    for k in range(levels - 1, -1, -1):
+        step = 1 << k
+        fits = (table.max[k, idx + run + 1] <= c) & (run + step <= window)
+        run += step * fits
+    nge = idx + run + 1
+    none = (nge >= n) | (run >= window)
+    nge[none] = n
+
+    # Drawdown of the stretch where c[j] is the running peak
+    has = ~none
+    seg = np.full(n + 1, np.inf)
+    seg[:n][has] = _drawdown(table.range_min(idx[has], nge[has] - 1), c[has], relative)
+    if relative:
+        # Peaks below zero can only produce non-negative values, the best of
+        # which is the peak itself; a zero peak divides by zero as in np.min.
+        seg[:n][has & (c < 0)] = 0.0
+        seg[:n][has & (c == 0)] = np.nan
+
+    # Binary lifting over the next-greater chain
+    up = [np.append(nge, n)]
+    low = [seg]
+    for k in range(1, levels):
+        prev_up, prev_low = up[-1], low[-1]
+        up.append(prev_up[prev_up])
+        low.append(np.minimum(prev_low, prev_low[prev_up]))
+
+    ends = np.arange(window, n)
+    cur = ends - window
+    best = np.full(len(ends), np.inf)
+    for k in range(levels - 1, -1, -1):
+        nxt = up[k][cur]
+        take = nxt <= ends
+        best = np.where(take, np.minimum(best, low[k][cur]), best)
+        cur = np.where(take, nxt, cur)
+
+    # The last peak on the chain covers the rest of the window
+    tail = _drawdown(table.range_min(cur, ends), c[cur], relative)
+    if relative:
+        tail[c[cur] < 0] = 0.0
+        tail[c[cur] == 0] = np.nan
+    return np.minimum(best, tail)
+
+
+def rolling_max_drawdown(cumulative, window, relative=True, fill=0.0):
+    """Worst drawdown inside each window of ``window + 1`` points.
+
+    Element ``i`` equals ``min((w - peak) / peak * 100)`` over
+    ``w = cumulative[i-window:i+1]`` with ``peak = np.maximum.accumulate(w)``
+    (or ``w - peak`` when ``relative`` is False).
+    """
+    cumulative = np.asarray(cumulative, dtype=np.float64)
+    n = len(cumulative)
+    out = np.full(n, fill, dtype=np.float64)
+    chunk = max(_CHUNK, 4 * window)
+    for start in range(window, n, chunk):
+        stop = min(start + chunk, n)
+        out[start:stop] = _max_drawdown_chunk(cumulative[start - window:stop], window, relative)
+    return out
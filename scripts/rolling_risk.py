@@ -0,0 +1,214 @@
+"""
+Rolling Value-at-Risk and Expected Shortfall over a sliding window.
+
+Re-sorting every window costs O(n * w log w). ``RollingRisk`` instead keeps
+the window's returns in a sorted container (``sortedcontainers.SortedList``
+when installed, a bisect-maintained list otherwise) and, alongside it, the
+running sum of the ``k`` smallest returns, where ``k = ceil((1 - confidence)
+* window)``. Each step inserts the new return and removes the one leaving
+the window, fixing up the tail sum from the element that crosses the
+``k``-th rank, so VaR (the ``k``-th smallest return) and ES (the mean of the
+``k`` smallest) cost O(log w) per step. The tail sum is recomputed exactly
+once per window length so rounding errors cannot accumulate.
+
+VaR and ES are reported as positive losses. ``rolling_var_es`` is the batch
+form; ``RiskFeed`` consumes simulation log rows as they are ingested (it has
+the ``update``/``clear`` interface of the dashboard's pyramid) and keeps a
+plot-ready series.
+"""
+
+import bisect
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from log_tail import ColumnBuffer
+
+try:
+    from sortedcontainers import SortedList
+except ImportError:
+    SortedList = None
+
+DEFAULT_WINDOW = 390
+DEFAULT_CONFIDENCE = 0.95
+
+
+class _BisectList:
+    """The subset of ``SortedList`` used here, on a plain sorted list.
+
+    Inserts and removals shift the list (O(w) memmove), which is still fast
+    for windows up to a few tens of thousands.
+    """
+
+    def __init__(self):
+        self._items = []
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        return self._items[index]
+
+    def add(self, value):
+        bisect.insort(self._items, value)
+
+    def remove(self, value):
+        del self._items[bisect.bisect_left(self._items, value)]
+
+    def bisect_left(self, value):
+        return bisect.bisect_left(self._items, value)
+
+    def bisect_right(self, value):
+        return bisect.bisect_right(self._items, value)
+
+
+def _sorted_container():
+    return SortedList() if SortedList is not None else _BisectList()
+
+
+class RollingRisk:
+    """VaR / ES of the last ``window`` returns, updated one return at a time."""
+
+    def __init__(self, window=DEFAULT_WINDOW, confidence=DEFAULT_CONFIDENCE):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        if not 0 < confidence < 1:
+            raise ValueError("confidence must be between 0 and 1")
+        self.window = window
+        self.confidence = confidence
+        self.k = max(math.ceil((1 - confidence) * window - 1e-9), 1)
+        self.clear()
+
+    def clear(self):
+        self._fifo = deque()
+        self._sorted = _sorted_container()
+        self._tail = 0.0
+        self._since_exact = 0
+
+    def _exact_tail(self):
+        self._tail = math.fsum(self._sorted[i] for i in range(self.k))
+        self._since_exact = 0
+
+    def update(self, value):
+        """Add one return; ``(var, es)`` of the full window, or NaNs while warming up."""
+        value = float(value)
+        if math.isnan(value):
+            value = 0.0
+        window, k, ranked = self.window, self.k, self._sorted
+        self._fifo.append(value)
+
+        if len(ranked) < window:
+            ranked.add(value)
+            if len(ranked) < window:
+                return math.nan, math.nan
+            self._exact_tail()
+        else:
+            # Insert first so the container briefly holds window + 1 values and
+            # rank k always exists for the fix-ups below
+            if ranked.bisect_right(value) < k:
+                ranked.add(value)
+                self._tail += value - ranked[k]
+            else:
+                ranked.add(value)
+            old = self._fifo.popleft()
+            if ranked.bisect_left(old) < k:
+                self._tail += ranked[k] - old
+            ranked.remove(old)
+            self._since_exact += 1
+            if self._since_exact >= window:
+                self._exact_tail()
+
+        return -ranked[k - 1], -self._tail / k
+
+    def extend(self, values):
+        """``update`` over an array; returns ``(var, es)`` arrays of the same length."""
+        values = np.nan_to_num(np.asarray(values, dtype=np.float64)).tolist()
+        n = len(values)
+        var = np.full(n, np.nan)
+        es = np.full(n, np.nan)
+        # Warm up through update(), then run the steady state with everything in locals
+        i = 0
+        while i < n and len(self._sorted) < self.window:
+            var[i], es[i] = self.update(values[i])
+            i += 1
+        if i == n:
+            return var, es
+
+        window, k, ranked, fifo = self.window, self.k, self._sorted, self._fifo
+        add, remove, bisect_l, bisect_r = ranked.add, ranked.remove, ranked.bisect_left, ranked.bisect_right
+        push, pop = fifo.append, fifo.popleft
+        tail, since = self._tail, self._since_exact
+        out_var, out_tail = [], []
+        for value in values[i:]:
+            push(value)
+            if bisect_r(value) < k:
+                add(value)
+                tail += value - ranked[k]
+            else:
+                add(value)
+            old = pop()
+            if bisect_l(old) < k:
+                tail += ranked[k] - old
+            remove(old)
+            since += 1
+            if since >= window:
+                self._exact_tail()
+                tail, since = self._tail, 0
+            out_var.append(ranked[k - 1])
+            out_tail.append(tail)
+        self._tail, self._since_exact = tail, since
+        var[i:] = out_var
+        es[i:] = out_tail
+        var[i:] *= -1
+        es[i:] /= -k
+        return var, es
+
+
+def rolling_var_es(returns, window=DEFAULT_WINDOW, confidence=DEFAULT_CONFIDENCE, fill=np.nan):
+    """VaR and ES of the ``window`` returns ending at each point.
+
+    The first ``window - 1`` elements hold ``fill``.
+    """
+    var, es = RollingRisk(window, confidence).extend(returns)
+    var[:window - 1] = fill
+    es[:window - 1] = fill
+    return var, es
+
+
+class RiskFeed:
+    """Rolling VaR / ES of a log column's changes, fed with new rows as they arrive."""
+
+    def __init__(self, column='pnl', window=DEFAULT_WINDOW, confidence=DEFAULT_CONFIDENCE):
+        self.column = column
+        self.risk = RollingRisk(window, confidence)
+        self.clear()
+
+    def clear(self):
+        self.risk.clear()
+        self._last = None
+        self._buffer = ColumnBuffer()
+
+    def update(self, frame):
+        """Consume rows appended to the log since the previous call."""
+        if len(frame) == 0 or self.column not in frame:
+            return
+        values = frame[self.column].to_numpy(dtype=np.float64)
+        previous = values[0] if self._last is None else self._last
+        returns = np.diff(values, prepend=previous)
+        self._last = values[-1]
+        var, es = self.risk.extend(returns)
+        ready = ~np.isnan(var)
+        self._buffer.append(pd.DataFrame({
+            'timestamp': frame['timestamp'].to_numpy()[ready],
+            'var': var[ready],
+            'es': es[ready],
+        }))
+
+    def frame(self):
+        """``timestamp``, ``var`` and ``es`` of every full window so far."""
+        if len(self._buffer) == 0:
+            return pd.DataFrame({'timestamp': pd.Series(dtype='datetime64[ns]'),
+                                 'var': pd.Series(dtype=np.float64), 'es': pd.Series(dtype=np.float64)})
+        return self._buffer.frame()
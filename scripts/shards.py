@@ -0,0 +1,250 @@
+"""
+Symbol-partitioned simulation logs.
+
+A shard set is a directory holding one log per symbol (``<SYMBOL>.csv`` or
+``<SYMBOL>.qrlog``), optionally with an ``index.json`` listing each shard's
+file, row count and time span. ``split_log`` builds one from a single log
+with a ``symbol`` column, streaming it in chunks; ``open_shards`` accepts
+either form and splits a combined log on first use into ``<log>.shards/``,
+redone when the log's size or mtime changes (as in log_cache). An engine
+making markets live should write the shard directory itself: a split is a
+snapshot of the combined log.
+
+Shards are independent, so ``summarize_shards`` runs one task per symbol
+on a process pool. A worker loads its shard through the columnar cache and
+returns only small results: summary statistics, downsampled series and the
+last P&L and inventory of each time bucket. ``combine_buckets`` sums the
+buckets of all symbols into firm-wide totals, carrying each symbol's last
+value forward. With no data crossing the pool beyond that, report time
+scales with the number of cores.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from downsample import DEFAULT_MAX_POINTS, downsample_frame
+from log_cache import iter_chunks, load_log
+from market_maker import summarize
+
+SYMBOL_COLUMN = 'symbol'
+INDEX_NAME = 'index.json'
+INDEX_VERSION = 2
+SHARDS_SUFFIX = '.shards'
+SHARD_EXTENSIONS = ('.csv', '.qrlog')
+DEFAULT_BUCKET = '1s'
+SPLIT_CHUNKSIZE = 1_000_000
+
+
+def shard_name(symbol):
+    """File name stem of a symbol's shard.
+
+    A symbol with characters unsafe in file names has them replaced and a
+    short hash of the raw symbol appended, so ``A/B`` and ``A_B`` get
+    different files.
+    """
+    symbol = str(symbol)
+    stem = re.sub(r'[^A-Za-z0-9._-]', '_', symbol)
+    if stem != symbol:
+        stem += '-' + hashlib.sha1(symbol.encode()).hexdigest()[:8]
+    return stem
+
+
+def has_symbol_column(path, column=SYMBOL_COLUMN):
+    """True for a CSV log with one row stream per symbol in ``column``."""
+    if os.path.isdir(path) or os.path.splitext(path)[1] != '.csv':
+        return False
+    return column in pd.read_csv(path, nrows=0).columns
+
+
+def is_sharded(path, column=SYMBOL_COLUMN):
+    return os.path.isdir(path) or has_symbol_column(path, column)
+
+
+def _read_index(directory):
+    try:
+        with open(os.path.join(directory, INDEX_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def split_log(path, target, column=SYMBOL_COLUMN, chunksize=SPLIT_CHUNKSIZE):
+    """Partition ``path`` by ``column`` into one CSV per symbol under ``target``.
+
+    Rows keep their order within each symbol. Returns the index written to
+    ``target/index.json``.
+    """
+    st = os.stat(path)
+    parent = os.path.dirname(os.path.abspath(target))
+    staging = tempfile.mkdtemp(prefix='.shards-', dir=parent)
+    shards = {}
+    try:
+        for chunk in iter_chunks(path, chunksize):
+            for symbol, rows in chunk.groupby(column, sort=False):
+                symbol = str(symbol)
+                rows = rows.drop(columns=column)
+                entry = shards.get(symbol)
+                if entry is None:
+                    entry = shards[symbol] = {'file': shard_name(symbol) + '.csv', 'rows': 0,
+                                              'start': str(rows['timestamp'].iloc[0])}
+                rows.to_csv(os.path.join(staging, entry['file']), mode='a', index=False,
+                            header=entry['rows'] == 0)
+                entry['rows'] += len(rows)
+                entry['end'] = str(rows['timestamp'].iloc[-1])
+        index = {'version': INDEX_VERSION, 'column': column, 'size': st.st_size,
+                 'mtime_ns': st.st_mtime_ns, 'shards': dict(sorted(shards.items()))}
+        with open(os.path.join(staging, INDEX_NAME), 'w') as f:
+            json.dump(index, f, indent=1)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return index
+
+
+def open_shards(path, column=SYMBOL_COLUMN):
+    """``{symbol: shard path}`` of a shard directory or a log with a symbol column.
+
+    Raises ``FileNotFoundError`` when there are no shards.
+    """
+    if os.path.isdir(path):
+        index = _read_index(path)
+        if index is not None:
+            shards = {symbol: os.path.join(path, entry['file'])
+                      for symbol, entry in index['shards'].items()}
+        else:
+            shards = {os.path.splitext(name)[0]: os.path.join(path, name)
+                      for name in sorted(os.listdir(path))
+                      if os.path.splitext(name)[1] in SHARD_EXTENSIONS}
+        if not shards:
+            raise FileNotFoundError(f"No shards ({' / '.join(SHARD_EXTENSIONS)} files) in {path}")
+        return shards
+
+    target = path + SHARDS_SUFFIX
+    st = os.stat(path)
+    index = _read_index(target)
+    if not (index and index.get('version') == INDEX_VERSION and index['column'] == column
+            and index['size'] == st.st_size and index['mtime_ns'] == st.st_mtime_ns):
+        print(f"🔀 Splitting {path} by {column} into {target}/")
+        split_log(path, target, column)
+    return open_shards(target)
+
+
+def select_symbols(shards, symbols=None):
+    """The shards of ``symbols`` (all when ``None``), in the given order."""
+    if not symbols:
+        return dict(shards)
+    missing = [symbol for symbol in symbols if symbol not in shards]
+    if missing:
+        raise KeyError(f"No shard for {', '.join(missing)}")
+    return {symbol: shards[symbol] for symbol in symbols}
+
+
+def last_per_bucket(ts_ns, columns, bucket_ns):
+    """Bucket start times and each column's last value in the bucket (``ts_ns`` sorted)."""
+    keys = np.asarray(ts_ns, dtype=np.int64) // bucket_ns
+    if not len(keys):
+        return np.empty(0, dtype=np.int64), {name: np.empty(0) for name in columns}
+    last = np.flatnonzero(np.diff(keys, append=keys[-1] + 1))
+    return keys[last] * bucket_ns, {name: np.asarray(values)[last] for name, values in columns.items()}
+
+
+def combine_buckets(parts):
+    """Sum per-symbol ``(times, {column: values})`` buckets on their common time grid.
+
+    A symbol counts as 0 before its first bucket and keeps its last value
+    after its last one, as P&L and inventory do.
+    """
+    parts = [part for part in parts if len(part[0])]
+    if not parts:
+        return pd.DataFrame({'timestamp': pd.to_datetime([])})
+    grid = np.unique(np.concatenate([times for times, _ in parts]))
+    totals = {}
+    for times, columns in parts:
+        pos = np.searchsorted(times, grid, side='right') - 1
+        for name, values in columns.items():
+            carried = np.where(pos >= 0, np.asarray(values, dtype=np.float64)[np.maximum(pos, 0)], 0.0)
+            totals[name] = totals.get(name, 0.0) + carried
+    return pd.DataFrame({'timestamp': grid.astype('datetime64[ns]'), **totals})
+
+
+def plot_symbol(symbol, pnl, inventory, output):
+    """P&L and inventory panels of one symbol."""
+    import matplotlib.pyplot as plt
+
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 6), sharex=True)
+    ax1.plot(pnl['timestamp'], pnl['pnl'], linewidth=1)
+    ax1.set_title(f"{symbol} PnL")
+    ax1.set_ylabel("PnL")
+    ax2.plot(inventory['timestamp'], inventory['inventory'], color='#A23B72', linewidth=1)
+    ax2.set_title(f"{symbol} Inventory")
+    ax2.set_xlabel("Timestamp")
+    ax2.set_ylabel("Inventory")
+    fig.tight_layout()
+    fig.savefig(output)
+    plt.close(fig)
+
+
+def summarize_shard(symbol, path, max_points=DEFAULT_MAX_POINTS, method='minmax',
+                    bucket=DEFAULT_BUCKET, plot_dir=None):
+    """Statistics, downsampled series and P&L / inventory buckets of one shard."""
+    frame = load_log(path, columns=['timestamp', 'pnl', 'inventory'])
+    ts = frame['timestamp'].to_numpy().astype('datetime64[ns]').view('i8')
+    pnl = frame['pnl'].to_numpy(dtype=np.float64)
+    inventory = frame['inventory'].to_numpy()
+    stats = summarize({'timestamp': ts, 'pnl': pnl, 'inventory': inventory, 'fills': 0})
+    del stats['fills']
+    row = {'symbol': symbol, 'rows': len(frame),
+           'start': frame['timestamp'].iloc[0] if len(frame) else pd.NaT,
+           'end': frame['timestamp'].iloc[-1] if len(frame) else pd.NaT,
+           **stats, 'final_inventory': int(inventory[-1]) if len(frame) else 0}
+    series = {column: downsample_frame(frame, 'timestamp', column, max_points, method)
+              for column in ('pnl', 'inventory')}
+    if plot_dir is not None and len(frame):
+        plot_symbol(symbol, series['pnl'], series['inventory'],
+                    os.path.join(plot_dir, shard_name(symbol) + '.png'))
+    buckets = last_per_bucket(ts, {'pnl': pnl, 'inventory': inventory},
+                              pd.Timedelta(bucket).value)
+    return {'row': row, 'series': series, 'buckets': buckets}
+
+
+def _use_agg():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def summarize_shards(shards, jobs=None, max_points=DEFAULT_MAX_POINTS, method='minmax',
+                     bucket=DEFAULT_BUCKET, plot_dir=None):
+    """``summarize_shard`` of every ``{symbol: path}`` on ``jobs`` processes.
+
+    Returns ``{symbol: result}`` in the order of ``shards``. ``jobs``
+    defaults to all cores; with one job the shards are summarized here.
+    """
+    if plot_dir is not None:
+        os.makedirs(plot_dir, exist_ok=True)
+    jobs = min(jobs or os.cpu_count() or 1, max(len(shards), 1))
+    # No plotting backend is loaded unless figures are drawn
+    initializer = _use_agg if plot_dir is not None else None
+    results = {}
+    if jobs == 1:
+        if initializer:
+            initializer()
+        for symbol, path in shards.items():
+            results[symbol] = summarize_shard(symbol, path, max_points, method, bucket, plot_dir)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=initializer) as pool:
+            futures = {pool.submit(summarize_shard, symbol, path, max_points, method, bucket,
+                                   plot_dir): symbol
+                       for symbol, path in shards.items()}
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+    return {symbol: results[symbol] for symbol in shards}
@@ -0,0 +1,167 @@
+"""
+Single-pass, bounded-memory summary statistics.
+
+``RunningMoments`` merges per-chunk count/mean/M2 with the parallel form of
+Welford's update, so mean and standard deviation are numerically stable no
+matter how many chunks are fed. ``QuantileSketch`` is a mergeable compactor
+sketch in the spirit of KLL: each level holds at most ``capacity`` items and
+overflowing levels are sorted and halved into the next level with double
+weight. Every compaction at level ``h`` can shift any rank by at most
+``2**h``, and the sketch adds these up, so it reports a hard (not
+probabilistic) bound on the rank error of its quantile estimates.
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CAPACITY = 8192
+DESCRIBE_PERCENTILES = (0.25, 0.5, 0.75)
+
+
+class RunningMoments:
+    """Exact count/min/max and Welford mean/variance over streamed chunks."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        n = len(values)
+        if n == 0:
+            return
+        mean = values.mean()
+        m2 = np.square(values - mean).sum()
+        self._combine(n, mean, m2, values.min(), values.max())
+
+    def merge(self, other):
+        if other.count:
+            self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        return self
+
+    def _combine(self, n, mean, m2, lo, hi):
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, lo)
+        self.max = max(self.max, hi)
+
+    @property
+    def std(self):
+        """Sample standard deviation (ddof=1), as in ``DataFrame.describe``."""
+        return np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with a tracked worst-case rank error."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.rank_error = 0
+        self._flip = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.count += len(values)
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self._compact()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate((self.levels[h], items))
+        self.count += other.count
+        self.rank_error += other.rank_error
+        self._compact()
+        return self
+
+    def _compact(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) > self.capacity:
+                items = np.sort(items)
+                # Odd item out stays behind at this level
+                keep = items[len(items) - len(items) % 2:]
+                # Alternate which element of each pair survives to avoid bias
+                promoted = items[self._flip:len(items) - len(items) % 2:2]
+                self._flip ^= 1
+                self.levels[h] = keep
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate((self.levels[h + 1], promoted))
+                self.rank_error += 2 ** h
+            h += 1
+
+    @property
+    def relative_error(self):
+        """Worst-case rank error of any quantile, as a fraction of the count."""
+        return self.rank_error / self.count if self.count else 0.0
+
+    def quantiles(self, qs):
+        if self.count == 0:
+            return np.full(len(qs), np.nan)
+        if self.rank_error == 0:
+            # Nothing compacted yet: exact, with describe()'s interpolation
+            return np.quantile(np.concatenate(self.levels), qs)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2 ** h, dtype=np.int64)
+                                  for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        items, cum = items[order], np.cumsum(weights[order])
+        ranks = np.asarray(qs) * (self.count - 1)
+        return items[np.minimum(np.searchsorted(cum, ranks, side='right'), len(items) - 1)]
+
+
+class StreamingSummary:
+    """``DataFrame.describe()`` for numeric columns, fed chunk by chunk."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.moments = {}
+        self.sketches = {}
+
+    def update(self, chunk):
+        for name in chunk.select_dtypes(include='number').columns:
+            if name not in self.moments:
+                self.moments[name] = RunningMoments()
+                self.sketches[name] = QuantileSketch(self.capacity)
+            values = chunk[name].to_numpy(dtype=np.float64)
+            self.moments[name].update(values)
+            self.sketches[name].update(values)
+
+    def merge(self, other):
+        for name, moments in other.moments.items():
+            if name not in self.moments:
+                self.moments[name] = RunningMoments()
+                self.sketches[name] = QuantileSketch(self.capacity)
+            self.moments[name].merge(moments)
+            self.sketches[name].merge(other.sketches[name])
+        return self
+
+    @property
+    def relative_error(self):
+        """Largest quantile rank error across all columns, as a fraction."""
+        return max((s.relative_error for s in self.sketches.values()), default=0.0)
+
+    def describe(self):
+        labels = [f'{int(q * 100)}%' for q in DESCRIBE_PERCENTILES]
+        table = {}
+        for name, m in self.moments.items():
+            qs = self.sketches[name].quantiles(DESCRIBE_PERCENTILES)
+            mean = m.mean if m.count else np.nan
+            lo, hi = (m.min, m.max) if m.count else (np.nan, np.nan)
+            table[name] = [m.count, mean, m.std, lo, *qs, hi]
+        return pd.DataFrame(table, index=['count', 'mean', 'std', 'min', *labels, 'max'])
@@ -0,0 +1,195 @@
+"""
+Parallel parameter sweep of the market-making strategy.
+
+The grid is the cartesian product of the values given per parameter (see
+``market_maker.DEFAULT_PARAMS`` for the names), from a JSON config and/or
+``--set name=v1,v2,...``. Every cell runs ``--repeats`` sessions on a process
+pool. A run's seed is derived from the root seed, the cell's parameters and
+the repeat number, never from the worker or the completion order, so the same
+cell always gives the same result.
+
+Each summary row is appended to the results CSV as soon as its run finishes.
+Rerunning with the same output resumes: completed (cell, repeat) pairs are
+read back and skipped, and a line torn by an interrupted write is dropped.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import product
+
+import numpy as np
+
+from log_cache import complete_lines_size
+from market_maker import DEFAULT_PARAMS, simulate_market_maker, simulation_log, summarize
+
+SUMMARY_FIELDS = ['final_pnl', 'sharpe', 'max_drawdown', 'max_abs_inventory', 'fills']
+
+
+def parse_values(text):
+    """``'0.1,0.2'`` -> ``[0.1, 0.2]``; each value is read as JSON, else kept as a string."""
+    values = []
+    for item in text.split(','):
+        item = item.strip()
+        try:
+            values.append(json.loads(item))
+        except ValueError:
+            values.append(item)
+    return values
+
+
+def load_grid(config=None, overrides=()):
+    """Merge a JSON config ``{name: value or [values]}`` with ``name=v1,v2`` overrides."""
+    grid = {}
+    if config:
+        with open(config) as f:
+            for name, values in json.load(f).items():
+                grid[name] = values if isinstance(values, list) else [values]
+    for item in overrides:
+        name, sep, values = item.partition('=')
+        if not sep:
+            raise ValueError(f"Expected name=v1,v2,... but got {item!r}")
+        grid[name.strip()] = parse_values(values)
+    unknown = set(grid) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown market maker parameters: {', '.join(sorted(unknown))}")
+    empty = [name for name, values in grid.items() if not values]
+    if empty:
+        raise ValueError(f"No values for: {', '.join(sorted(empty))}")
+    return grid
+
+
+def expand_grid(grid):
+    """Every combination of the grid's values, as parameter dicts."""
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in product(*(grid[name] for name in names))]
+
+
+def cell_key(params):
+    return json.dumps(params, sort_keys=True)
+
+
+def run_seed(root_seed, key, repeat):
+    """Seed for one run, stable across workers, orderings and resumes."""
+    digest = hashlib.sha256(key.encode()).digest()
+    words = tuple(int.from_bytes(digest[i:i + 4], 'little') for i in range(0, 16, 4))
+    return np.random.SeedSequence(root_seed, spawn_key=words + (repeat,))
+
+
+def log_name(params, repeat):
+    """File name of a run's simulation log, e.g. ``quote_size=10,spread=0.05-r0.csv``."""
+    cell = ','.join(f"{name}={params[name]}" for name in sorted(params))
+    return re.sub(r'[^A-Za-z0-9.,=_-]', '_', cell or 'default') + f"-r{repeat}.csv"
+
+
+def run_cell(params, seed, log_path=None):
+    """Worker entry point: simulate one session and summarise it."""
+    start = time.perf_counter()
+    run = simulate_market_maker(np.random.default_rng(seed), **params)
+    if log_path is not None:
+        tick_size = params.get('tick_size', DEFAULT_PARAMS['tick_size'])
+        simulation_log(run, tick_size).to_csv(log_path, index=False)
+    summary = summarize(run)
+    summary['elapsed'] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def completed_runs(path, fieldnames):
+    """(cell, repeat) pairs already in ``path``, after dropping a torn last line."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return set()
+    size = os.path.getsize(path)
+    keep = complete_lines_size(path, size)
+    if keep < size:
+        with open(path, 'r+b') as f:
+            f.truncate(keep)
+    with open(path, newline='') as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames and reader.fieldnames != fieldnames:
+            raise ValueError(f"{path} was written by a sweep over different parameters; "
+                             f"use another --output")
+        return {(row['cell'], int(row['repeat'])) for row in reader}
+
+
+def sweep(grid, output, repeats=1, seed=0, jobs=None, logs=None):
+    """Run every (cell, repeat) of ``grid`` not already in ``output``.
+
+    With ``logs``, each run's simulation log is also written to that directory.
+    """
+    names = sorted(grid)
+    fieldnames = ['cell', 'repeat'] + names + SUMMARY_FIELDS + ['elapsed']
+    done = completed_runs(output, fieldnames)
+    pending = [(params, repeat) for params in expand_grid(grid) for repeat in range(repeats)
+               if (cell_key(params), repeat) not in done]
+    total = len(pending) + len(done)
+    jobs = jobs or os.cpu_count() or 1
+    if done:
+        print(f"↻ Resuming: {len(done):,} of {total:,} runs already in {output}")
+    print(f"🚀 {len(pending):,} runs on {jobs} workers")
+    if not pending:
+        return
+
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    if logs:
+        os.makedirs(logs, exist_ok=True)
+    new_file = not os.path.exists(output) or os.path.getsize(output) == 0
+    finished = len(done)
+    with open(output, 'a', newline='') as f, ProcessPoolExecutor(max_workers=jobs) as pool:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        if new_file:
+            writer.writeheader()
+            f.flush()
+        queue = iter(pending)
+        running = {}
+        while True:
+            # Keep a couple of runs per worker queued so no worker idles
+            for params, repeat in queue:
+                key = cell_key(params)
+                log_path = os.path.join(logs, log_name(params, repeat)) if logs else None
+                future = pool.submit(run_cell, params, run_seed(seed, key, repeat), log_path)
+                running[future] = (params, key, repeat)
+                if len(running) >= 2 * jobs:
+                    break
+            if not running:
+                break
+            ready, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in ready:
+                params, key, repeat = running.pop(future)
+                summary = future.result()
+                writer.writerow({'cell': key, 'repeat': repeat, **params, **summary})
+                f.flush()
+                finished += 1
+                print(f"   [{finished}/{total}] {key} #{repeat}: pnl {summary['final_pnl']:.2f}, "
+                      f"sharpe {summary['sharpe']:.2f}, fills {summary['fills']}")
+
+
+def build_parser(prog=None):
+    parser = argparse.ArgumentParser(prog=prog, description="Sweep market maker parameters across all cores")
+    parser.add_argument('--config', type=str, help='JSON file mapping parameter names to values')
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=V1,V2',
+                        help='Values for one parameter (repeatable, overrides --config)')
+    parser.add_argument('--repeats', type=int, default=1, help='Seeded runs per grid cell')
+    parser.add_argument('--seed', type=int, default=0, help='Root seed of the sweep')
+    parser.add_argument('--jobs', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--output', type=str, default='results/sweep_results.csv',
+                        help='Results table; rerun with the same path to resume')
+    parser.add_argument('--logs', type=str, default=None, metavar='DIR',
+                        help='Also write every run\'s simulation log here (for generate_report.py --compare)')
+    return parser
+
+
+def main(argv=None, prog=None):
+    args = build_parser(prog).parse_args(argv)
+    grid = load_grid(args.config, args.set)
+    start = time.perf_counter()
+    sweep(grid, args.output, args.repeats, args.seed, args.jobs, args.logs)
+    print(f"✅ Sweep results in {args.output} ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
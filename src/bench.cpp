@@ -0,0 +1,69 @@
+// Order throughput and per-order latency of OrderBook::submit.
+//
+// Usage: bench_orderbook [orders] [seed]
+// Submits random limit orders around a fixed mid (a share of them priced
+// through the touch, so the book both grows and trades), timing each call
+// with steady_clock, and prints one JSON object for benchmarks/run.py.
+
+#include <algorithm>
+#include <chrono>
+#include <cstdint>
+#include <cstdlib>
+#include <iostream>
+#include <random>
+#include <vector>
+
+#include "orderbook.hpp"
+
+int main(int argc, char** argv) {
+    const int64_t orders = argc > 1 ? std::atoll(argv[1]) : 1000000;
+    const uint64_t seed = argc > 2 ? std::strtoull(argv[2], nullptr, 10) : 42;
+    const int64_t mid = 10000;
+
+    // Generate the flow up front so only the book is timed
+    std::mt19937_64 rng(seed);
+    std::uniform_int_distribution<int> coin(0, 1);
+    std::uniform_int_distribution<int64_t> offset(-8, 40);
+    std::uniform_int_distribution<int32_t> size(1, 9);
+    std::vector<int64_t> price(orders);
+    std::vector<int32_t> quantity(orders);
+    std::vector<bool> is_buy(orders);
+    for (int64_t i = 0; i < orders; ++i) {
+        is_buy[i] = coin(rng);
+        // Buys rest below the mid and sells above it; negative offsets cross
+        int64_t away = 5 + offset(rng);
+        price[i] = is_buy[i] ? mid - away : mid + away;
+        quantity[i] = size(rng) * 10;
+    }
+
+    OrderBook book;
+    std::vector<int64_t> latency(orders);
+    int64_t fills = 0;
+    auto on_fill = [&fills](const Fill&) { ++fills; };
+
+    auto start = std::chrono::steady_clock::now();
+    for (int64_t i = 0; i < orders; ++i) {
+        auto t0 = std::chrono::steady_clock::now();
+        book.submit(price[i], quantity[i], is_buy[i], i, on_fill);
+        auto t1 = std::chrono::steady_clock::now();
+        latency[i] = std::chrono::duration_cast<std::chrono::nanoseconds>(t1 - t0).count();
+    }
+    double seconds = std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count();
+
+    auto percentile = [&latency, orders](double q) {
+        int64_t rank = std::min<int64_t>(orders - 1, static_cast<int64_t>(q * orders));
+        std::nth_element(latency.begin(), latency.begin() + rank, latency.end());
+        return latency[rank];
+    };
+    int64_t p50 = orders ? percentile(0.5) : 0;
+    int64_t p99 = orders ? percentile(0.99) : 0;
+    int64_t p999 = orders ? percentile(0.999) : 0;
+    int64_t max = orders ? *std::max_element(latency.begin(), latency.end()) : 0;
+
+    std::cout << "{\"orders\": " << orders << ", \"fills\": " << fills
+              << ", \"seconds\": " << seconds
+              << ", \"orders_per_sec\": " << (seconds > 0 ? orders / seconds : 0)
+              << ", \"latency_ns\": {\"p50\": " << p50 << ", \"p99\": " << p99
+              << ", \"p999\": " << p999 << ", \"max\": " << max << "}}" << std::endl;
+    return 0;
+}
@@ -0,0 +1,64 @@
+// C ABI over OrderBook for batch use from Python (ctypes), see scripts/native_book.py.
+//
+// A batch call matches a whole array of incoming limit orders in one go and
+// writes fills and per-order top-of-book snapshots into caller-owned buffers,
+// so there is no per-order crossing of the language boundary.
+
+#include <cstdint>
+
+#include "orderbook.hpp"
+
+extern "C" {
+
+// Layouts mirror FILL_DTYPE / TOP_DTYPE in scripts/native_book.py
+struct QRFill {
+    int64_t timestamp;
+    int64_t price;
+    int64_t maker_id;
+    int64_t taker_id;
+    int32_t quantity;
+    int8_t side;
+};
+
+struct QRTop {
+    int64_t bid;
+    int64_t bid_quantity;
+    int64_t ask;
+    int64_t ask_quantity;
+};
+
+int qr_abi_version() { return 1; }
+
+void* qr_book_new() { return new OrderBook(); }
+
+void qr_book_free(void* book) { delete static_cast<OrderBook*>(book); }
+
+int64_t qr_book_next_id(void* book) { return static_cast<OrderBook*>(book)->next_order_id(); }
+
+// Submit orders [0, n) in sequence; order i gets id qr_book_next_id() + i.
+// Fills go to fills[0, fills_capacity) and, when tops is not null, tops[i]
+// receives the top of book after order i. An order is only started if the
+// buffer can hold every fill it could produce, so the call may stop early:
+// it returns the number of orders processed, *n_fills is the number of fills
+// written, and the caller resumes from the returned index with a fresh buffer.
+int64_t qr_book_submit(void* handle, int64_t n, const int64_t* price, const int32_t* quantity,
+                       const int8_t* side, const int64_t* timestamp, QRFill* fills,
+                       int64_t fills_capacity, int64_t* n_fills, QRTop* tops) {
+    OrderBook& book = *static_cast<OrderBook*>(handle);
+    int64_t written = 0;
+    int64_t i = 0;
+    for (; i < n; ++i) {
+        bool is_buy = side[i] > 0;
+        if (fills_capacity - written < book.max_fills(quantity[i], is_buy)) break;
+        book.submit(price[i], quantity[i], is_buy, timestamp[i], [&](const Fill& f) {
+            fills[written++] = QRFill{f.timestamp, f.price, f.maker_id, f.taker_id, f.quantity, f.side};
+        });
+        if (tops) {
+            tops[i] = QRTop{book.best_bid(), book.best_bid_quantity(), book.best_ask(), book.best_ask_quantity()};
+        }
+    }
+    *n_fills = written;
+    return i;
+}
+
+}  // extern "C"
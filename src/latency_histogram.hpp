@@ -0,0 +1,80 @@
+#pragma once
+
+// Fixed-memory, log-bucketed (HDR-style) latency histogram.
+//
+// Values below 2^SUB_BUCKET_BITS nanoseconds get a bucket each; above that,
+// every power of two is split into 2^(SUB_BUCKET_BITS - 1) equal buckets, so
+// a recorded value is known to within 1 / 2^(SUB_BUCKET_BITS - 1) (0.8%)
+// however large it is. Values up to 2^MAX_BITS ns (about 4.9 hours) fit;
+// larger ones land in the last bucket, max() stays exact. The layout is
+// mirrored by scripts/hdr.py, which reads the dumps written by write_json.
+
+#include <algorithm>
+#include <array>
+#include <cstdint>
+#include <limits>
+#include <ostream>
+#include <string>
+
+class LatencyHistogram {
+public:
+    static constexpr int SUB_BUCKET_BITS = 8;
+    static constexpr int MAX_BITS = 44;
+    static constexpr int64_t SUB_BUCKETS = int64_t(1) << SUB_BUCKET_BITS;
+    static constexpr int64_t HALF = SUB_BUCKETS / 2;
+    static constexpr size_t BUCKETS = SUB_BUCKETS + (MAX_BITS - SUB_BUCKET_BITS) * HALF;
+
+    static size_t bucket(int64_t value) {
+        if (value < SUB_BUCKETS) return value < 0 ? 0 : static_cast<size_t>(value);
+        int msb = 63 - __builtin_clzll(static_cast<uint64_t>(value));
+        int shift = msb - (SUB_BUCKET_BITS - 1);
+        int64_t top = value >> shift;   // in [HALF, SUB_BUCKETS)
+        size_t index = SUB_BUCKETS + (shift - 1) * HALF + (top - HALF);
+        return std::min(index, BUCKETS - 1);
+    }
+
+    void record(int64_t value) {
+        ++counts[bucket(value)];
+        ++total;
+        sum += value;
+        min_value = std::min(min_value, value);
+        max_value = std::max(max_value, value);
+    }
+
+    int64_t count() const { return total; }
+    int64_t max() const { return max_value; }
+
+    void reset() {
+        counts.fill(0);
+        total = 0;
+        sum = 0;
+        min_value = std::numeric_limits<int64_t>::max();
+        max_value = 0;
+    }
+
+    // One JSON object: the layout, summary values and the non-empty buckets as
+    // a flat [index gap, count, index gap, count, ...] list
+    void write_json(std::ostream& out, const std::string& name, int64_t run, int64_t time_ns) const {
+        out << "{\"name\": \"" << name << "\", \"run\": " << run << ", \"time_ns\": " << time_ns
+            << ", \"unit\": \"ns\", \"sub_bucket_bits\": " << SUB_BUCKET_BITS
+            << ", \"max_bits\": " << MAX_BITS << ", \"count\": " << total << ", \"sum\": " << sum
+            << ", \"min\": " << (total ? min_value : 0) << ", \"max\": " << max_value
+            << ", \"buckets\": [";
+        size_t previous = 0;
+        bool first = true;
+        for (size_t i = 0; i < BUCKETS; ++i) {
+            if (!counts[i]) continue;
+            out << (first ? "" : ", ") << i - previous << ", " << counts[i];
+            previous = i;
+            first = false;
+        }
+        out << "]}\n";
+    }
+
+private:
+    std::array<int64_t, BUCKETS> counts{};
+    int64_t total = 0;
+    int64_t sum = 0;
+    int64_t min_value = std::numeric_limits<int64_t>::max();
+    int64_t max_value = 0;
+};
@@ -1,67 +1,72 @@
 #include <iostream>
 #include <vector>
-#include <queue>
-#include <map>
 #include <chrono>
 #include <thread>
 #include <random>
 #include <cmath>
+#include <filesystem>
+#include <fstream>
+#include <string>
 
-// Struct representing an order
-struct Order {
-    int id;
-    double price;
-    int quantity;
-    bool is_buy;
-    std::chrono::high_resolution_clock::time_point timestamp;
-};
-
-// OrderBook class to simulate limit order book behavior
-class OrderBook {
-private:
-    std::map<double, std::queue<Order>, std::greater<double>> buy_orders;
-    std::map<double, std::queue<Order>> sell_orders;
-    int order_id_counter = 0;
+#include "latency_histogram.hpp"
+#include "orderbook.hpp"
 
-public:
-    void place_order(double price, int quantity, bool is_buy) {
-        Order order = {order_id_counter++, price, quantity, is_buy, std::chrono::high_resolution_clock::now()};
-        if (is_buy) {
-            buy_orders[price].push(order);
-        } else {
-            sell_orders[price].push(order);
-        }
-    }
+// Prices are quoted in ticks of one cent
+constexpr double TICK_SIZE = 0.01;
+// Seconds between latency histogram dumps
+constexpr int64_t LATENCY_DUMP_SECONDS = 10;
 
-    void match_orders() {
-        while (!buy_orders.empty() && !sell_orders.empty()) {
-            auto best_buy = buy_orders.begin();
-            auto best_sell = sell_orders.begin();
+inline int64_t to_ticks(double price) { return std::llround(price / TICK_SIZE); }
 
-            if (best_buy->first >= best_sell->first) {
-                Order buy = best_buy->second.front();
-                Order sell = best_sell->second.front();
+inline int64_t now_ns() {
+    return std::chrono::duration_cast<std::chrono::nanoseconds>(
+        std::chrono::steady_clock::now().time_since_epoch()).count();
+}
 
-                int traded_qty = std::min(buy.quantity, sell.quantity);
-                std::cout << "Trade executed: " << traded_qty << " @ " << sell.price << std::endl;
+inline void print_trade(const Fill& fill) {
+    std::cout << "Trade executed: " << fill.quantity << " @ " << fill.price * TICK_SIZE << std::endl;
+}
 
-                buy.quantity -= traded_qty;
-                sell.quantity -= traded_qty;
+// Order-to-fill latency runs from placing the crossing order until its fill
+// is reported. Tick-to-quote runs from when a changed mid price is observed,
+// right after matching, until the market maker's next quotes rest in the
+// book. The market maker requotes once per loop iteration, so that span
+// includes the loop's sleep. Each dump appends the histograms of the
+// interval since the previous one, so runs and intervals merge by adding
+// bucket counts.
+class LatencyRecorder {
+private:
+    std::ofstream out;
+    int64_t run;
+    int64_t last_dump;
 
-                if (buy.quantity == 0) best_buy->second.pop();
-                if (sell.quantity == 0) best_sell->second.pop();
+public:
+    LatencyHistogram order_to_fill;
+    LatencyHistogram tick_to_quote;
+
+    explicit LatencyRecorder(const std::string& path)
+        : run(std::chrono::duration_cast<std::chrono::milliseconds>(
+              std::chrono::system_clock::now().time_since_epoch()).count()),
+          last_dump(now_ns()) {
+        auto parent = std::filesystem::path(path).parent_path();
+        if (!parent.empty()) std::filesystem::create_directories(parent);
+        out.open(path, std::ios::app);
+    }
 
-                if (best_buy->second.empty()) buy_orders.erase(best_buy);
-                if (best_sell->second.empty()) sell_orders.erase(best_sell);
-            } else {
-                break;
-            }
-        }
+    void dump() {
+        int64_t now = now_ns();
+        int64_t wall = std::chrono::duration_cast<std::chrono::nanoseconds>(
+            std::chrono::system_clock::now().time_since_epoch()).count();
+        if (order_to_fill.count()) order_to_fill.write_json(out, "order_to_fill", run, wall);
+        if (tick_to_quote.count()) tick_to_quote.write_json(out, "tick_to_quote", run, wall);
+        out.flush();
+        order_to_fill.reset();
+        tick_to_quote.reset();
+        last_dump = now;
     }
 
-    double get_mid_price() const {
-        if (buy_orders.empty() || sell_orders.empty()) return -1;
-        return (buy_orders.begin()->first + sell_orders.begin()->first) / 2.0;
+    void maybe_dump() {
+        if (now_ns() - last_dump >= LATENCY_DUMP_SECONDS * 1000000000LL) dump();
     }
 };
 
@@ -80,28 +85,47 @@ public:
     void run() {
         double bid = base_price - spread / 2.0;
         double ask = base_price + spread / 2.0;
-        book.place_order(bid, order_size, true);
-        book.place_order(ask, order_size, false);
+        book.place_order(to_ticks(bid), order_size, true, now_ns());
+        book.place_order(to_ticks(ask), order_size, false, now_ns());
     }
 };
 
-int main() {
+int main(int argc, char** argv) {
     OrderBook ob;
     MarketMaker mm(ob, 100.0, 10, 0.2);
+    LatencyRecorder latency(argc > 1 ? argv[1] : "results/latency_histograms.jsonl");
 
+    auto on_fill = [&latency](const Fill& fill) {
+        // The fill carries the placement time of the order that crossed
+        latency.order_to_fill.record(now_ns() - fill.timestamp);
+        print_trade(fill);
+    };
+
+    double last_mid = -1;
+    int64_t mid_changed = -1;   // when a new mid was observed, until the next quotes
     for (int i = 0; i < 100; ++i) {
         mm.run();
+        if (mid_changed >= 0) {
+            latency.tick_to_quote.record(now_ns() - mid_changed);
+            mid_changed = -1;
+        }
 
         // Add some random market orders
-        if (rand() % 2) ob.place_order(100.1, 5, true);
-        else ob.place_order(99.9, 5, false);
+        if (rand() % 2) ob.place_order(to_ticks(100.1), 5, true, now_ns());
+        else ob.place_order(to_ticks(99.9), 5, false, now_ns());
 
-        ob.match_orders();
+        ob.match_orders(on_fill);
         double mid = ob.get_mid_price();
-        if (mid > 0) std::cout << "Mid-price: " << mid << "\n";
+        if (mid > 0 && mid != last_mid) {
+            mid_changed = now_ns();
+            last_mid = mid;
+        }
+        if (mid > 0) std::cout << "Mid-price: " << mid * TICK_SIZE << "\n";
 
+        latency.maybe_dump();
         std::this_thread::sleep_for(std::chrono::milliseconds(500));
     }
+    latency.dump();
 
     return 0;
 }
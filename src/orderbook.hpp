@@ -0,0 +1,159 @@
+#pragma once
+
+#include <algorithm>
+#include <cstdint>
+#include <deque>
+#include <functional>
+#include <map>
+
+// Struct representing a resting order; prices are integer ticks
+struct Order {
+    int64_t id;
+    int64_t price;
+    int32_t quantity;
+    bool is_buy;
+    int64_t timestamp;
+};
+
+// A fill between a resting (maker) order and an incoming (taker) order
+struct Fill {
+    int64_t timestamp;
+    int64_t price;
+    int64_t maker_id;
+    int64_t taker_id;
+    int32_t quantity;
+    int8_t side;      // aggressor side: +1 buy, -1 sell
+};
+
+// Orders resting at one price, oldest first, with their total quantity
+struct PriceLevel {
+    std::deque<Order> orders;
+    int64_t quantity = 0;
+
+    void push(const Order& order) {
+        orders.push_back(order);
+        quantity += order.quantity;
+    }
+};
+
+// OrderBook class to simulate limit order book behavior with price-time priority
+class OrderBook {
+private:
+    std::map<int64_t, PriceLevel, std::greater<int64_t>> buy_orders;
+    std::map<int64_t, PriceLevel> sell_orders;
+    int64_t order_id_counter = 0;
+    int64_t resting_buys = 0;
+    int64_t resting_sells = 0;
+
+    template <typename Book, typename Crosses, typename OnFill>
+    int32_t take(Book& book, int64_t& resting, Crosses crosses, Order& taker, OnFill& on_fill) {
+        while (taker.quantity > 0 && !book.empty() && crosses(book.begin()->first)) {
+            auto level = book.begin();
+            // Work on the queued order itself so partial fills persist
+            Order& maker = level->second.orders.front();
+            int32_t traded = std::min(maker.quantity, taker.quantity);
+            on_fill(Fill{taker.timestamp, level->first, maker.id, taker.id, traded,
+                         static_cast<int8_t>(taker.is_buy ? 1 : -1)});
+            maker.quantity -= traded;
+            taker.quantity -= traded;
+            level->second.quantity -= traded;
+            if (maker.quantity == 0) {
+                level->second.orders.pop_front();
+                --resting;
+            }
+            if (level->second.orders.empty()) book.erase(level);
+        }
+        return taker.quantity;
+    }
+
+public:
+    // Rest an order without matching; returns its id
+    int64_t place_order(int64_t price, int32_t quantity, bool is_buy, int64_t timestamp = 0) {
+        Order order = {order_id_counter++, price, quantity, is_buy, timestamp};
+        if (is_buy) {
+            buy_orders[price].push(order);
+            ++resting_buys;
+        } else {
+            sell_orders[price].push(order);
+            ++resting_sells;
+        }
+        return order.id;
+    }
+
+    // Match an incoming limit order against the book, then rest any remainder
+    template <typename OnFill>
+    int64_t submit(int64_t price, int32_t quantity, bool is_buy, int64_t timestamp, OnFill on_fill) {
+        Order order = {order_id_counter++, price, quantity, is_buy, timestamp};
+        if (is_buy) {
+            take(sell_orders, resting_sells, [price](int64_t ask) { return ask <= price; }, order, on_fill);
+            if (order.quantity > 0) {
+                buy_orders[price].push(order);
+                ++resting_buys;
+            }
+        } else {
+            take(buy_orders, resting_buys, [price](int64_t bid) { return bid >= price; }, order, on_fill);
+            if (order.quantity > 0) {
+                sell_orders[price].push(order);
+                ++resting_sells;
+            }
+        }
+        return order.id;
+    }
+
+    // Cross any resting orders that overlap (after place_order calls)
+    template <typename OnFill>
+    void match_orders(OnFill on_fill) {
+        while (!buy_orders.empty() && !sell_orders.empty()) {
+            auto best_buy = buy_orders.begin();
+            auto best_sell = sell_orders.begin();
+            if (best_buy->first < best_sell->first) break;
+
+            Order& buy = best_buy->second.orders.front();
+            Order& sell = best_sell->second.orders.front();
+            int32_t traded = std::min(buy.quantity, sell.quantity);
+            // The older order is the maker and sets the price
+            bool buy_is_maker = buy.id < sell.id;
+            on_fill(Fill{std::max(buy.timestamp, sell.timestamp),
+                         buy_is_maker ? buy.price : sell.price,
+                         buy_is_maker ? buy.id : sell.id,
+                         buy_is_maker ? sell.id : buy.id,
+                         traded, static_cast<int8_t>(buy_is_maker ? -1 : 1)});
+
+            buy.quantity -= traded;
+            sell.quantity -= traded;
+            best_buy->second.quantity -= traded;
+            best_sell->second.quantity -= traded;
+
+            if (buy.quantity == 0) {
+                best_buy->second.orders.pop_front();
+                --resting_buys;
+            }
+            if (sell.quantity == 0) {
+                best_sell->second.orders.pop_front();
+                --resting_sells;
+            }
+
+            if (best_buy->second.orders.empty()) buy_orders.erase(best_buy);
+            if (best_sell->second.orders.empty()) sell_orders.erase(best_sell);
+        }
+    }
+
+    int64_t best_bid() const { return buy_orders.empty() ? -1 : buy_orders.begin()->first; }
+    int64_t best_ask() const { return sell_orders.empty() ? -1 : sell_orders.begin()->first; }
+
+    int64_t best_bid_quantity() const { return buy_orders.empty() ? 0 : buy_orders.begin()->second.quantity; }
+    int64_t best_ask_quantity() const { return sell_orders.empty() ? 0 : sell_orders.begin()->second.quantity; }
+
+    // Upper bound on the fills an incoming order on ``is_buy`` side can produce
+    int64_t max_fills(int32_t quantity, bool is_buy) const {
+        return std::min<int64_t>(quantity, is_buy ? resting_sells : resting_buys);
+    }
+
+    int64_t next_order_id() const { return order_id_counter; }
+
+    // Mid in ticks, or -1 when either side is empty
+    double get_mid_price() const {
+        if (buy_orders.empty() || sell_orders.empty()) return -1;
+        return (buy_orders.begin()->first + sell_orders.begin()->first) / 2.0;
+    }
+};
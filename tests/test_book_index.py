@@ -0,0 +1,18 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from book_index import BookIndex
+from orderbook import synthetic_events
+
+
+def test_index_is_rebuilt_for_a_different_interval(tmp_path):
+    path = str(tmp_path / 'events.npy')
+    np.save(path, synthetic_events(5000, np.random.default_rng(0)))
+
+    assert BookIndex(path, every=1000).meta['every'] == 1000
+    index = BookIndex(path, every=250)
+    assert index.meta['every'] == 250
+    assert np.all(np.diff(index.index['events']) <= 250)
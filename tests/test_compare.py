@@ -0,0 +1,31 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from binlog import convert_csv
+from compare import compare_runs, run_names
+
+
+def write_log(path, pnl):
+    pd.DataFrame({'timestamp': pd.date_range('2024-01-01 09:30', periods=len(pnl), freq='s'),
+                  'pnl': pnl, 'inventory': np.zeros(len(pnl), dtype=np.int64)}).to_csv(path, index=False)
+
+
+def test_names_keep_the_extension_only_where_needed():
+    assert run_names(['logs/run.csv', 'logs/run.qrlog', 'logs/other.csv']) == \
+        ['run.csv', 'run.qrlog', 'other']
+    assert run_names(['a/x.csv', 'b/x.csv']) == ['a/x', 'b/x']
+
+
+def test_runs_differing_by_extension_are_both_measured(tmp_path):
+    write_log(tmp_path / 'run.csv', np.linspace(0, 10, 100))
+    write_log(tmp_path / 'source.csv', np.linspace(0, -5, 100))
+    convert_csv(str(tmp_path / 'source.csv'), str(tmp_path / 'run.qrlog'))
+
+    table, series = compare_runs([str(tmp_path / 'run.csv'), str(tmp_path / 'run.qrlog')], jobs=1)
+    assert table['run'].tolist() == ['run.csv', 'run.qrlog']
+    assert table['final_pnl'].tolist() == [10.0, -5.0]
+    assert set(series) == {'run.csv', 'run.qrlog'}
@@ -0,0 +1,71 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+import dashboard
+from live_stream import LiveStream
+
+OUTPUTS = [('pnl-graph', 'figure'), ('inventory-graph', 'figure'), ('risk-graph', 'figure'),
+           ('view-state', 'data')]
+
+
+def write_log(path, rows):
+    with open(path, 'w') as f:
+        f.write('timestamp,pnl,inventory\n')
+        for i in range(rows):
+            f.write(f'2024-01-01 09:30:{i:02d},{i}.0,{i}\n')
+
+
+def refresh(client, state):
+    """POST the figure callback as the polling interval would; returns the response."""
+    payload = {
+        'output': '..' + '...'.join(f'{i}.{p}' for i, p in OUTPUTS) + '..',
+        'outputs': [{'id': i, 'property': p} for i, p in OUTPUTS],
+        'inputs': [{'id': 'interval-component', 'property': 'n_intervals', 'value': 1},
+                   {'id': 'pnl-graph', 'property': 'relayoutData', 'value': None},
+                   {'id': 'inventory-graph', 'property': 'relayoutData', 'value': None},
+                   {'id': 'symbol-select', 'property': 'value', 'value': []}],
+        'changedPropIds': ['interval-component.n_intervals'],
+        'state': [{'id': 'view-state', 'property': 'data', 'value': state}],
+    }
+    response = client.post('/_dash-update-component', json=payload)
+    assert response.status_code == 200
+    return response.get_json()['response']
+
+
+def points(figure):
+    return sum(len(trace.get('x') or []) for trace in figure['data'])
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    path = str(tmp_path / 'simulation_log.csv')
+    write_log(path, 50)
+    monkeypatch.setattr(dashboard, 'DATA_FILE', path)
+    monkeypatch.setattr(dashboard, 'live_stream', None)
+    monkeypatch.setattr(dashboard.ingester, 'tailer', dashboard.open_tailer(path))
+    dashboard.ingester.refresh()
+    return dashboard.create_app().server.test_client()
+
+
+def test_truncated_log_clears_the_graphs(client):
+    response = refresh(client, {'version': -1, 'range': None})
+    assert points(response['pnl-graph']['figure']) == 50
+
+    write_log(dashboard.DATA_FILE, 0)
+    dashboard.ingester.refresh()
+    response = refresh(client, response['view-state']['data'])
+    for graph in ('pnl-graph', 'inventory-graph'):
+        assert points(response[graph]['figure']) == 0
+
+
+def test_empty_log_in_push_mode_carries_meta(client, monkeypatch):
+    write_log(dashboard.DATA_FILE, 0)
+    dashboard.ingester.refresh()
+    monkeypatch.setattr(dashboard, 'live_stream',
+                        LiveStream(('pnl', 'inventory'), dashboard.risk_feed, 100))
+    response = refresh(client, {'version': -1, 'range': None})
+    meta = response['pnl-graph']['figure']['layout']['meta']
+    assert meta['live'] and meta['rows'] == 0
@@ -0,0 +1,37 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from downsample import METHODS, downsample_frame, downsample_indices
+
+
+@pytest.mark.parametrize('method', METHODS)
+@pytest.mark.parametrize('max_points', [4, 5, 7, 100, 2000])
+@pytest.mark.parametrize('n', [101, 2001, 12345])
+def test_indices_stay_within_budget(method, max_points, n):
+    rng = np.random.default_rng(n)
+    y = rng.standard_normal(n).cumsum()
+    y[rng.random(n) < 0.05] = np.nan
+    idx = downsample_indices(np.arange(n), y, max_points, method)
+    assert len(idx) <= max_points
+    assert idx[0] == 0 and idx[-1] == n - 1
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_minmax_keeps_bucket_extremes():
+    y = np.zeros(10_000)
+    y[1234], y[8765] = 50.0, -50.0
+    idx = downsample_indices(np.arange(len(y)), y, 100, 'minmax')
+    assert {1234, 8765} <= set(idx.tolist())
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_all_nan_series(method):
+    df = pd.DataFrame({'timestamp': pd.date_range('2024-01-01', periods=5000, freq='s'),
+                       'mid': np.nan})
+    view = downsample_frame(df, 'timestamp', 'mid', 100, method)
+    assert 0 < len(view) <= 100
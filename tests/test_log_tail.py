@@ -0,0 +1,47 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from binlog import HEADER_SIZE, BinaryLogWriter
+from log_tail import BinaryLogTailer
+
+
+def rows(pnl, count):
+    return pd.DataFrame({'timestamp': pd.date_range('2024-01-01 09:30', periods=count, freq='s'),
+                         'pnl': np.full(count, pnl, dtype=np.float64),
+                         'inventory': np.arange(count)})
+
+
+def test_binary_tailer_resets_when_refilled_past_its_count(tmp_path):
+    path = str(tmp_path / 'log.qrlog')
+    with BinaryLogWriter(path) as writer:
+        writer.write_frame(rows(1.0, 5))
+    tailer = BinaryLogTailer(path)
+    assert tailer.poll() == 5
+
+    # Truncate in place and write more rows than were read, before the next poll
+    with open(path, 'r+b') as f:
+        f.truncate(HEADER_SIZE)
+    with BinaryLogWriter(path) as writer:
+        writer.write_frame(rows(2.0, 8))
+
+    assert tailer.poll() == 8
+    assert tailer.resets == 1
+    assert tailer.frame()['pnl'].tolist() == [2.0] * 8
+
+
+def test_binary_tailer_appends_without_reset(tmp_path):
+    path = str(tmp_path / 'log.qrlog')
+    with BinaryLogWriter(path) as writer:
+        writer.write_frame(rows(1.0, 5))
+    tailer = BinaryLogTailer(path)
+    tailer.poll()
+    with BinaryLogWriter(path) as writer:
+        writer.write_frame(rows(2.0, 3))
+
+    assert tailer.poll() == 3
+    assert tailer.resets == 0
+    assert tailer.frame()['pnl'].tolist() == [1.0] * 5 + [2.0] * 3
@@ -0,0 +1,67 @@
+import asyncio
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from order_feed import OrderFeed, PoissonFlow, serve_unix
+
+TIMEOUT = 30.0
+
+
+async def read_then_disconnect(path, batches):
+    """Socket client that takes ``batches`` reads off the socket, then goes away."""
+    reader, writer = await asyncio.open_unix_connection(path)
+    for _ in range(batches):
+        await reader.read(4096)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def run_with_leaving_client(tmp_path, realtime, on_full, **run):
+    flow = PoissonFlow(rate=1e5, rng=np.random.default_rng(0))
+    feed = OrderFeed(flow, realtime=realtime, on_full=on_full)
+    path = str(tmp_path / 'feed.sock')
+    server = await serve_unix(feed, path, maxsize=2)
+    try:
+        client = asyncio.create_task(read_then_disconnect(path, 1))
+        await feed.wait_subscribers(1)
+        await asyncio.wait_for(feed.run(**run), TIMEOUT)
+        await client
+        if feed.clients:
+            await asyncio.wait(feed.clients, timeout=TIMEOUT)
+    finally:
+        server.close()
+    return feed
+
+
+@pytest.mark.parametrize('realtime, on_full, run', [
+    (False, 'block', {'max_events': 1_000_000}),
+    (False, 'block', {'duration': 1.0}),
+    (True, 'drop', {'duration': 1.0}),
+    (True, 'block', {'duration': 1.0}),
+])
+def test_disconnected_client_does_not_stall_feed(tmp_path, realtime, on_full, run):
+    feed = asyncio.run(run_with_leaving_client(tmp_path, realtime, on_full, **run))
+    if 'max_events' in run:
+        assert feed.stats.generated == run['max_events']
+    else:
+        assert_stopped_at(feed, run['duration'])
+    assert not feed._queues
+    assert not feed.clients
+
+
+def assert_stopped_at(feed, duration):
+    """The feed generated ``duration`` seconds of flow, no more, at its Poisson rate."""
+    assert feed.flow.elapsed == pytest.approx(duration)
+    expected = feed.flow.rate * duration
+    assert abs(feed.stats.generated - expected) <= 6 * np.sqrt(expected) + 1
+
+
+@pytest.mark.parametrize('rate, duration', [(10, 10.0), (1000, 10.0)])
+def test_fast_feed_stops_at_duration(rate, duration):
+    feed = OrderFeed(PoissonFlow(rate=rate, rng=np.random.default_rng(0)), realtime=False)
+    asyncio.run(feed.run(duration))
+    assert_stopped_at(feed, duration)
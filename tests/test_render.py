@@ -0,0 +1,71 @@
+import importlib
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from render import FigureJob, source_files
+
+HELPER = '''
+def draw(ax, values):
+    ax.plot(values)
+'''
+
+BUILDER = '''
+import matplotlib.pyplot as plt
+import numpy as np
+
+from {helper} import draw
+
+SAMPLE = [1, 2, 3]
+
+def build():
+    fig, ax = plt.subplots()
+    draw(ax, np.asarray(SAMPLE))
+    return fig
+'''
+
+
+def make_builder(tmp_path, monkeypatch, name):
+    helper = f'{name}_helper'
+    (tmp_path / f'{helper}.py').write_text(HELPER)
+    (tmp_path / f'{name}.py').write_text(BUILDER.format(helper=helper))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return importlib.import_module(name).build
+
+
+def test_key_covers_module_and_helper_sources(tmp_path, monkeypatch):
+    build = make_builder(tmp_path, monkeypatch, 'render_key_figs')
+    names = [os.path.basename(path) for path in source_files(build)]
+    assert names == ['render_key_figs.py', 'render_key_figs_helper.py']
+
+    job = FigureJob(str(tmp_path / 'out.png'), build)
+    key = job.key()
+    assert job.key() == key
+
+    # A module-level constant the builder reads
+    builder = tmp_path / 'render_key_figs.py'
+    builder.write_text(builder.read_text().replace('SAMPLE = [1, 2, 3]', 'SAMPLE = [3, 2, 1]'))
+    edited = job.key()
+    assert edited != key
+
+    # A helper in another project module
+    helper = tmp_path / 'render_key_figs_helper.py'
+    helper.write_text(helper.read_text().replace('ax.plot(values)', 'ax.step(values, values)'))
+    assert job.key() != edited
+
+
+def test_key_depends_on_arguments(tmp_path, monkeypatch):
+    build = make_builder(tmp_path, monkeypatch, 'render_arg_figs')
+    output = str(tmp_path / 'out.png')
+    assert FigureJob(output, build, kwargs={'seed': 1}).key() != FigureJob(output, build, kwargs={'seed': 2}).key()
+
+
+def test_spread_sample_is_seeded():
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'assets'))
+    from MarketMakingStrategy import create_pnl_attribution_chart, sample_spread_hist
+
+    def key():
+        return FigureJob('pnl_attribution.png', create_pnl_attribution_chart,
+                         kwargs={'spread_hist': sample_spread_hist()}).key()
+
+    assert key() == key()
@@ -0,0 +1,30 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from shards import open_shards, shard_name
+
+
+def test_directory_without_shards_is_an_error(tmp_path):
+    (tmp_path / 'notes.txt').write_text('not a log\n')
+    with pytest.raises(FileNotFoundError, match='No shards'):
+        open_shards(str(tmp_path))
+
+
+def test_symbols_sanitised_to_the_same_name_get_their_own_shards(tmp_path):
+    path = tmp_path / 'log.csv'
+    path.write_text('timestamp,symbol,pnl,inventory\n'
+                    '2024-01-01 09:30:00,A/B,1.0,1\n'
+                    '2024-01-01 09:30:00,A_B,5.0,2\n'
+                    '2024-01-01 09:30:01,A/B,2.0,3\n'
+                    '2024-01-01 09:30:01,A_B,6.0,4\n')
+    shards = open_shards(str(path))
+
+    assert shard_name('A_B') == 'A_B'
+    assert shard_name('A/B') != shard_name('A_B')
+    assert len(set(shards.values())) == 2
+    assert pd.read_csv(shards['A/B'])['pnl'].tolist() == [1.0, 2.0]
+    assert pd.read_csv(shards['A_B'])['pnl'].tolist() == [5.0, 6.0]